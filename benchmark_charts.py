@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Chart rendering and vision-image benchmarks
+
+Compares in-process rendering with the ChartRenderer process pool (cold and
+cached), and measures the bytes and estimated vision tokens of the
+downscaled variants sent for turn-3 analysis.
+
+Run with:  python -m pytest benchmark_charts.py --benchmark-only
+Sizes land in each benchmark's extra_info (see --benchmark-json).
+"""
+
+import shutil
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_replay import SAMPLE_DATA
+from chart_render import ChartRenderer, image_info, optimize_for_vision
+from dataset_util import ChunkedDataset
+
+CHARTS = 4
+
+# The higher-resolution figure generated code usually asks for
+CHART_CODE = """revenue = ds.groupby_sum('category', 'revenue')
+fig, ax = plt.subplots(figsize=(10, 6))
+revenue.plot(kind='bar', ax=ax, color=['#4C72B0', '#DD8452'])
+ax.set_title({title!r})
+ax.set_ylabel('Revenue ($)')
+for i, value in enumerate(revenue):
+    ax.text(i, value, f'${{value:,.0f}}', ha='center', va='bottom')
+fig.tight_layout()
+fig.savefig({output!r}, dpi=300)
+plt.close(fig)"""
+
+
+def chart_code(index: int) -> str:
+    return CHART_CODE.format(title=f"Revenue by Category #{index}", output=f"chart_{index}.png")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch) -> Path:
+    shutil.copy(SAMPLE_DATA, tmp_path / "sample_data.csv")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def ds(workdir) -> ChunkedDataset:
+    return ChunkedDataset("sample_data.csv")
+
+
+@pytest.fixture
+def rendered(ds) -> Path:
+    exec(chart_code(0), {"pd": pd, "np": np, "plt": plt, "ds": ds})
+    return Path("chart_0.png")
+
+
+def test_render_inprocess(benchmark, ds):
+    """Baseline: render CHARTS charts one after another in this process"""
+
+    def render():
+        for index in range(CHARTS):
+            exec(chart_code(index), {"pd": pd, "np": np, "plt": plt, "ds": ds})
+
+    benchmark.pedantic(render, rounds=3, iterations=1)
+    assert Path("chart_0.png").exists()
+
+
+def test_render_pool(benchmark, ds):
+    """The same charts rendered concurrently in a warm process pool, no cache"""
+    with ChartRenderer(cache_dir=None, max_workers=CHARTS) as renderer:
+        renderer.render(chart_code(0), "chart_0.png", ds).result()  # start the workers
+
+        def render():
+            futures = [renderer.render(chart_code(i), f"chart_{i}.png", ds) for i in range(CHARTS)]
+            return [future.result() for future in futures]
+
+        results = benchmark.pedantic(render, rounds=3, iterations=1)
+    assert not any(result["cached"] for result in results)
+
+
+def test_render_cached(benchmark, ds, workdir):
+    """Render-cache hits: same code and data version, no matplotlib at all"""
+    with ChartRenderer(cache_dir=str(workdir / ".chart_cache")) as renderer:
+        renderer.render(chart_code(0), "chart_0.png", ds).result()
+        result = benchmark(lambda: renderer.render(chart_code(0), "chart_0.png", ds).result())
+    assert result["cached"]
+
+
+def test_render_blocks_skip_dependents(ds, workdir):
+    """A failed block's dependents are skipped, and a stale chart never counts as rendered"""
+    Path("chart_0.png").write_bytes(b"stale")
+    blocks = ["fig = plt.figure(\nbroken", "fig.savefig('chart_0.png')", "total = len(ds.head())"]
+    with ChartRenderer(cache_dir=None, max_workers=1) as renderer:
+        result = renderer.render(blocks, "chart_0.png", ds).result()
+    assert [block["success"] for block in result["blocks"]] == [False, False, True]
+    assert result["blocks"][1]["skipped"] is False  # SyntaxError defines nothing to depend on
+    assert not result["created"]
+    assert not Path("chart_0.png").exists()
+
+    with ChartRenderer(cache_dir=None, max_workers=1) as renderer:
+        result = renderer.render(["fig = plt.figure(); 1 / 0", "fig.savefig('chart_0.png')"],
+                                 "chart_0.png", ds).result()
+    assert result["blocks"][1]["skipped"]
+    assert not result["created"]
+
+
+@pytest.mark.parametrize("fmt", ["png", "webp"])
+def test_optimize_for_vision(benchmark, rendered, fmt):
+    """Downscale + quantize cost, and bytes/tokens saved against the original"""
+    info = benchmark(optimize_for_vision, rendered, fmt=fmt)
+    benchmark.extra_info.update(
+        original=image_info(rendered),
+        optimized={k: info[k] for k in ("path", "width", "height", "bytes", "est_tokens")},
+    )
+    assert info["bytes"] < info["original_bytes"]
+    assert info["est_tokens"] < info["original_tokens"]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Time and cost of restarting from checkpoints vs full re-runs
+
+Two scenarios, replayed through working_demo:
+  retry    - turn 3 failed: re-run everything vs resume from turn 3
+  variants - N turn-2 chart variants: N full runs vs one run + N-1 forks of its turn 1
+
+Model latency and cost come from the recordings' ResultMessages; local
+seconds are measured. Run with:  python benchmark_checkpoints.py [--variants N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmark_replay import SAMPLE_DATA, record_synthetic_session
+from benchmark_summaries import recorded_model_stats
+from checkpoint_store import CheckpointStore
+from replay_util import ReplayClient
+
+import claude_code_demo
+
+
+async def run_demo(log_file: Path, **kwargs) -> dict:
+    factory = ReplayClient.factory(str(log_file), speed=None)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await claude_code_demo.working_demo(client_factory=factory, **kwargs)
+    local_seconds = time.perf_counter() - start
+    stats = recorded_model_stats(log_file)
+    return {
+        "run_id": result["run_id"],
+        "model_turns": result["turns"],
+        "local_seconds": local_seconds,
+        **stats,
+    }
+
+
+def total(runs) -> dict:
+    runs = list(runs)
+    model_seconds = sum(r["model_seconds"] for r in runs)
+    local_seconds = sum(r["local_seconds"] for r in runs)
+    return {
+        "runs": len(runs),
+        "model_turns": sum(r["model_turns"] for r in runs),
+        "local_seconds": round(local_seconds, 3),
+        "model_seconds": round(model_seconds, 3),
+        "est_latency_seconds": round(model_seconds + local_seconds, 3),
+        "cost_usd": round(sum(r["cost_usd"] for r in runs), 4),
+    }
+
+
+def saved(full: dict, resumed: dict) -> dict:
+    return {
+        "model_turns": full["model_turns"] - resumed["model_turns"],
+        "latency_seconds": round(full["est_latency_seconds"] - resumed["est_latency_seconds"], 3),
+        "cost_usd": round(full["cost_usd"] - resumed["cost_usd"], 4),
+    }
+
+
+async def benchmark(logs: dict, variants: int) -> dict:
+    store = CheckpointStore(".checkpoints")
+
+    # Scenario 1: the run died in turn 3
+    base = await run_demo(logs["full"], checkpoints=store)
+    full_retry = total([await run_demo(logs["full"], checkpoints=store)])
+    resumed_retry = total([await run_demo(logs["turn3"], checkpoints=store,
+                                          run_id=base["run_id"], from_turn=3)])
+
+    # Scenario 2: several chart variants on top of the same analysis. The
+    # checkpointed base run is the first variant; the rest fork its turn 1.
+    full_variants = total([
+        await run_demo(logs["full"], checkpoints=store, chart_notes=f"variant {i}") for i in range(variants)
+    ])
+    forked_variants = total([base] + [
+        await run_demo(logs["turns23"], checkpoints=store, run_id=base["run_id"], from_turn=2,
+                       fork=True, chart_notes=f"variant {i}")
+        for i in range(1, variants)
+    ])
+
+    return {
+        "retry": {"full_rerun": full_retry, "resume_turn3": resumed_retry,
+                  "saved": saved(full_retry, resumed_retry)},
+        "variants": {"full_reruns": full_variants, "base_plus_forks": forked_variants,
+                     "saved": saved(full_variants, forked_variants)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare checkpoint resume/fork with full re-runs")
+    parser.add_argument("--variants", type=int, default=3, help="Number of turn-2 variants to fork")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-checkpoints-"))
+    logs = {
+        "full": record_synthetic_session(workdir / "rec-full", turns=(1, 2, 3)),
+        "turns23": record_synthetic_session(workdir / "rec-turns23", turns=(2, 3)),
+        "turn3": record_synthetic_session(workdir / "rec-turn3", turns=(3,)),
+    }
+
+    shutil.copy(SAMPLE_DATA, workdir / "sample_data.csv")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(benchmark(logs, args.variants))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
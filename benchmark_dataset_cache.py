@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Parse-vs-load benchmarks for the columnar dataset cache
+
+Run with:  python -m pytest benchmark_dataset_cache.py --benchmark-only
+Set BENCH_ROWS to change the size of the generated CSV (default 500k rows),
+or BENCH_CSV to benchmark an existing file.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache
+from dataset_util import ChunkedDataset, series_to_dict
+from summary_util import group_sums, summarize_dataset
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data.csv"
+
+
+@pytest.fixture(scope="module")
+def large_csv(tmp_path_factory) -> Path:
+    """sample_data.csv tiled up to BENCH_ROWS rows with jittered numbers"""
+    existing = os.environ.get("BENCH_CSV")
+    if existing:
+        return Path(existing).absolute()
+
+    rows = int(os.environ.get("BENCH_ROWS", "500000"))
+    sample = pd.read_csv(SAMPLE_DATA)
+    repeats = -(-rows // len(sample))
+    df = pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+    rng = np.random.default_rng(0)
+    df["quantity"] = df["quantity"] + rng.integers(0, 5, len(df))
+    df["revenue"] = df["quantity"] * df["unit_price"]
+
+    path = tmp_path_factory.mktemp("data") / "sales.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="module")
+def warm_cache(large_csv, tmp_path_factory) -> DatasetCache:
+    cache = DatasetCache(str(tmp_path_factory.mktemp("cache")))
+    cache.ensure(str(large_csv))
+    return cache
+
+
+def test_parse_csv(benchmark, large_csv):
+    """Baseline: full pd.read_csv of the text file"""
+    df = benchmark(pd.read_csv, large_csv)
+    assert len(df)
+
+
+def test_load_cached(benchmark, large_csv, warm_cache):
+    """Memory-mapped load of the same data from the columnar cache"""
+    df = benchmark(warm_cache.load, str(large_csv))
+    assert len(df)
+
+
+def test_build_cache(benchmark, large_csv, tmp_path):
+    """One-off conversion cost paid on the first turn"""
+
+    def build():
+        cache = DatasetCache(str(tmp_path / "build"))
+        cache.clear()
+        return cache.ensure(str(large_csv))
+
+    benchmark.pedantic(build, rounds=3, iterations=1)
+
+
+def test_groupby_sum_csv(benchmark, large_csv):
+    """ds.groupby_sum as generated code runs it, streaming the CSV"""
+    ds = ChunkedDataset(str(large_csv))
+    assert benchmark(ds.groupby_sum, "category", "revenue").sum() > 0
+
+
+def test_groupby_sum_cached(benchmark, large_csv, warm_cache):
+    """ds.groupby_sum over memory-mapped columns"""
+    ds = ChunkedDataset(str(large_csv), cache=warm_cache)
+    assert benchmark(ds.groupby_sum, "category", "revenue").sum() > 0
+
+
+def test_cached_matches_csv(large_csv, warm_cache):
+    """The cache must hand back the same values the CSV parses to"""
+    parsed = pd.read_csv(large_csv)
+    cached = warm_cache.load(str(large_csv))
+    assert list(cached.columns) == list(parsed.columns)
+    for column in parsed.columns:
+        assert (cached[column].astype(str).to_numpy() == parsed[column].astype(str).to_numpy()).all(), column
+
+
+def test_mixed_type_column_round_trip(tmp_path):
+    """A column that parses as numbers in some chunks and text in others keeps every value"""
+    path = tmp_path / "mixed.csv"
+    # Chunks of 2 rows: ints with leading zeros, ints, floats with a gap, then text
+    path.write_text("id,code,amount\n"
+                    "1,007,1\n2,010,2\n"
+                    "3,8,3\n4,9,4.5\n"
+                    "5,9.5,\n6,,6\n"
+                    "7,abc,7\n8,0042,8\n")
+    cache = DatasetCache(str(tmp_path / "cache"), chunksize=2)
+    parsed = pd.read_csv(path)
+    cached = cache.load(str(path))
+    assert cached["code"].dtype == "category"
+    pd.testing.assert_frame_equal(cached.astype({"code": object}).copy(), parsed, check_dtype=False)
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["csv", "cache"])
+def test_summary_matches_groupby_sum(tmp_path, cached):
+    """Precomputed group sums agree with ds.groupby_sum, including missing keys
+
+    ``note`` is numeric for the first chunks and text later, so only
+    inference over every chunk keeps it out of the numeric sums.
+    """
+    rows = 120
+    frame = pd.DataFrame({
+        "category": [["A", "B", None][i % 3] for i in range(rows)],
+        "revenue": [float(i) for i in range(rows)],
+        "note": [str(i) if i < 100 else "tbd" for i in range(rows)],
+    })
+    path = tmp_path / "sales.csv"
+    frame.to_csv(path, index=False)
+    cache = DatasetCache(str(tmp_path / "cache")) if cached else None
+    ds = ChunkedDataset(str(path), chunksize=50, cache=cache)
+
+    summary = summarize_dataset(ds)
+    assert list(summary["numeric"]) == ["revenue"]
+    expected = series_to_dict(ds.groupby_sum("category", "revenue"))
+    assert group_sums(summary, "category", "revenue") == expected
+    assert set(expected) == {"A", "B", "nan"}
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the analytics pipeline, driven by recorded session logs
+
+Run with:  python -m pytest benchmark_replay.py --benchmark-only
+Set REPLAY_LOG=logs/<session>.jsonl to benchmark against a real recording;
+otherwise a synthetic session is recorded with ResponseLogger first.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pytest
+
+from checkpoint_store import Checkpoint, CheckpointStore
+from code_stream import CodeBlockParser, extract_code_blocks
+from dataset_util import ChunkedDataset, profile_dataset
+from logger_util import ResponseLogger
+from model_router import ModelRouter, SuccessStats
+from replay_util import ReplayClient, load_session_log
+
+import claude_code_demo
+
+SAMPLE_DATA = Path(__file__).parent / "sample_data.csv"
+
+TURN1_CODE = """print(ds.shape, ds.columns)
+print(ds.head(3))
+result = {
+    'shape': ds.shape,
+    'columns': ds.columns,
+    'revenue_by_category': ds.groupby_sum('category', 'revenue'),
+}"""
+
+TURN2_CODE = """import matplotlib.pyplot as plt
+revenue = ds.groupby_sum('category', 'revenue')
+fig, ax = plt.subplots(figsize=(8, 5))
+revenue.plot(kind='bar', ax=ax, color=['#4C72B0', '#DD8452'])
+ax.set_title('Revenue by Category')
+ax.set_ylabel('Revenue ($)')
+fig.tight_layout()
+fig.savefig('analytics_chart.png')
+plt.close(fig)"""
+
+TURN3_TEXT = "Electronics dominates revenue; consider bundling accessories with laptop sales."
+
+
+# Minimal stand-ins for the SDK message types, shaped like claude_code_sdk's dataclasses
+@dataclass
+class TextBlock:
+    text: str
+
+
+@dataclass
+class AssistantMessage:
+    content: List[Any]
+    model: str = "claude-sonnet-4-0"
+
+
+@dataclass
+class StreamEvent:
+    uuid: str
+    session_id: str
+    event: Dict[str, Any]
+    parent_tool_use_id: Optional[str] = None
+
+
+@dataclass
+class ResultMessage:
+    subtype: str = "success"
+    duration_ms: int = 0
+    duration_api_ms: int = 0
+    is_error: bool = False
+    num_turns: int = 1
+    session_id: str = "replay-session"
+    total_cost_usd: Optional[float] = None
+    usage: Optional[Dict[str, Any]] = None
+    result: Optional[str] = None
+
+
+# Characters per synthetic text delta
+STREAM_CHUNK = 24
+
+SYNTHETIC_TURNS = {
+    1: (f"Here is the analysis:\n```python\n{TURN1_CODE}\n```\n", 0.011, 8000),
+    2: (f"Here is the chart code:\n```python\n{TURN2_CODE}\n```\n", 0.026, 15000),
+    3: (TURN3_TEXT, 0.050, 20000),
+}
+
+
+def record_synthetic_session(log_dir: Path, turns: Sequence[int] = (1, 2, 3)) -> Path:
+    """Record a session in the format working_demo produces, plus text deltas
+
+    Each turn's text is also streamed as StreamEvent text deltas before its
+    AssistantMessage, as the live SDK delivers it with
+    include_partial_messages, so replays exercise the streaming path
+    (working_demo's own logs keep only the assembled AssistantMessage). Timestamps are
+    rewritten so the deltas spread over the first 80% of the turn and its
+    ResultMessage lands ``duration_ms`` after its query, giving
+    ReplayClient realistic gaps.
+    """
+    logger = ResponseLogger(log_dir=str(log_dir))
+    logger.init_session("synthetic")
+    for turn in turns:
+        text, cost, duration_ms = SYNTHETIC_TURNS[turn]
+        logger.log_query(f"synthetic query {turn}", turn=turn)
+        for i in range(0, len(text), STREAM_CHUNK):
+            logger.log_response(StreamEvent(uuid=f"{turn}-{i}", session_id=f"replay-session-{turns[0]}",
+                                            event={"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": text[i:i + STREAM_CHUNK]}}),
+                                turn=turn)
+        logger.log_response(AssistantMessage(content=[TextBlock(text)]), turn=turn)
+        logger.log_response(ResultMessage(duration_ms=duration_ms, duration_api_ms=duration_ms,
+                                          session_id=f"replay-session-{turns[0]}", total_cost_usd=cost,
+                                          usage={"input_tokens": 1000, "output_tokens": 400}),
+                            turn=turn)
+    logger.close_session({"success": True})
+
+    entries = [json.loads(line) for line in logger.log_file.read_text().splitlines()]
+    clock = datetime.fromisoformat(entries[0]["timestamp"])
+    for entry in entries:
+        if entry["event_type"] == "response":
+            text, _, duration_ms = SYNTHETIC_TURNS[entry["turn"]]
+            duration = duration_ms / 1000
+            if entry["message_type"] == "StreamEvent":
+                offset = int(entry["response_data"]["uuid"].split("-")[1]) + STREAM_CHUNK
+                fraction = 0.8 * min(offset, len(text)) / len(text)
+            else:
+                fraction = 1.0 if entry["message_type"] == "ResultMessage" else 0.8
+            entry["timestamp"] = (clock + timedelta(seconds=duration * fraction)).isoformat()
+            if entry["message_type"] == "ResultMessage":
+                clock += timedelta(seconds=duration)
+        else:
+            entry["timestamp"] = clock.isoformat()
+    logger.log_file.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    return logger.log_file
+
+
+@pytest.fixture(scope="session")
+def replay_log(tmp_path_factory) -> Path:
+    recorded = os.environ.get("REPLAY_LOG")
+    if recorded:
+        return Path(recorded).absolute()
+    return record_synthetic_session(tmp_path_factory.mktemp("recordings"))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch) -> Path:
+    shutil.copy(SAMPLE_DATA, tmp_path / "sample_data.csv")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_working_demo_replay(benchmark, replay_log, workdir, capsys):
+    """End-to-end overhead of working_demo with the model replaced by a recording"""
+    factory = ReplayClient.factory(str(replay_log), speed=None)
+
+    def run():
+        return asyncio.run(claude_code_demo.working_demo(client_factory=factory))
+
+    result = benchmark.pedantic(run, rounds=10, iterations=1)
+    assert result["success"]
+    assert result["chart_created"]
+
+
+@pytest.mark.parametrize("agrees", [True, False], ids=["accepted", "cancelled"])
+def test_speculative_demo_replay(benchmark, tmp_path_factory, workdir, agrees):
+    """DAG scheduling overhead, with the speculative turn 2 kept or re-issued"""
+    recordings = tmp_path_factory.mktemp("speculative")
+    main_log = record_synthetic_session(recordings / "main", turns=(1,) if agrees else (1, 2, 3))
+    spec_log = record_synthetic_session(recordings / "spec", turns=(2, 3))
+
+    def run():
+        return asyncio.run(claude_code_demo.speculative_demo(
+            # When cancelling, give turn 1 some latency so the speculative turn 2 is under way
+            client_factory=ReplayClient.factory(str(main_log), speed=None if agrees else 100),
+            speculative_factory=ReplayClient.factory(str(spec_log), speed=None),
+            agrees=lambda predicted, actual: agrees,
+        ))
+
+    result = benchmark.pedantic(run, rounds=5, iterations=1)
+    assert result["chart_created"]
+    assert result["speculation"] == ("accepted" if agrees else "cancelled")
+    # The discarded speculative turn 2 is still charged, exactly or by estimate
+    assert result["costs"]["turn2 (speculative)"] > 0
+    assert ("turn2 (after turn 1)" in result["costs"]) != agrees
+
+
+def test_resume_reruns_turn2_without_chart(tmp_path_factory, workdir):
+    """A turn-2 checkpoint without a chart is re-run, and counted as run, not restored"""
+    store = CheckpointStore(str(workdir / ".checkpoints"))
+    run_id = store.new_run()
+    store.save(Checkpoint(run_id, 1, query="q1", session_id="s1", cost_usd=0.011,
+                          result={"revenue_by_category": {"Electronics": 3500.0, "Accessories": 375.0}}))
+    store.save(Checkpoint(run_id, 2, query="q2", session_id="s2", cost_usd=0.026,
+                          result={"chart_created": False, "code": None}))
+    assert store.latest_run(upto_turn=2) == run_id
+    assert store.latest_run(upto_turn=2, artifacts={2: claude_code_demo.CHART_FILE}) is None
+
+    log = record_synthetic_session(tmp_path_factory.mktemp("rerun"), turns=(2, 3))
+    result = asyncio.run(claude_code_demo.working_demo(
+        client_factory=ReplayClient.factory(str(log), speed=None),
+        checkpoints=store, run_id=run_id, from_turn=3,
+    ))
+    assert result["chart_created"]
+    assert result["turns"] == 2
+    assert result["turns_restored"] == 1
+    assert result["total_cost"] == pytest.approx(0.026 + 0.050)
+    assert store.has_artifact(run_id, 2, claude_code_demo.CHART_FILE)
+
+
+def test_results_agree_requires_turn1_result():
+    predicted = {"revenue_by_category": {"Electronics": 10.0, "Accessories": 2.5}}
+    assert claude_code_demo.results_agree(predicted, {"revenue_by_category": {"Accessories": 2.5, "Electronics": 10.0}})
+    assert not claude_code_demo.results_agree(predicted, None)
+    assert not claude_code_demo.results_agree(predicted, {"shape": (3, 4)})
+
+
+def test_routed_demo_replay(benchmark, replay_log, workdir):
+    """Routing overhead, including the model switch that resumes the session"""
+    factory = ReplayClient.factory(str(replay_log), speed=None)
+
+    def run():
+        return asyncio.run(claude_code_demo.working_demo(client_factory=factory, router=ModelRouter()))
+
+    result = benchmark.pedantic(run, rounds=5, iterations=1)
+    assert result["chart_created"]
+    assert [route["tier"] for route in result["routes"]] == ["haiku", "sonnet", "sonnet"]
+
+
+@pytest.mark.parametrize("trial_succeeds", [True, False])
+def test_router_explores_cheaper_tier(trial_succeeds):
+    """The cheaper tier gets trial turns until it can be judged; a failed trial escalates"""
+    router = ModelRouter(explore_every=2)
+    tiers = []
+    for _ in range(12):
+        route = router.route("chart")
+        tiers.append(route.tier)
+        if route.tier == "haiku":
+            router.stats.record("chart", "haiku", success=trial_succeeds)
+        else:
+            router.stats.record("chart", "sonnet", success=True)
+
+    if trial_succeeds:
+        # Every other route trials haiku until it has 3 successes, then it takes over
+        assert tiers[:6] == ["sonnet", "haiku"] * 3
+        assert set(tiers[6:]) == {"haiku"}
+    else:
+        assert tiers == ["sonnet", "haiku"] + ["sonnet"] * 10
+    assert ModelRouter(explore_every=0).route("chart").tier == "sonnet"
+
+
+@dataclass
+class Message:
+    """Stand-in for an Anthropic messages.create response, as the MCP client logs it"""
+    stop_reason: str = "end_turn"
+    model: str = "claude-3-5-haiku-latest"
+
+
+def test_success_stats_from_mcp_client_logs(tmp_path):
+    """tool_select / tool_answer outcomes logged by the MCP client feed the router"""
+    logger = ResponseLogger(log_dir=str(tmp_path))
+    logger.init_session("mcp")
+    outcomes = [("tool_select", "end_turn", True), ("tool_select", "tool_use", False),
+                ("tool_answer", "max_tokens", True), ("tool_answer", "end_turn", True)]
+    for turn, (step, stop_reason, tool_ok) in enumerate(outcomes, start=1):
+        logger.log_query("weather in Paris?", turn=turn)
+        logger.log_route({"step": step, "tier": "haiku", "model": Message.model}, turn=turn)
+        logger.log_response(Message(stop_reason=stop_reason), turn=turn, context={"duration_ms": 800})
+        logger.log_execution("get_forecast({})", None, turn=turn, success=tool_ok)
+    logger.close_session()
+
+    stats = SuccessStats.from_logs(str(tmp_path))
+    assert stats.summary() == {
+        "tool_answer/haiku": {"attempts": 2, "successes": 1, "max_turn_errors": 0},
+        "tool_select/haiku": {"attempts": 2, "successes": 1, "max_turn_errors": 0},
+    }
+
+
+def test_replay_stream(benchmark, replay_log):
+    """Cost of the replay transport itself: rebuilding and yielding every message"""
+
+    async def drain():
+        count = 0
+        async with ReplayClient(str(replay_log), speed=None) as client:
+            for turn in client.turns:
+                await client.query(turn.prompt)
+                async for _ in client.receive_response():
+                    count += 1
+        return count
+
+    assert benchmark(lambda: asyncio.run(drain())) > 0
+
+
+def test_logger_log_response(benchmark, tmp_path):
+    """Per-message cost of ResponseLogger serialization and JSONL append"""
+    logger = ResponseLogger(log_dir=str(tmp_path))
+    logger.init_session("bench")
+    message = AssistantMessage(content=[TextBlock(TURN3_TEXT * 20)])
+    benchmark(logger.log_response, message, turn=1)
+
+
+def test_profile_dataset(benchmark, workdir):
+    """Chunked profiling pass used to build the turn-1 prompt"""
+    profile = benchmark(profile_dataset, "sample_data.csv", group_by={"category": ["revenue"]})
+    assert profile["aggregates"]["revenue_by_category"]
+
+
+def test_execute_turn1_code(benchmark, replay_log, workdir):
+    """Execution time of the recorded turn-1 analysis code"""
+    recorded = load_session_log(str(replay_log))
+    code = next((e["code"] for t in recorded for e in t.executions if e.get("turn") == 1), TURN1_CODE)
+    compiled = compile(code, "<turn1>", "exec")
+
+    def run():
+        exec_globals = {"pd": claude_code_demo.pd, "np": claude_code_demo.np,
+                        "ds": ChunkedDataset("sample_data.csv")}
+        exec(compiled, exec_globals)
+        return exec_globals.get("result")
+
+    assert benchmark(run) is not None
+
+
+def test_stream_code_blocks(benchmark, replay_log):
+    """Incremental fence parsing over the recorded text, fed in small pieces"""
+    text = "".join(
+        block.get("text", "")
+        for turn in load_session_log(str(replay_log))
+        for entry in turn.responses
+        if entry.get("message_type") == "AssistantMessage"
+        for block in (entry.get("response_data") or {}).get("content") or []
+        if isinstance(block, dict)
+    ) or f"```python\n{TURN1_CODE}\n```\n"
+    pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    def parse():
+        parser = CodeBlockParser()
+        for piece in pieces:
+            parser.feed(piece)
+        parser.close()
+        return parser.blocks
+
+    assert benchmark(parse) == extract_code_blocks(text)
+
+
+def test_stream_unterminated_block(benchmark):
+    """A final block whose closing fence never arrives is returned exactly once"""
+    text = f"Here is the analysis:\n```python\n{TURN1_CODE}\n```\nand the chart:\n```python\n{TURN2_CODE}"
+    pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    def parse():
+        parser = CodeBlockParser()
+        for piece in pieces:
+            parser.feed(piece)
+        parser.close()
+        return parser.blocks
+
+    assert benchmark(parse) == extract_code_blocks(text) == [TURN1_CODE, TURN2_CODE]
+
+
+def test_collect_response_text_deltas(benchmark, replay_log, workdir):
+    """Streamed turn-1 code runs once, from its text deltas, not again from the AssistantMessage"""
+    logger = ResponseLogger(log_dir=str(workdir / "logs"))
+    logger.init_session("deltas")
+
+    async def turn1():
+        async with ReplayClient(str(replay_log), speed=None) as client:
+            await client.query(client.turns[0].prompt)
+            exec_globals = {"pd": claude_code_demo.pd, "np": claude_code_demo.np, "ds": ChunkedDataset("sample_data.csv")}
+            executor = claude_code_demo.IncrementalExecutor(exec_globals)
+            response, _ = await claude_code_demo.collect_response(client, logger, turn=1,
+                                                                  executor=executor, echo=False)
+            return response, await executor.finish()
+
+    response, blocks = benchmark(lambda: asyncio.run(turn1()))
+    assert len(blocks) == len(extract_code_blocks(response)) == 1
+    assert blocks[0]["success"]
+    # The deltas are not logged one by one; the AssistantMessage carries the text
+    logged = [entry["message_type"] for entry in logger.responses]
+    assert "StreamEvent" not in logged and "AssistantMessage" in logged
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Latency and cost of per-turn model routing vs one pinned model
+
+Replays a recorded session through working_demo three ways:
+  pinned   - every turn on the recorded (default) model
+  routed   - ModelRouter with no history: the policy's default tier per step
+  history  - ModelRouter tuned by logged outcomes in which haiku often failed
+             the analysis turn but always got the chart right
+
+Replay cannot rerun a turn on another model, so each turn's recorded cost,
+duration and token usage are re-priced for the routed model
+(model_router.reprice), plus --switch-seconds per model switch for
+reconnecting and resuming the session. Local seconds are measured.
+
+Run with:  python benchmark_routing.py [--log LOG] [--switch-seconds 1.5]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmark_replay import SAMPLE_DATA, ResultMessage, record_synthetic_session
+from logger_util import ResponseLogger
+from model_router import DEFAULT_TIER, MODELS, ModelRouter, SuccessStats, reprice, tier_of
+from replay_util import ReplayClient, load_session_log
+
+import claude_code_demo
+
+
+def record_history(log_dir: Path, outcomes: dict) -> Path:
+    """Write routed session logs with the given outcomes
+
+    Args:
+        outcomes: {(turn, step, tier): [True, False, ...]}; session i logs each
+            turn's i-th outcome
+    """
+    logger = ResponseLogger(log_dir=str(log_dir))
+    sessions = max(len(results) for results in outcomes.values())
+    for i in range(sessions):
+        logger.init_session(f"history{i}")
+        for (turn, step, tier), results in outcomes.items():
+            if i >= len(results):
+                continue
+            logger.log_query(f"history query {turn}", turn=turn)
+            logger.log_route({"step": step, "tier": tier, "model": MODELS[tier].model}, turn=turn)
+            logger.log_response(ResultMessage(duration_ms=5000, total_cost_usd=0.01), turn=turn)
+            logger.log_execution("# history", None, turn=turn, success=results[i])
+        logger.close_session({"success": True})
+    return log_dir
+
+
+def recorded_turns(log_file: Path) -> dict:
+    """turn -> recorded tier, cost, duration and usage of its ResultMessage"""
+    turns = {}
+    for recorded in load_session_log(str(log_file)):
+        model = next((entry["response_data"].get("model") for entry in recorded.responses
+                      if entry.get("message_type") == "AssistantMessage"), None)
+        for entry in recorded.responses:
+            if entry.get("message_type") == "ResultMessage":
+                data = entry.get("response_data") or {}
+                turns[recorded.turn] = {
+                    "tier": tier_of(model) if model else DEFAULT_TIER,
+                    "cost_usd": data.get("total_cost_usd") or 0,
+                    "duration_ms": data.get("duration_ms") or 0,
+                    "usage": data.get("usage") or {},
+                }
+    return turns
+
+
+async def run(log_file: Path, router: ModelRouter = None) -> dict:
+    factory = ReplayClient.factory(str(log_file), speed=None)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await claude_code_demo.working_demo(client_factory=factory, router=router)
+    return {"result": result, "local_seconds": time.perf_counter() - start}
+
+
+def estimate(recorded: dict, routes: list, local_seconds: float, switch_seconds: float) -> dict:
+    routes_by_turn = {turn: route for turn, route in zip(sorted(recorded), routes)}
+    cost = seconds = 0.0
+    models = {}
+    for turn, data in sorted(recorded.items()):
+        route = routes_by_turn.get(turn)
+        tier = route["tier"] if route else data["tier"]
+        turn_cost, turn_seconds = reprice(data["cost_usd"], data["duration_ms"], data["usage"],
+                                          data["tier"], tier, route["max_tokens"] if route else None)
+        cost += turn_cost
+        seconds += turn_seconds
+        models[turn] = MODELS[tier].model
+    switches = sum(1 for a, b in zip(routes, routes[1:])
+                   if (a["model"], a["max_turns"]) != (b["model"], b["max_turns"]))
+    return {
+        "models": models,
+        "switches": switches,
+        "model_seconds": round(seconds, 3),
+        "switch_seconds": round(switches * switch_seconds, 3),
+        "local_seconds": round(local_seconds, 3),
+        "est_latency_seconds": round(seconds + switches * switch_seconds + local_seconds, 3),
+        "cost_usd": round(cost, 4),
+    }
+
+
+async def benchmark(log_file: Path, history_dir: Path, switch_seconds: float) -> dict:
+    recorded = recorded_turns(log_file)
+    history = SuccessStats.from_logs(str(history_dir))
+    scenarios = {
+        "pinned": None,
+        "routed": ModelRouter(),
+        "history": ModelRouter(stats=history),
+    }
+
+    # Warm the dataset and render caches so every scenario sees the same local work
+    await run(log_file)
+
+    report = {}
+    for name, router in scenarios.items():
+        outcome = await run(log_file, router)
+        routes = outcome["result"]["routes"]
+        report[name] = estimate(recorded, routes, outcome["local_seconds"], switch_seconds)
+        report[name]["success"] = outcome["result"]["success"]
+        if routes:
+            report[name]["reasons"] = {route["step"]: route["reasons"] for route in routes}
+
+    pinned = report["pinned"]
+    for name in ("routed", "history"):
+        report[name]["saved_seconds"] = round(pinned["est_latency_seconds"] - report[name]["est_latency_seconds"], 3)
+        report[name]["saved_usd"] = round(pinned["cost_usd"] - report[name]["cost_usd"], 4)
+        report[name]["cost_ratio"] = round(report[name]["cost_usd"] / pinned["cost_usd"], 3)
+    report["history_stats"] = history.summary()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn model routing vs a pinned model")
+    parser.add_argument("--log", help="Recorded session to replay (default: a synthetic one)")
+    parser.add_argument("--switch-seconds", type=float, default=1.5,
+                        help="Assumed cost of reconnecting to switch model between turns")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-routing-"))
+    log_file = Path(args.log).absolute() if args.log else record_synthetic_session(workdir / "rec-full")
+    history_dir = record_history(workdir / "history", {
+        (1, "analysis", "haiku"): [True, False, True, False, True],
+        (2, "chart", "haiku"): [True, True, True, True, True],
+    })
+
+    shutil.copy(SAMPLE_DATA, workdir / "sample_data.csv")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(benchmark(log_file, history_dir, args.switch_seconds))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+End-to-end wall time of the speculative DAG pipeline vs the sequential demo
+
+Replays recorded sessions with their recorded model latencies (divided by
+--speed) through:
+  sequential  - working_demo, turns strictly one after another
+  speculative - speculative_demo, turn 2 issued from local aggregates while
+                turn 1 runs, accepted after reconciliation
+  rejected    - speculative_demo forced to disagree, so turn 2 is cancelled
+                and re-issued after turn 1 (the mis-speculation worst case)
+
+Run with:  python benchmark_speculative.py [--speed 10] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmark_replay import SAMPLE_DATA, record_synthetic_session
+from replay_util import ReplayClient
+
+import claude_code_demo
+
+
+async def timed(coro_fn) -> dict:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await coro_fn()
+    return {"wall_seconds": time.perf_counter() - start, "turns": result["turns"],
+            "cost_usd": result["total_cost"], "speculation": result.get("speculation"),
+            "turns_cancelled": result.get("turns_cancelled", 0),
+            "estimated_costs": result.get("estimated_costs", [])}
+
+
+async def benchmark(logs: dict, speed: float, repeat: int) -> dict:
+    def replay(name):
+        return ReplayClient.factory(str(logs[name]), speed=speed)
+
+    scenarios = {
+        "sequential": lambda: claude_code_demo.working_demo(client_factory=replay("full")),
+        "speculative": lambda: claude_code_demo.speculative_demo(
+            client_factory=replay("turn1"), speculative_factory=replay("turns23")),
+        "rejected": lambda: claude_code_demo.speculative_demo(
+            client_factory=replay("full"), speculative_factory=replay("turns23"),
+            agrees=lambda predicted, actual: False),
+    }
+
+    report = {}
+    for name, run in scenarios.items():
+        samples = [await timed(run) for _ in range(repeat)]
+        walls = [sample["wall_seconds"] for sample in samples]
+        report[name] = {
+            "wall_seconds": round(statistics.median(walls), 3),
+            "min_seconds": round(min(walls), 3),
+            "model_turns": samples[-1]["turns"],
+            "cost_usd": round(samples[-1]["cost_usd"], 4),
+            "turns_cancelled": samples[-1]["turns_cancelled"],
+            "estimated_costs": samples[-1]["estimated_costs"],
+            "speculation": samples[-1]["speculation"],
+        }
+
+    sequential = report["sequential"]["wall_seconds"]
+    for name in ("speculative", "rejected"):
+        report[name]["speedup"] = round(sequential / report[name]["wall_seconds"], 2)
+        report[name]["saved_seconds"] = round(sequential - report[name]["wall_seconds"], 3)
+    report["replay_speed"] = speed
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative DAG pipeline vs sequential turns")
+    parser.add_argument("--speed", type=float, default=10.0,
+                        help="Replay speed multiplier (1 = recorded model latency)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario (median reported)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-speculative-"))
+    logs = {
+        "full": record_synthetic_session(workdir / "rec-full", turns=(1, 2, 3)),
+        "turn1": record_synthetic_session(workdir / "rec-turn1", turns=(1,)),
+        "turns23": record_synthetic_session(workdir / "rec-turns23", turns=(2, 3)),
+    }
+
+    shutil.copy(SAMPLE_DATA, workdir / "sample_data.csv")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(benchmark(logs, args.speed, args.repeat))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
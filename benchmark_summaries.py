@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Turns and latency saved by precomputed summaries (working_demo --precompute)
+
+Replays a full three-turn session and a precompute-mode session (turns 2-3
+only) through working_demo and reports model turns, recorded model latency,
+local overhead and cost for each.
+
+Run with:  python benchmark_summaries.py [--full LOG --precompute LOG]
+Without logs, synthetic sessions are recorded first.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+from benchmark_replay import SAMPLE_DATA, record_synthetic_session
+from replay_util import ReplayClient, load_session_log
+
+import claude_code_demo
+
+
+def recorded_model_stats(log_file: Path) -> dict:
+    """Sum duration and cost over the ResultMessages in a recorded session"""
+    seconds = 0.0
+    cost = 0.0
+    for turn in load_session_log(str(log_file)):
+        for entry in turn.responses:
+            if entry.get("message_type") == "ResultMessage":
+                data = entry.get("response_data") or {}
+                seconds += (data.get("duration_ms") or 0) / 1000
+                cost += data.get("total_cost_usd") or 0
+    return {"model_seconds": round(seconds, 3), "cost_usd": round(cost, 4)}
+
+
+async def run_mode(log_file: Path, precompute: bool) -> dict:
+    factory = ReplayClient.factory(str(log_file), speed=None)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await claude_code_demo.working_demo(client_factory=factory, precompute=precompute)
+    local_seconds = time.perf_counter() - start
+
+    stats = recorded_model_stats(log_file)
+    return {
+        "model_turns": result["turns"],
+        "turns_skipped": result.get("turns_skipped", 0),
+        "local_seconds": round(local_seconds, 3),
+        **stats,
+        "est_latency_seconds": round(stats["model_seconds"] + local_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare working_demo with and without precomputed summaries")
+    parser.add_argument("--full", help="Recorded session of a normal three-turn run")
+    parser.add_argument("--precompute", help="Recorded session of a --precompute run")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-summaries-"))
+    full_log = Path(args.full).absolute() if args.full else record_synthetic_session(workdir / "rec-full", turns=(1, 2, 3))
+    pre_log = Path(args.precompute).absolute() if args.precompute else record_synthetic_session(workdir / "rec-precompute", turns=(2, 3))
+
+    shutil.copy(SAMPLE_DATA, workdir / "sample_data.csv")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = {
+            "full": asyncio.run(run_mode(full_log, precompute=False)),
+            # First precompute run pays for the summary; the second hits its cache
+            "precompute_cold": asyncio.run(run_mode(pre_log, precompute=True)),
+            "precompute_warm": asyncio.run(run_mode(pre_log, precompute=True)),
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    full, warm = report["full"], report["precompute_warm"]
+    report["saved"] = {
+        "model_turns": full["model_turns"] - warm["model_turns"],
+        "latency_seconds": round(full["est_latency_seconds"] - warm["est_latency_seconds"], 3),
+        "cost_usd": round(full["cost_usd"] - warm["cost_usd"], 4),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
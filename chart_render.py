@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Background chart rendering and vision-sized image variants
+
+ChartRenderer runs chart code in a process pool with the Agg backend and
+caches the resulting image by code + dataset fingerprint, so a re-run with
+the same data skips matplotlib entirely. optimize_for_vision writes a
+downscaled, palette-quantized copy of a chart for image analysis turns,
+which are billed by pixel count rather than file size.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from PIL import Image, features
+
+
+RENDER_VERSION = 1
+VISION_MAX_SIDE = 768
+VISION_COLORS = 64
+# Images whose long edge exceeds this are downscaled server-side before analysis
+API_MAX_SIDE = 1568
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Approximate vision input tokens for an image (width * height / 750)"""
+    scale = min(1.0, API_MAX_SIDE / max(width, height))
+    return math.ceil((width * scale) * (height * scale) / 750)
+
+
+def image_info(path) -> Dict[str, Any]:
+    """Dimensions, file size and estimated tokens of an image file"""
+    path = Path(path)
+    with Image.open(path) as image:
+        width, height = image.size
+    return {
+        "path": str(path),
+        "width": width,
+        "height": height,
+        "bytes": path.stat().st_size,
+        "est_tokens": estimate_image_tokens(width, height),
+    }
+
+
+def optimize_for_vision(src, dst=None, max_side: int = VISION_MAX_SIDE,
+                        colors: int = VISION_COLORS, fmt: str = "png") -> Dict[str, Any]:
+    """Write a downscaled, palette-quantized copy of a chart
+
+    Args:
+        src: Rendered chart image
+        dst: Output path (default: ``<stem>.vision.<fmt>`` next to ``src``)
+        max_side: Longest edge of the output in pixels
+        colors: Palette size; flat chart colors survive 32-64 colors intact
+        fmt: "png" or "webp" (falls back to png if Pillow lacks WebP support)
+
+    Returns:
+        image_info of the output plus the original's bytes and est_tokens
+    """
+    src = Path(src)
+    fmt = fmt.lower()
+    if fmt == "webp" and not features.check("webp"):
+        fmt = "png"
+    dst = Path(dst) if dst else src.with_name(f"{src.stem}.vision.{fmt}")
+
+    with Image.open(src) as image:
+        original = {"bytes": src.stat().st_size, "est_tokens": estimate_image_tokens(*image.size)}
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if fmt == "webp":
+            image.save(dst, "WEBP", quality=80, method=6)
+        else:
+            image = image.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
+            image.save(dst, "PNG", optimize=True)
+
+    info = image_info(dst)
+    info["original_bytes"] = original["bytes"]
+    info["original_tokens"] = original["est_tokens"]
+    return info
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_job(blocks: List[str], output: str, ds, cache_path: Optional[str]) -> Dict[str, Any]:
+    """Execute chart code blocks in a worker process
+
+    Blocks run in order in one namespace; a block that depends on a failed
+    one is skipped (code_stream.run_blocks).
+
+    Returns:
+        {"seconds": render seconds, "blocks": per-block results}
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+    from code_stream import run_blocks
+
+    start = time.perf_counter()
+    try:
+        results = run_blocks(blocks, {"pd": pd, "np": np, "plt": plt, "ds": ds})
+    finally:
+        plt.close("all")
+    seconds = time.perf_counter() - start
+
+    if cache_path and Path(output).exists() and all(block["success"] for block in results):
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        shutil.copyfile(output, tmp_path)
+        os.replace(tmp_path, cache_path)
+    return {"seconds": seconds, "blocks": results}
+
+
+def _as_blocks(code: Union[str, Sequence[str]]) -> List[str]:
+    return [code] if isinstance(code, str) else list(code)
+
+
+def render_key(code: Union[str, Sequence[str]], output: str, ds=None) -> str:
+    """Cache key for a render: the code, output name and dataset version"""
+    fingerprint: Dict[str, Any] = {"code": "\n\n".join(_as_blocks(code)), "output": Path(output).name, "version": RENDER_VERSION}
+    if ds is not None:
+        stat = ds.path.stat()
+        fingerprint.update(source=str(ds.path.resolve()), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ChartRenderer:
+    """Process-pool chart renderer with an on-disk render cache
+
+    Chart code runs in worker processes with the Agg backend, so several
+    charts render in parallel and matplotlib never touches the caller's
+    process. The pool is started on first use and reused until close().
+    """
+
+    def __init__(self, cache_dir: Optional[str] = ".chart_cache", max_workers: int = None,
+                 mp_context=None):
+        """
+        Args:
+            cache_dir: Where rendered images are cached; None disables caching
+            max_workers: Pool size (default: CPU count)
+            mp_context: multiprocessing context for the workers (default: the
+                platform's); long-lived hosts with threads and a running event
+                loop should pass a "spawn" or "forkserver" context
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context,
+                                             initializer=_init_worker)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _cache_path(self, key: str, output: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}{Path(output).suffix or '.png'}"
+
+    def render(self, code: Union[str, Sequence[str]], output: str, ds=None) -> Future:
+        """Render ``code`` (which saves ``output``) in the pool
+
+        ``code`` is one string or a list of code blocks; blocks run in order
+        and a block depending on a failed one is skipped. Any existing
+        ``output`` is removed first, so a file left by an earlier run never
+        passes for this render's result.
+
+        Returns a Future resolving to {output, key, cached, seconds, blocks,
+        created}. A cache hit copies the stored image to ``output`` and
+        resolves immediately.
+        """
+        blocks = _as_blocks(code)
+        key = render_key(blocks, output, ds)
+        cache_path = self._cache_path(key, output)
+        Path(output).unlink(missing_ok=True)
+        if cache_path is not None and cache_path.exists():
+            start = time.perf_counter()
+            shutil.copyfile(cache_path, output)
+            future = Future()
+            future.set_result({"output": str(output), "key": key, "cached": True,
+                               "seconds": time.perf_counter() - start, "blocks": [], "created": True})
+            return future
+
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+        job = self.pool.submit(_render_job, blocks, str(output), ds, str(cache_path) if cache_path else None)
+        future = Future()
+
+        def done(job_future: Future):
+            error = job_future.exception()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                outcome = job_future.result()
+                future.set_result({"output": str(output), "key": key, "cached": False,
+                                   "seconds": outcome["seconds"], "blocks": outcome["blocks"],
+                                   "created": Path(output).exists()})
+
+        job.add_done_callback(done)
+        return future
+
+    async def render_async(self, code: Union[str, Sequence[str]], output: str, ds=None) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.render(code, output, ds))
+
+    def optimize(self, src, **kwargs) -> Future:
+        """optimize_for_vision in the pool; same arguments"""
+        return self.pool.submit(optimize_for_vision, str(src), **kwargs)
+
+    async def optimize_async(self, src, **kwargs) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.optimize(src, **kwargs))
+
+    def clear(self):
+        """Remove every cached render"""
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Per-turn checkpoints for resuming and forking demo runs
+
+Each run is a directory of turn_<n>.json files holding the turn's query,
+model output, execution result, cost and SDK session id, plus copies of
+any files the turn produced (the chart). A run can be restarted from any
+turn by restoring the earlier checkpoints and resuming the SDK session,
+or forked into new runs that share a checkpointed prefix.
+"""
+
+import json
+import shutil
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from dataset_util import series_to_dict, to_python
+
+
+def _jsonable(obj: Any) -> Any:
+    """Round-trip through JSON, converting pandas/numpy values on the way"""
+    def default(value):
+        if isinstance(value, pd.Series):
+            return series_to_dict(value)
+        if hasattr(value, "to_dict") and callable(value.to_dict):
+            return value.to_dict()
+        converted = to_python(value)
+        return converted if converted is not value else str(value)
+    return json.loads(json.dumps(obj, default=default))
+
+
+@dataclass
+class Checkpoint:
+    """Everything needed to skip a turn on a later run"""
+    run_id: str
+    turn: int
+    query: Optional[str] = None
+    response: str = ""
+    result: Any = None
+    session_id: Optional[str] = None
+    cost_usd: float = 0.0
+    duration_ms: Optional[int] = None
+    artifacts: Dict[str, str] = field(default_factory=dict)
+    created: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def options(self, fork: bool = False) -> Dict[str, Any]:
+        """ClaudeCodeOptions kwargs that continue this checkpoint's SDK session
+
+        Args:
+            fork: Branch into a new session id instead of appending to this one
+        """
+        if not self.session_id:
+            return {}
+        options: Dict[str, Any] = {"resume": self.session_id}
+        if fork:
+            options["extra_args"] = {"fork-session": None}
+        return options
+
+
+class CheckpointStore:
+    """Directory-backed store of per-turn checkpoints, one directory per run"""
+
+    def __init__(self, root: str = ".checkpoints"):
+        self.root = Path(root)
+
+    def _run_dir(self, run_id: str) -> Path:
+        return self.root / run_id
+
+    def _write_json(self, path: Path, data: Dict[str, Any]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        tmp_path.replace(path)
+
+    # -- runs ---------------------------------------------------------------
+
+    def new_run(self, run_id: str = None, parent: Dict[str, Any] = None, **meta) -> str:
+        """Create an empty run and return its id
+
+        Args:
+            run_id: Explicit id (default: timestamp + random suffix)
+            parent: {"run_id", "turn"} of the prefix this run was forked from
+            **meta: Extra JSON-serializable fields stored in run.json
+        """
+        run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self._write_json(self._run_dir(run_id) / "run.json", {
+            "run_id": run_id,
+            "parent": parent,
+            "created": datetime.now().isoformat(),
+            **_jsonable(meta),
+        })
+        return run_id
+
+    def run_info(self, run_id: str) -> Dict[str, Any]:
+        path = self._run_dir(run_id) / "run.json"
+        if not path.exists():
+            raise KeyError(f"No checkpointed run {run_id!r} in {self.root}")
+        return json.loads(path.read_text())
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Every run, oldest first, with the turns it has checkpoints for"""
+        if not self.root.exists():
+            return []
+        runs = []
+        for path in self.root.glob("*/run.json"):
+            info = json.loads(path.read_text())
+            info["turns"] = [c.turn for c in self.checkpoints(info["run_id"])]
+            runs.append(info)
+        return sorted(runs, key=lambda info: info["created"])
+
+    def latest_run(self, upto_turn: int = None, artifacts: Dict[int, str] = None) -> Optional[str]:
+        """Newest run, optionally only among runs that reached ``upto_turn``
+
+        Args:
+            artifacts: Turn -> file name each of those turns must have stored
+                (and still have on disk), e.g. {2: "analytics_chart.png"}
+        """
+        for info in reversed(self.runs()):
+            if upto_turn is not None and upto_turn not in info["turns"]:
+                continue
+            if artifacts and not all(self.has_artifact(info["run_id"], turn, name)
+                                     for turn, name in artifacts.items()):
+                continue
+            return info["run_id"]
+        return None
+
+    def has_artifact(self, run_id: str, turn: int, name: str) -> bool:
+        """Did the run's checkpoint for ``turn`` store ``name``, and is it still there?"""
+        checkpoint = self.load(run_id, turn)
+        stored = checkpoint.artifacts.get(name) if checkpoint else None
+        return bool(stored) and Path(stored).exists()
+
+    def fork(self, run_id: str, upto_turn: int, new_run_id: str = None, **meta) -> str:
+        """New run sharing ``run_id``'s checkpoints for turns 1..upto_turn"""
+        new_run_id = self.new_run(new_run_id, parent={"run_id": run_id, "turn": upto_turn}, **meta)
+        for checkpoint in self.checkpoints(run_id):
+            if checkpoint.turn <= upto_turn:
+                stored = list(checkpoint.artifacts.values())
+                self.save(Checkpoint(**{**asdict(checkpoint), "run_id": new_run_id, "artifacts": {}}), files=stored)
+        return new_run_id
+
+    def delete(self, run_id: str):
+        shutil.rmtree(self._run_dir(run_id), ignore_errors=True)
+
+    # -- checkpoints --------------------------------------------------------
+
+    def save(self, checkpoint: Checkpoint, files: List[str] = None) -> Checkpoint:
+        """Persist a checkpoint, copying ``files`` into the run's artifacts
+
+        Stored artifacts are keyed by file name; later turns of the same run
+        are dropped since they no longer follow from this one.
+        """
+        run_dir = self._run_dir(checkpoint.run_id)
+        if not (run_dir / "run.json").exists():
+            self.new_run(checkpoint.run_id)
+
+        artifacts = dict(checkpoint.artifacts)
+        for src in files or []:
+            src = Path(src)
+            if not src.exists():
+                continue
+            dst = run_dir / "artifacts" / f"turn_{checkpoint.turn}" / src.name
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            if src.resolve() != dst.resolve():
+                shutil.copyfile(src, dst)
+            artifacts[src.name] = str(dst)
+        checkpoint.artifacts = artifacts
+        checkpoint.result = _jsonable(checkpoint.result)
+
+        for stale in self.checkpoints(checkpoint.run_id):
+            if stale.turn > checkpoint.turn:
+                (run_dir / f"turn_{stale.turn}.json").unlink(missing_ok=True)
+        self._write_json(run_dir / f"turn_{checkpoint.turn}.json", asdict(checkpoint))
+        return checkpoint
+
+    def load(self, run_id: str, turn: int) -> Optional[Checkpoint]:
+        path = self._run_dir(run_id) / f"turn_{turn}.json"
+        if not path.exists():
+            return None
+        return Checkpoint(**json.loads(path.read_text()))
+
+    def checkpoints(self, run_id: str) -> List[Checkpoint]:
+        """All checkpoints of a run in turn order"""
+        run_dir = self._run_dir(run_id)
+        turns = sorted(int(p.stem.split("_")[1]) for p in run_dir.glob("turn_*.json"))
+        return [self.load(run_id, turn) for turn in turns]
+
+    def prefix(self, run_id: str, before_turn: int) -> Dict[int, Checkpoint]:
+        """Checkpoints for every turn before ``before_turn``
+
+        Raises:
+            KeyError: if any of those turns has no checkpoint
+        """
+        restored = {c.turn: c for c in self.checkpoints(run_id) if c.turn < before_turn}
+        missing = [turn for turn in range(1, before_turn) if turn not in restored]
+        if missing:
+            raise KeyError(f"Run {run_id!r} has no checkpoint for turn(s) {missing}")
+        return restored
+
+    @staticmethod
+    def restore_artifacts(checkpoint: Checkpoint, dest_dir: str = ".") -> Dict[str, str]:
+        """Copy a checkpoint's stored files back into ``dest_dir``
+
+        Returns:
+            File name -> restored path, for the artifacts that still exist
+        """
+        restored = {}
+        for name, stored in checkpoint.artifacts.items():
+            if Path(stored).exists():
+                dst = Path(dest_dir) / name
+                shutil.copyfile(stored, dst)
+                restored[name] = str(dst)
+        return restored
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect demo checkpoints")
+    parser.add_argument("action", choices=["list", "show", "delete"])
+    parser.add_argument("run_id", nargs="?")
+    parser.add_argument("--root", default=".checkpoints")
+    args = parser.parse_args()
+
+    store = CheckpointStore(args.root)
+    if args.action == "list":
+        for info in store.runs():
+            parent = f" (fork of {info['parent']['run_id']} @ turn {info['parent']['turn']})" if info.get("parent") else ""
+            print(f"{info['run_id']}: turns {info['turns']}{parent}")
+    elif args.action == "show":
+        run_id = args.run_id or store.latest_run()
+        for checkpoint in store.checkpoints(run_id):
+            print(json.dumps(asdict(checkpoint), indent=2))
+    else:
+        store.delete(args.run_id)
+        print(f"🗑️  Deleted {args.run_id}")
@@ -3,197 +3,486 @@
 Working Data Analytics Demo - Properly passes execution results between turns
 """
 
+import argparse
 import asyncio
+import contextlib
 import json
+import math
 import os
 import sys
 from pathlib import Path
+from typing import List, Tuple
 from dotenv import load_dotenv
 from logger_util import init_logging, get_logger
+from replay_util import ReplayClient
 
 load_dotenv()
 
 try:
     from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
     import pandas as pd
-    import matplotlib.pyplot as plt
+    import matplotlib
+    matplotlib.use("Agg")  # generated code runs in worker threads and processes
     import numpy as np
+    from dataset_cache import DatasetCache
+    from dataset_util import DEFAULT_CHUNKSIZE, HELPER_API_DOC, ChunkedDataset, format_profile, profile_dataset
+    from summary_util import format_summary_block, group_sums, load_or_compute_summary
+    from code_stream import CodeBlockParser, IncrementalExecutor
+    from chart_render import ChartRenderer
+    from checkpoint_store import Checkpoint, CheckpointStore
+    from pipeline_dag import Pipeline, Speculation, Step, format_timeline
+    from model_router import DEFAULT_TIER, DEMO_TURN_STEPS, MODELS, ModelRouter, RoutedClient, estimate_tokens
 except ImportError as e:
     print(f"Import error: {e}")
     sys.exit(1)
 
 
-async def working_demo():
-    """Demonstrate proper result passing between turns"""
+ANALYST_SYSTEM_PROMPT = """You are a data analyst. Format Python code in ```python blocks. 
+Use the EXACT column names provided in the data description."""
+
+# Turn 2 saves the chart here; its checkpoint stores a copy under the same name
+CHART_FILE = 'analytics_chart.png'
+
+
+def restorable_run(checkpoints: CheckpointStore, from_turn: int):
+    """Newest run whose checkpoints can stand in for every turn before ``from_turn``
+
+    A turn-2 checkpoint only counts if it stored the chart.
+    """
+    return checkpoints.latest_run(upto_turn=from_turn - 1,
+                                  artifacts={2: CHART_FILE} if from_turn > 2 else None)
+
+
+async def collect_response(client, logger, turn: int, executor=None, echo: bool = True):
+    """Stream one turn's response, logging and echoing it as it arrives
+
+    With ``include_partial_messages`` the text arrives as StreamEvent
+    text deltas, which are fed on as they come; the AssistantMessage that
+    follows repeats that text and is then skipped. Without partial
+    messages (or for recordings that lack them) each AssistantMessage's
+    text is used whole. Deltas are not logged: the AssistantMessage holds
+    the assembled text, so logs and replays stay one entry per message.
+
+    Args:
+        executor: Optional IncrementalExecutor or CodeBlockParser; streamed
+            text is fed to it so code blocks are picked up as they complete
+        echo: Print streamed text (off for turns that run concurrently)
+
+    Returns:
+        Tuple of (response text, ResultMessage or None)
+    """
+    response = ""
+    result_message = None
+    streamed = False
+    
+    def consume(text):
+        nonlocal response
+        response += text
+        if echo:
+            print(text, end='', flush=True)
+        if executor is not None:
+            executor.feed(text)
+    
+    async for message in client.receive_response():
+        if type(message).__name__ == "StreamEvent":
+            delta = (getattr(message, 'event', None) or {}).get('delta') or {}
+            if delta.get('type') == 'text_delta':
+                consume(delta.get('text', ''))
+                streamed = True
+            continue
+        
+        # Log the complete response object
+        logger.log_response(message, turn=turn)
+        
+        if hasattr(message, 'content'):
+            if type(message).__name__ == "AssistantMessage" and streamed:
+                # Already consumed from this message's text deltas
+                streamed = False
+                continue
+            for block in message.content:
+                if hasattr(block, 'text'):
+                    consume(block.text)
+        
+        if type(message).__name__ == "ResultMessage":
+            result_message = message
+            cost = getattr(message, 'total_cost_usd', 0) or 0
+            print(f"\n💰 Turn {turn} Cost: ${cost:.4f}")
+    
+    return response, result_message
+
+
+def execution_reporter(logger, turn: int, get_result):
+    """IncrementalExecutor callback that logs and prints each block's outcome"""
+    def on_complete(block):
+        label = f"Block {block['index'] + 1}"
+        if block['success']:
+            logger.log_execution(block['code'], get_result(), turn=turn, success=True)
+            print(f"\n✅ {label} executed ({block['seconds']:.2f}s)")
+        else:
+            logger.log_execution(block['code'], None, turn=turn, success=False, error=block['error'])
+            print(f"\n❌ {label}: {block['error']}")
+    return on_complete
+
+
+class TextTally:
+    """Forwards streamed text to an executor and keeps it, so a turn that is
+    cut off before its ResultMessage can still be priced"""
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.text = ""
+
+    def feed(self, text: str):
+        self.text += text
+        if self.executor is not None:
+            return self.executor.feed(text)
+
+
+def turn_cost(result_message, query: str, response: str) -> Tuple[float, bool]:
+    """A turn's cost: the ResultMessage's, or an estimate if it never arrived
+
+    The estimate prices the prompt and the text streamed so far at sonnet
+    rates; it misses Claude Code's own system prompt and tool calls, so it
+    is a lower bound.
+
+    Returns:
+        (cost_usd, estimated)
+    """
+    cost = getattr(result_message, 'total_cost_usd', None)
+    if cost is not None:
+        return cost, False
+    spec = MODELS[DEFAULT_TIER]
+    return spec.token_cost(estimate_tokens(ANALYST_SYSTEM_PROMPT + query), estimate_tokens(response)), True
+
+
+def revenue_to_dict(result1) -> dict:
+    """Turn 1's revenue_by_category as a plain dict, or None if missing"""
+    if not result1 or 'revenue_by_category' not in result1:
+        return None
+    # Convert pandas Series to dict for JSON serialization
+    revenue_data = result1['revenue_by_category']
+    if hasattr(revenue_data, 'to_dict'):
+        return revenue_data.to_dict()
+    return dict(revenue_data)
+
+
+def turn1_query(data_path: str, profile: dict) -> str:
+    return f"""I have a CSV file '{data_path}' with this profile:
+{format_profile(profile)}
+
+{HELPER_API_DOC}
+
+Please generate Python code to:
+1. Show dataset shape and columns (ds.shape, ds.columns)
+2. Display first 3 rows (ds.head(3))
+3. Calculate total revenue by the 'category' column (NOT product_category!)
+4. Store results in a 'result' dictionary with keys 'shape', 'columns'
+   and 'revenue_by_category'
+
+Use EXACT column names shown above."""
+
+
+def turn2_query(data_path: str, columns, result1, revenue_dict, summary=None, chart_notes: str = None) -> str:
+    if revenue_dict is not None:
+        query2 = f"""Here are the ACTUAL analysis results from the previous step:
+
+Dataset shape: {result1.get('shape')}
+Columns: {result1.get('columns')}
+Revenue by category: {revenue_dict}
+{format_summary_block(summary, values=['revenue']) if summary else ''}
+
+{HELPER_API_DOC}
+
+Now generate Python code to:
+1. Get revenue by category with ds.groupby_sum('category', 'revenue')
+2. Create a bar chart showing these exact values: {revenue_dict}
+3. Save as 'analytics_chart.png'
+4. Make it well-labeled and professional
+
+Use the EXACT data shown above."""
+    else:
+        query2 = f"""Dataset '{data_path}' columns: {columns}
+
+{HELPER_API_DOC}
+
+Generate Python code to:
+1. Group by 'category' and sum 'revenue' with ds.groupby_sum
+2. Create bar chart and save as 'analytics_chart.png'"""
+    
+    if chart_notes:
+        query2 += f"\n\nAdditional chart requirements: {chart_notes}"
+    return query2
+
+
+def turn3_query(revenue_dict, chart_abs_path) -> str:
+    return f"""I created a chart showing revenue by category with these values:
+{revenue_dict or 'Electronics vs Accessories'}
+
+Please analyze this chart image {chart_abs_path} and provide:
+1. Key insights from the visualization
+2. Which category performs better
+3. Business recommendations based on the data shown"""
+
+
+async def render_chart(renderer, logger, ds, viz_blocks: List[str], chart_path: Path) -> bool:
+    """Render turn 2's chart code blocks in the pool and log each outcome
+
+    Unlike turn 1, turn 2 does not execute blocks while the response streams:
+    its chart code is usually a single final block, so there is little to
+    overlap, and the render cache key and the worker process both need the
+    complete code. The worker still runs the blocks one at a time and skips
+    any that depend on a failed block, as IncrementalExecutor does.
+
+    Returns:
+        True if this render produced the chart file
+    """
+    try:
+        render = await renderer.render_async(viz_blocks, str(chart_path), ds)
+    except Exception as e:
+        logger.log_execution("\n\n".join(viz_blocks), None, turn=2, success=False, error=str(e))
+        print(f"❌ Visualization error: {e}")
+        return False
+
+    created = render['created']
+    if render['cached']:
+        logger.log_execution("\n\n".join(viz_blocks), str(chart_path), turn=2, success=True)
+    else:
+        report = execution_reporter(logger, 2, lambda: str(chart_path) if created else None)
+        for block in render['blocks']:
+            report(block)
+    if created:
+        source = "render cache" if render['cached'] else f"{render['seconds']:.2f}s"
+        print(f"✅ Chart created: {chart_path} ({source})")
+    else:
+        logger.log_execution("\n\n".join(viz_blocks), None, turn=2, success=False,
+                             error="Chart file not found")
+        print("⚠️  Chart file not found after execution")
+    return created
+
+
+async def vision_image(renderer, chart_path: Path, fmt: str) -> dict:
+    """Downscaled variant of the chart for turn 3, with its size report printed"""
+    vision = await renderer.optimize_async(chart_path, fmt=fmt)
+    print(f"🗜️  Vision image: {vision['width']}x{vision['height']}, "
+          f"{vision['original_bytes']:,} -> {vision['bytes']:,} bytes, "
+          f"~{vision['original_tokens']} -> ~{vision['est_tokens']} tokens")
+    return vision
+
+
+async def working_demo(client_factory=None, data_path: str = 'sample_data.csv',
+                       chunksize: int = DEFAULT_CHUNKSIZE, use_cache: bool = True,
+                       precompute: bool = False, vision_format: str = 'png',
+                       render_cache: bool = True, checkpoints: CheckpointStore = None,
+                       run_id: str = None, from_turn: int = 1, fork: bool = False,
+                       chart_notes: str = None, router: ModelRouter = None,
+                       renderer: ChartRenderer = None):
+    """Demonstrate proper result passing between turns
+    
+    Args:
+        client_factory: Callable taking ``options=`` and returning an SDK client.
+            Defaults to ClaudeSDKClient; pass ReplayClient.factory(...) to
+            replay a recorded session offline.
+        data_path: CSV file to analyze; it is only ever read in chunks
+        chunksize: Rows per chunk when profiling and in the ``ds`` helper
+        use_cache: Serve the dataset from the columnar DatasetCache so the CSV
+            is parsed once across turns and runs
+        precompute: Compute common aggregates locally (cached per dataset),
+            skip the turn-1 analysis turn and give turn 2 a summary block
+        vision_format: "png" or "webp" for the downscaled chart sent in turn 3
+        render_cache: Reuse a previously rendered chart for the same code and data
+        checkpoints: Store each turn's query, output, result and session id here
+        run_id: Checkpointed run to write to, or to restart from with from_turn
+            (default: a new run, or the latest run that reached from_turn - 1)
+        from_turn: Restore turns before this one from checkpoints and resume
+            their SDK session instead of re-running them
+        fork: Restart into a new run (and forked SDK session) sharing the
+            restored prefix, leaving the original run untouched
+        chart_notes: Extra turn-2 chart requirements, e.g. for forked variants
+        router: Pick each turn's model, max_tokens and max_turns with this
+            ModelRouter, switching models by resuming the session
+        renderer: Render with this long-lived ChartRenderer and leave it
+            open (render_cache is then the renderer's own setting); by
+            default a new one is created and closed with the run
+    """
+    client_factory = client_factory or ClaudeSDKClient
     
     # Initialize logging
     logger = init_logging()
+    if router is not None:
+        client_factory = RoutedClient.factory(router, client_factory, logger=logger)
     
     print("\n🚀 Working Multi-Turn Data Analytics Demo")
     print("="*60)
     print(f"📝 Logging to: {logger.log_file}")
     
-    # First, let's examine our data to understand the structure
-    df = pd.read_csv('sample_data.csv')
-    print(f"📊 Data structure: {df.shape}")
-    print(f"📋 Columns: {list(df.columns)}")
-    print(f"🔍 First 2 rows:\n{df.head(2)}")
+    # First, profile the data in chunks so large files never load in full.
+    # Profiling builds the dataset cache on first use, so it runs off the
+    # event loop (the orchestrator shares this loop between jobs).
+    loop = asyncio.get_running_loop()
+    cache = DatasetCache() if use_cache else None
+    ds = ChunkedDataset(data_path, chunksize=chunksize, cache=cache)
+    profile = await loop.run_in_executor(None, lambda: profile_dataset(ds, group_by={'category': ['revenue']}))
+    columns = profile['columns']
+    print(f"📊 Data structure: {tuple(profile['shape'])}")
+    print(f"📋 Columns: {columns}")
+    print(f"🔍 First 2 rows:\n{pd.DataFrame(profile['head'][:2], columns=columns)}")
+    
+    summary = None
+    if precompute:
+        summary = await loop.run_in_executor(None, load_or_compute_summary, ds)
+        source = "cache" if summary['cached'] else f"computed in {summary['compute_seconds']:.3f}s"
+        print(f"🧮 Precomputed aggregates: {source}")
+    
+    # Restore earlier turns from checkpoints when restarting mid-pipeline
+    restored = {}
+    resume = {}
+    if checkpoints is not None:
+        if from_turn > 1:
+            run_id = run_id or restorable_run(checkpoints, from_turn)
+            if run_id is None:
+                raise KeyError(f"No checkpointed run reaches turn {from_turn - 1}")
+            if fork:
+                run_id = checkpoints.fork(run_id, from_turn - 1, data_path=data_path, chart_notes=chart_notes)
+            restored = checkpoints.prefix(run_id, from_turn)
+            if 2 in restored and not checkpoints.has_artifact(run_id, 2, CHART_FILE):
+                # Turn 2 produced no chart, so it runs again (resuming after turn 1)
+                print("⚠️  Turn 2 checkpoint has no chart: re-running turn 2")
+                del restored[2]
+            last_session = next((c for c in reversed(list(restored.values())) if c.session_id), None)
+            resume = last_session.options(fork=fork) if last_session else {}
+            print(f"⏩ Restored turn(s) {sorted(restored)} from run {run_id}")
+        else:
+            run_id = checkpoints.new_run(run_id, data_path=data_path, chart_notes=chart_notes)
+        print(f"💾 Checkpoints: {checkpoints.root / run_id}")
+    elif from_turn > 1:
+        raise ValueError("Restarting from a later turn needs a CheckpointStore")
     
     options = ClaudeCodeOptions(
-        system_prompt="""You are a data analyst. Format Python code in ```python blocks. 
-Use the EXACT column names provided in the data description.""",
-        max_turns=4
+        system_prompt=ANALYST_SYSTEM_PROMPT,
+        max_turns=4,
+        include_partial_messages=True,  # text deltas, so code runs while the rest streams
+        **resume
     )
     
-    async with ClaudeSDKClient(options=options) as client:
-        
-        # TURN 1: Data Analysis
-        print(f"\n📊 TURN 1: Data Analysis")
-        print("-" * 40)
-        
-        query1 = f"""I have a CSV file 'sample_data.csv' with these columns:
-{list(df.columns)}
-
-First few rows:
-{df.head(2).to_string()}
-
-Please generate Python code to:
-1. Load the CSV with pandas
-2. Show dataset shape and columns
-3. Display first 3 rows
-4. Calculate total revenue by the 'category' column (NOT product_category!)
-5. Store results in a 'result' dictionary
-
-Use EXACT column names shown above."""
+    if renderer is None:
+        renderer = ChartRenderer(cache_dir='.chart_cache' if render_cache else None)
+        renderer_scope = renderer
+    else:
+        renderer_scope = contextlib.nullcontext()
+    async with client_factory(options=options) as client, renderer_scope:
         
-        print("Sending detailed data analysis request...")
-        logger.log_query(query1, turn=1)
-        await client.query(query1)
-        
-        response1 = ""
+        result1 = None
         cost1 = 0
-        session_id = None
+        session_id = resume.get('resume')
+        turns_skipped = 0
+        # Model turns actually sent, and checkpointed turns actually reused
+        turns_run = 0
+        turns_restored = []
+        query1, response1, result_message = None, "", None
+        precomputed_revenue = group_sums(summary, 'category', 'revenue') if summary else {}
         
-        async for message in client.receive_response():
-            # Log the complete response object
-            logger.log_response(message, turn=1)
+        if 1 in restored:
+            print(f"\n⏩ TURN 1 restored from checkpoint")
+            result1 = restored[1].result
+            turns_restored.append(1)
+        elif precomputed_revenue:
+            # TURN 1 only computes shape, columns and revenue by category -
+            # all already in the precomputed summary, so skip the model turn
+            print(f"\n⏭️  TURN 1 skipped: using precomputed aggregates")
+            result1 = {
+                'shape': tuple(summary['shape']),
+                'columns': columns,
+                'revenue_by_category': precomputed_revenue
+            }
+            logger.log_execution("# precomputed by summary_util", result1, turn=1, success=True)
+            turns_skipped = 1
+        else:
+            # TURN 1: Data Analysis
+            print(f"\n📊 TURN 1: Data Analysis")
+            turns_run += 1
+            print("-" * 40)
             
-            if hasattr(message, 'content'):
-                for block in message.content:
-                    if hasattr(block, 'text'):
-                        text = block.text
-                        response1 += text
-                        print(text, end='', flush=True)
+            query1 = turn1_query(data_path, profile)
             
-            if type(message).__name__ == "ResultMessage":
-                cost1 = getattr(message, 'total_cost_usd', 0)
-                session_id = getattr(message, 'session_id', None)
-                print(f"\n💰 Turn 1 Cost: ${cost1:.4f}")
-        
-        # Execute Turn 1 code
-        print(f"\n🔧 Executing generated code...")
-        
-        import re
-        code_blocks = re.findall(r'```python\n(.*?)\n```', response1, re.DOTALL)
-        
-        result1 = None
-        if code_blocks:
-            code = code_blocks[0].strip()
-            print(f"📝 Executing code...")
+            print("Sending detailed data analysis request...")
+            logger.log_query(query1, turn=1)
+            await send_query(client, query1, turn=1)
             
-            try:
-                exec_globals = {'pd': pd, 'np': np}
-                exec(code, exec_globals)
+            # Code blocks execute as soon as they stream in
+            exec_globals = {'pd': pd, 'np': np, 'ds': ds}
+            executor = IncrementalExecutor(
+                exec_globals, on_complete=execution_reporter(logger, 1, lambda: exec_globals.get('result'))
+            )
+            response1, result_message = await collect_response(client, logger, turn=1, executor=executor)
+            cost1 = getattr(result_message, 'total_cost_usd', 0) or 0
+            session_id = getattr(result_message, 'session_id', None) or session_id
+            
+            # Wait for any Turn 1 code still running
+            print(f"\n🔧 Finishing generated code...")
+            blocks = await executor.finish()
+            
+            if not blocks:
+                print("⚠️  No Python code blocks found")
+            elif any(block['success'] for block in blocks):
                 result1 = exec_globals.get('result')
-                logger.log_execution(code, result1, turn=1, success=True)
-                print(f"✅ Execution successful!")
                 print(f"📊 Result keys: {list(result1.keys()) if result1 else 'None'}")
-                
-            except Exception as e:
-                logger.log_execution(code, None, turn=1, success=False, error=str(e))
-                print(f"❌ Error: {e}")
-                result1 = None
         
-        # TURN 2: Visualization with ACTUAL results
-        print(f"\n\n📈 TURN 2: Visualization with Results")
-        print("-" * 40)
+        if checkpoints is not None and 1 not in restored:
+            checkpoints.save(Checkpoint(run_id, 1, query=query1, response=response1, result=result1,
+                                        session_id=session_id, cost_usd=cost1,
+                                        duration_ms=getattr(result_message, 'duration_ms', None)))
         
-        if result1 and 'revenue_by_category' in result1:
-            # Convert pandas Series to dict for JSON serialization
-            revenue_data = result1['revenue_by_category']
-            if hasattr(revenue_data, 'to_dict'):
-                revenue_dict = revenue_data.to_dict()
-            else:
-                revenue_dict = dict(revenue_data)
-            
-            query2 = f"""Here are the ACTUAL analysis results from the previous step:
-
-Dataset shape: {result1.get('shape')}
-Columns: {result1.get('columns')}
-Revenue by category: {revenue_dict}
-
-Now generate Python code to:
-1. Load sample_data.csv 
-2. Group by 'category' column and sum 'revenue' column
-3. Create a bar chart showing these exact values: {revenue_dict}
-4. Save as 'analytics_chart.png'
-5. Make it well-labeled and professional
-
-Use the EXACT data shown above."""
-            
-        else:
-            query2 = f"""Generate Python code to:
-1. Load sample_data.csv (columns: {list(df.columns)})
-2. Group by 'category' and sum 'revenue' 
-3. Create bar chart and save as 'analytics_chart.png'"""
+        revenue_dict = revenue_to_dict(result1)
         
-        print("Sending visualization request with actual data...")
-        logger.log_query(query2, turn=2)
-        await client.query(query2)
-        
-        response2 = ""
+        # TURN 2: Visualization with ACTUAL results
+        chart_path = Path(CHART_FILE)
+        restored_files = CheckpointStore.restore_artifacts(restored[2]) if 2 in restored else {}
         cost2 = 0
+        chart_created = False
         
-        async for message in client.receive_response():
-            # Log the complete response object
-            logger.log_response(message, turn=2)
+        if chart_path.name in restored_files:
+            print(f"\n⏩ TURN 2 restored from checkpoint: {chart_path}")
+            chart_created = True
+            turns_restored.append(2)
+        else:
+            if 2 in restored:
+                print(f"\n⚠️  TURN 2 checkpoint's chart is missing: re-running turn 2")
+            turns_run += 1
+            print(f"\n\n📈 TURN 2: Visualization with Results")
+            print("-" * 40)
             
-            if hasattr(message, 'content'):
-                for block in message.content:
-                    if hasattr(block, 'text'):
-                        text = block.text
-                        response2 += text
-                        print(text, end='', flush=True)
+            query2 = turn2_query(data_path, columns, result1, revenue_dict,
+                                 summary=summary, chart_notes=chart_notes)
             
-            if type(message).__name__ == "ResultMessage":
-                cost2 = getattr(message, 'total_cost_usd', 0)
-                print(f"\n💰 Turn 2 Cost: ${cost2:.4f}")
-        
-        # Execute visualization code
-        print(f"\n🎨 Creating visualization...")
-        
-        viz_code_blocks = re.findall(r'```python\n(.*?)\n```', response2, re.DOTALL)
-        chart_created = False
-        
-        if viz_code_blocks:
-            viz_code = viz_code_blocks[0].strip()
+            print("Sending visualization request with actual data...")
+            logger.log_query(query2, turn=2)
+            await send_query(client, query2, turn=2)
             
-            try:
-                exec_globals = {'pd': pd, 'plt': plt, 'np': np}
-                exec(viz_code, exec_globals)
-                
-                chart_path = Path('analytics_chart.png')
-                if chart_path.exists():
-                    logger.log_execution(viz_code, str(chart_path), turn=2, success=True)
-                    print(f"✅ Chart created: {chart_path}")
-                    chart_created = True
-                else:
-                    logger.log_execution(viz_code, None, turn=2, success=False, error="Chart file not found")
-                    print("⚠️  Chart file not found after execution")
-                    
-            except Exception as e:
-                logger.log_execution(viz_code, None, turn=2, success=False, error=str(e))
-                print(f"❌ Visualization error: {e}")
+            parser = CodeBlockParser()
+            response2, result_message = await collect_response(client, logger, turn=2, executor=parser)
+            cost2 = getattr(result_message, 'total_cost_usd', 0) or 0
+            session_id = getattr(result_message, 'session_id', None) or session_id
+            
+            # Render the chart in the background pool (cached by code + data version)
+            print(f"\n🎨 Creating visualization...")
+            parser.close()
+            viz_blocks = parser.blocks
+            viz_code = None
+            
+            if not viz_blocks:
+                print("⚠️  No Python code blocks found")
+            else:
+                viz_code = "\n\n".join(viz_blocks)
+                chart_created = await render_chart(renderer, logger, ds, viz_blocks, chart_path)
+            
+            if checkpoints is not None:
+                checkpoints.save(Checkpoint(run_id, 2, query=query2, response=response2,
+                                            result={'chart_created': chart_created, 'code': viz_code},
+                                            session_id=session_id, cost_usd=cost2,
+                                            duration_ms=getattr(result_message, 'duration_ms', None)),
+                                 files=[str(chart_path)] if chart_created else None)
+        
+        vision = await vision_image(renderer, chart_path, vision_format) if chart_created else None
         
         # TURN 3: Chart analysis (if successful)
         cost3 = 0
@@ -201,56 +490,54 @@ Use the EXACT data shown above."""
             print(f"\n\n🔍 TURN 3: Chart Analysis")
             print("-" * 40)
             
-            # Read the chart image and include it in the query
-            chart_path = Path('analytics_chart.png')
-            chart_abs_path = chart_path.absolute()
+            turns_run += 1
+            # Send the downscaled variant; the full-size chart stays on disk
+            chart_abs_path = Path(vision['path']).absolute()
             
-            query3 = f"""I created a chart showing revenue by category with these values:
-{revenue_dict if 'revenue_dict' in locals() else 'Electronics vs Accessories'}
-
-Please analyze this chart image {chart_abs_path} and provide:
-1. Key insights from the visualization
-2. Which category performs better
-3. Business recommendations based on the data shown"""
+            query3 = turn3_query(revenue_dict, chart_abs_path)
             
             print("Analyzing the generated chart...")
             # Claude will automatically read the image file mentioned in prompt
-            logger.log_query(query3, turn=3, attachments=[str(chart_path)])
-            await client.query(query3)
+            logger.log_query(query3, turn=3, attachments=[vision['path']])
+            await send_query(client, query3, turn=3, attachments=[vision['path']])
             
-            async for message in client.receive_response():
-                # Log the complete response object
-                logger.log_response(message, turn=3)
-                
-                if hasattr(message, 'content'):
-                    for block in message.content:
-                        if hasattr(block, 'text'):
-                            print(block.text, end='', flush=True)
-                
-                if type(message).__name__ == "ResultMessage":
-                    cost3 = getattr(message, 'total_cost_usd', 0)
-                    print(f"\n💰 Turn 3 Cost: ${cost3:.4f}")
+            response3, result_message = await collect_response(client, logger, turn=3)
+            cost3 = getattr(result_message, 'total_cost_usd', 0) or 0
+            session_id = getattr(result_message, 'session_id', None) or session_id
+            
+            if checkpoints is not None:
+                checkpoints.save(Checkpoint(run_id, 3, query=query3, response=response3,
+                                            session_id=session_id, cost_usd=cost3,
+                                            duration_ms=getattr(result_message, 'duration_ms', None)))
         
         # Final summary
         total_cost = cost1 + cost2 + cost3
-        turns = 3 if chart_created else 2
+        turns = turns_run
         
         print(f"\n\n🎯 DEMO COMPLETE")
         print("="*50)
         print(f"✅ Turns completed: {turns}")
+        if turns_skipped:
+            print(f"⏭️  Turns skipped: {turns_skipped} (precomputed locally)")
+        if turns_restored:
+            print(f"⏩ Turns restored: {len(turns_restored)} (from run {run_id})")
         print(f"💰 Total cost: ${total_cost:.4f}")
         print(f"🆔 Session: {session_id}")
         print(f"📊 Chart created: {'Yes' if chart_created else 'No'}")
         
         if chart_created:
-            print(f"📁 Chart location: {Path('analytics_chart.png').absolute()}")
+            print(f"📁 Chart location: {Path(CHART_FILE).absolute()}")
         
         final_result = {
             'success': True,
             'total_cost': total_cost,
             'session_id': session_id,
             'chart_created': chart_created,
-            'turns': turns
+            'turns': turns,
+            'turns_skipped': turns_skipped,
+            'turns_restored': len(turns_restored),
+            'run_id': run_id,
+            'routes': [route.as_dict() for route in getattr(client, 'routes', [])]
         }
         
         # Close logging session
@@ -260,10 +547,297 @@ Please analyze this chart image {chart_abs_path} and provide:
         return final_result
 
 
+async def send_query(client, query: str, turn: int, attachments=None):
+    """Send a turn's query; a RoutedClient also picks the turn's model and budgets"""
+    if isinstance(client, RoutedClient):
+        await client.query(query, step=DEMO_TURN_STEPS[turn], turn=turn, attachments=attachments or ())
+        route = client.routes[-1]
+        print(f"🧭 Routed to {route.model} (max_tokens {route.max_tokens}, max_turns {route.max_turns})")
+    else:
+        await client.query(query)
+
+
+def results_agree(predicted: dict, actual: dict) -> bool:
+    """Does turn 1's executed result match the locally predicted one?
+
+    Only the revenue totals feed turn 2's prompt, so those are compared
+    (same categories, values equal to within float noise). A turn 1 that
+    produced no result does not confirm the prediction, so it disagrees.
+    """
+    actual_revenue = revenue_to_dict(actual)
+    if actual_revenue is None:
+        return False
+    predicted_revenue = revenue_to_dict(predicted) or {}
+    if {str(k) for k in actual_revenue} != {str(k) for k in predicted_revenue}:
+        return False
+    expected = {str(k): v for k, v in predicted_revenue.items()}
+    return all(math.isclose(float(v), float(expected[str(k)]), rel_tol=1e-9, abs_tol=1e-6)
+               for k, v in actual_revenue.items())
+
+
+async def speculative_demo(client_factory=None, speculative_factory=None,
+                           data_path: str = 'sample_data.csv', chunksize: int = DEFAULT_CHUNKSIZE,
+                           use_cache: bool = True, vision_format: str = 'png',
+                           render_cache: bool = True, agrees=results_agree):
+    """The same three turns, scheduled as a dependency DAG with turn 2 speculated
+    
+    Turn 2's prompt only needs shape, columns and revenue by category, all of
+    which the local summary already has. So while turn 1 runs, turn 2 is
+    issued on a second client from those predicted values; it is kept if
+    turn 1's executed result agrees, and otherwise cancelled and re-issued
+    on the main client with the real values.
+    
+    Args:
+        client_factory: Client for turns 1 and 3 (and a re-issued turn 2)
+        speculative_factory: Client for the speculative turn 2 (default:
+            client_factory)
+        agrees: fn(predicted result1, actual result1) -> keep speculation?
+        Other arguments as for working_demo.
+    """
+    client_factory = client_factory or ClaudeSDKClient
+    speculative_factory = speculative_factory or client_factory
+    
+    # Initialize logging
+    logger = init_logging()
+    
+    print("\n🚀 Speculative Multi-Turn Data Analytics Demo")
+    print("="*60)
+    print(f"📝 Logging to: {logger.log_file}")
+    
+    loop = asyncio.get_running_loop()
+    ds = ChunkedDataset(data_path, chunksize=chunksize, cache=DatasetCache() if use_cache else None)
+    chart_path = Path(CHART_FILE)
+    options = ClaudeCodeOptions(system_prompt=ANALYST_SYSTEM_PROMPT, max_turns=4, include_partial_messages=True)
+    renderer = ChartRenderer(cache_dir='.chart_cache' if render_cache else None)
+    costs = {}
+    estimated_costs = []
+    
+    async with client_factory(options=options) as client, \
+            speculative_factory(options=options) as spec_client, renderer:
+        
+        async def profile_step(inputs):
+            profile = await loop.run_in_executor(None, lambda: profile_dataset(ds, group_by={'category': ['revenue']}))
+            print(f"📊 Data structure: {tuple(profile['shape'])}")
+            return profile
+        
+        async def summary_step(inputs):
+            summary = await loop.run_in_executor(None, load_or_compute_summary, ds)
+            source = "cache" if summary['cached'] else f"computed in {summary['compute_seconds']:.3f}s"
+            print(f"🧮 Local aggregates: {source}")
+            return summary
+        
+        async def turn1_step(inputs):
+            query1 = turn1_query(data_path, inputs['profile'])
+            print("\n📊 TURN 1: Data Analysis (streaming hidden while turns overlap)")
+            logger.log_query(query1, turn=1)
+            await client.query(query1)
+            
+            exec_globals = {'pd': pd, 'np': np, 'ds': ds}
+            executor = IncrementalExecutor(
+                exec_globals, on_complete=execution_reporter(logger, 1, lambda: exec_globals.get('result'))
+            )
+            _, result_message = await collect_response(client, logger, turn=1, executor=executor, echo=False)
+            costs['turn1'] = getattr(result_message, 'total_cost_usd', 0) or 0
+            blocks = await executor.finish()
+            return exec_globals.get('result') if any(block['success'] for block in blocks) else None
+        
+        def turn2_on(turn_client, label):
+            async def turn2_step(inputs):
+                result1 = inputs['turn1']
+                query2 = turn2_query(data_path, inputs['profile']['columns'], result1, revenue_to_dict(result1))
+                print(f"\n📈 TURN 2: Visualization ({label})")
+                logger.log_query(query2, turn=2)
+                await turn_client.query(query2)
+                
+                parser = CodeBlockParser()
+                tally = TextTally(parser)
+                result_message = None
+                try:
+                    _, result_message = await collect_response(turn_client, logger, turn=2, executor=tally, echo=False)
+                finally:
+                    # A cancelled speculative turn was still billed for what it streamed
+                    key = f'turn2 ({label})'
+                    costs[key], estimated = turn_cost(result_message, query2, tally.text)
+                    if estimated:
+                        estimated_costs.append(key)
+                parser.close()
+                return {'blocks': parser.blocks, 'client': turn_client,
+                        'session_id': getattr(result_message, 'session_id', None)}
+            return turn2_step
+        
+        def predict_turn1(inputs):
+            revenue = group_sums(inputs['summary'], 'category', 'revenue')
+            if not revenue:
+                return None
+            return {'shape': tuple(inputs['summary']['shape']), 'columns': inputs['profile']['columns'],
+                    'revenue_by_category': revenue}
+        
+        async def cancel_speculation():
+            print("\n↩️  Turn 1 disagrees with the local prediction: re-issuing turn 2")
+            if hasattr(spec_client, 'interrupt'):
+                await spec_client.interrupt()
+        
+        async def render_step(inputs):
+            if not inputs['turn2']['blocks']:
+                print("⚠️  No Python code blocks found")
+                return None
+            print(f"\n🎨 Creating visualization...")
+            if not await render_chart(renderer, logger, ds, inputs['turn2']['blocks'], chart_path):
+                return None
+            return await vision_image(renderer, chart_path, vision_format)
+        
+        async def turn3_step(inputs):
+            vision = inputs['render']
+            if vision is None:
+                return None
+            # Continue on whichever client produced the accepted turn 2
+            turn_client = inputs['turn2']['client']
+            query3 = turn3_query(revenue_to_dict(inputs['turn1']), Path(vision['path']).absolute())
+            print(f"\n\n🔍 TURN 3: Chart Analysis")
+            print("-" * 40)
+            logger.log_query(query3, turn=3, attachments=[vision['path']])
+            await turn_client.query(query3)
+            response3, result_message = await collect_response(turn_client, logger, turn=3)
+            costs['turn3'] = getattr(result_message, 'total_cost_usd', 0) or 0
+            return {'response': response3, 'session_id': getattr(result_message, 'session_id', None)}
+        
+        pipeline = Pipeline([
+            Step('profile', profile_step),
+            Step('summary', summary_step),
+            Step('turn1', turn1_step, deps=('profile',), kind='model'),
+            Step('turn2', turn2_on(client, 'after turn 1'), deps=('profile', 'turn1'), kind='model',
+                 speculation=Speculation(on='turn1', predict=predict_turn1, using=('profile', 'summary'),
+                                         agrees=agrees, run=turn2_on(spec_client, 'speculative'),
+                                         on_cancel=cancel_speculation)),
+            Step('render', render_step, deps=('turn2',)),
+            Step('turn3', turn3_step, deps=('turn1', 'turn2', 'render'), kind='model'),
+        ])
+        run = await pipeline.run()
+    
+    chart_created = run.results['render'] is not None
+    total_cost = sum(costs.values())
+    speculation = run.speculations.get('turn2', 'skipped')
+    model_turns = sum(1 for entry in run.timeline if entry['kind'] == 'model' and entry['status'] == 'done')
+    cancelled_turns = sum(1 for entry in run.timeline if entry['kind'] == 'model' and entry['status'] == 'cancelled')
+    session_id = (run.results['turn3'] or run.results['turn2'])['session_id']
+    
+    print(f"\n\n🎯 DEMO COMPLETE")
+    print("="*50)
+    print(f"🔮 Speculative turn 2: {speculation}")
+    print(f"⏱️  Wall time: {run.wall_seconds:.2f}s")
+    print(format_timeline(run))
+    print(f"💰 Total cost: ${total_cost:.4f}"
+          + (f" (estimated for {', '.join(estimated_costs)})" if estimated_costs else ""))
+    print(f"🆔 Session: {session_id}")
+    print(f"📊 Chart created: {'Yes' if chart_created else 'No'}")
+    
+    final_result = {
+        'success': True,
+        'total_cost': total_cost,
+        'costs': costs,
+        'estimated_costs': estimated_costs,
+        'session_id': session_id,
+        'chart_created': chart_created,
+        'turns': model_turns,
+        'turns_cancelled': cancelled_turns,
+        'speculation': speculation,
+        'wall_seconds': run.wall_seconds,
+        'timeline': run.timeline
+    }
+    
+    # Close logging session
+    logger.close_session(final_result)
+    print(f"📝 Complete session log saved to: {logger.log_file}")
+    
+    return final_result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multi-turn data analytics demo")
+    parser.add_argument("--data", default="sample_data.csv",
+                        help="CSV file to analyze")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Rows per chunk when reading the CSV")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Parse the CSV directly instead of using the columnar cache")
+    parser.add_argument("--precompute", action="store_true",
+                        help="Skip the analysis turn using locally precomputed aggregates")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="Replay a recorded session log instead of calling the API")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier (0 = no delays)")
+    parser.add_argument("--vision-format", choices=["png", "webp"], default="png",
+                        help="Format of the downscaled chart sent for analysis")
+    parser.add_argument("--no-render-cache", action="store_true",
+                        help="Always re-render the chart instead of reusing a cached image")
+    parser.add_argument("--no-checkpoints", action="store_true",
+                        help="Do not write per-turn checkpoints")
+    parser.add_argument("--run", metavar="RUN_ID",
+                        help="Checkpointed run to write to or restart from")
+    parser.add_argument("--from-turn", type=int, default=1, choices=[1, 2, 3],
+                        help="Restore earlier turns from checkpoints and resume from this one")
+    parser.add_argument("--fork", action="store_true",
+                        help="Restart into a new run instead of overwriting the original's later turns")
+    parser.add_argument("--variant", action="append", metavar="NOTES",
+                        help="Fork one run per variant with extra chart requirements (repeatable)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Run the turns as a DAG, speculating turn 2 from local aggregates")
+    parser.add_argument("--speculative-replay", metavar="LOG",
+                        help="Replay log for the speculative turn-2 client (default: --replay)")
+    parser.add_argument("--route", action="store_true",
+                        help="Pick each turn's model and token budget from the routing policy")
+    parser.add_argument("--route-logs", default="logs", metavar="DIR",
+                        help="Session logs whose success rates tune the routing policy")
+    args = parser.parse_args()
+    if args.route and args.speculative:
+        parser.error("--route cannot be combined with --speculative")
+    if args.speculative and (args.from_turn > 1 or args.variant):
+        parser.error("--speculative cannot be combined with --from-turn or --variant")
+    if args.no_checkpoints and (args.from_turn > 1 or args.variant):
+        parser.error("--from-turn and --variant need checkpoints")
+    return args
+
+
 async def main():
+    args = parse_args()
+    client_factory = None
+    if args.replay:
+        client_factory = ReplayClient.factory(args.replay, speed=args.speed or None)
+        print(f"⏪ Replaying {args.replay} at {f'{args.speed}x' if args.speed else 'max'} speed")
+    
+    checkpoints = None if args.no_checkpoints else CheckpointStore()
+    demo_args = dict(client_factory=client_factory, data_path=args.data,
+                     chunksize=args.chunksize, use_cache=not args.no_cache,
+                     precompute=args.precompute, vision_format=args.vision_format,
+                     render_cache=not args.no_render_cache, checkpoints=checkpoints)
+    if args.route:
+        router = ModelRouter.from_logs(args.route_logs)
+        demo_args['router'] = router
+        print(f"🧭 Routing turns by policy ({sum(s.attempts for s in router.stats.steps.values())} logged turns)")
+    
     try:
-        result = await working_demo()
-        print(f"\n✅ Demo result: {result}")
+        if args.speculative:
+            speculative_factory = None
+            if args.speculative_replay:
+                speculative_factory = ReplayClient.factory(args.speculative_replay, speed=args.speed or None)
+            result = await speculative_demo(client_factory=client_factory, speculative_factory=speculative_factory,
+                                            data_path=args.data, chunksize=args.chunksize,
+                                            use_cache=not args.no_cache, vision_format=args.vision_format,
+                                            render_cache=not args.no_render_cache)
+            print(f"\n✅ Demo result: { {k: v for k, v in result.items() if k != 'timeline'} }")
+        elif args.variant:
+            # Every variant forks the same checkpointed prefix (turn 1 by default)
+            from_turn = max(args.from_turn, 2)
+            base_run = args.run or restorable_run(checkpoints, from_turn)
+            for notes in args.variant:
+                print(f"\n🔀 Variant: {notes}")
+                result = await working_demo(**demo_args, run_id=base_run, from_turn=from_turn,
+                                            fork=True, chart_notes=notes)
+                print(f"\n✅ Variant result: {result}")
+        else:
+            result = await working_demo(**demo_args, run_id=args.run, from_turn=args.from_turn,
+                                        fork=args.fork)
+            print(f"\n✅ Demo result: {result}")
         
     except Exception as e:
         print(f"\n❌ Demo failed: {e}")
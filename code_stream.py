@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Incremental code-block extraction and execution for streamed responses
+
+CodeBlockParser picks fenced Python blocks out of text as it streams in;
+IncrementalExecutor runs each block as soon as its closing fence arrives,
+so execution overlaps with the rest of the model's response.
+"""
+
+import ast
+import asyncio
+import builtins
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+PYTHON_LANGUAGES = ("python", "python3", "py", "py3")
+
+_OPEN_FENCE = re.compile(r"^(?P<indent>[ \t]*)(?P<fence>`{3,}|~{3,})[ \t]*(?P<info>[^`\n]*?)[ \t]*$")
+
+
+class CodeBlockParser:
+    """Line-based state machine for Markdown fenced code blocks
+
+    Accepts text in arbitrary pieces, normalizes CRLF, tolerates trailing
+    whitespace and indented fences, and recognizes ```python, ```py,
+    ```python3 (case-insensitive). Other fences are skipped whole.
+    """
+
+    def __init__(self, languages=PYTHON_LANGUAGES):
+        self.languages = {lang.lower() for lang in languages}
+        self._buffer = ""
+        self._fence: Optional[str] = None
+        self._indent = 0
+        self._is_python = False
+        self._lines: List[str] = []
+        self.blocks: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns blocks completed by this piece"""
+        pending = self._buffer + text
+        # Hold a trailing CR back in case its LF arrives in the next piece
+        held = "\r" if pending.endswith("\r") else ""
+        pending = pending[:len(pending) - len(held)].replace("\r\n", "\n").replace("\r", "\n")
+
+        completed = []
+        while "\n" in pending:
+            line, pending = pending.split("\n", 1)
+            block = self._process_line(line)
+            if block is not None:
+                completed.append(block)
+        self._buffer = pending + held
+        return completed
+
+    def close(self) -> List[str]:
+        """Flush at end of stream; an unterminated Python block is returned as-is"""
+        completed = []
+        if self._buffer:
+            block = self._process_line(self._buffer.rstrip("\r"))
+            self._buffer = ""
+            if block is not None:
+                completed.append(block)
+        if self._fence is not None and self._is_python and self._lines:
+            completed.append(self._finish_block())
+        self._fence = None
+        return completed
+
+    def _process_line(self, line: str) -> Optional[str]:
+        if self._fence is None:
+            match = _OPEN_FENCE.match(line)
+            if match:
+                self._fence = match.group("fence")
+                self._indent = len(match.group("indent").expandtabs())
+                language = match.group("info").split()[0].lower() if match.group("info").split() else ""
+                self._is_python = language in self.languages
+                self._lines = []
+            return None
+
+        stripped = line.strip()
+        if stripped and set(stripped) == {self._fence[0]} and len(stripped) >= len(self._fence):
+            block = self._finish_block() if self._is_python else None
+            self._fence = None
+            return block
+
+        if self._is_python:
+            # Remove up to the fence's indentation from content lines
+            removable = len(line) - len(line.lstrip(" "))
+            self._lines.append(line[min(removable, self._indent):])
+        return None
+
+    def _finish_block(self) -> str:
+        code = "\n".join(self._lines).strip("\n")
+        self._lines = []
+        self.blocks.append(code)
+        return code
+
+
+def extract_code_blocks(text: str, languages=PYTHON_LANGUAGES) -> List[str]:
+    """All fenced Python blocks in a complete response"""
+    parser = CodeBlockParser(languages)
+    return parser.feed(text) + parser.close()
+
+
+def block_names(code: str) -> Tuple[Set[str], Set[str]]:
+    """Names a block defines and names it reads from the shared namespace
+
+    Raises:
+        SyntaxError: if the block does not parse
+    """
+    tree = ast.parse(code)
+    defined: Set[str] = set()
+    used: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (defined if isinstance(node.ctx, (ast.Store, ast.Del)) else used).add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defined.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                defined.add((alias.asname or alias.name).split(".")[0])
+    return defined, used - set(dir(builtins))
+
+
+class BlockDependencies:
+    """Tracks which names failed blocks left undefined
+
+    A block that reads a name only a failed block would have defined is
+    skipped rather than run into a NameError; independent blocks still run.
+    """
+
+    def __init__(self, available):
+        self._defined: Set[str] = set(available)
+        self._missing: Set[str] = set()
+
+    def check(self, code: str, result: Dict[str, Any]) -> Optional[Set[str]]:
+        """Names the block defines, or None (with ``result`` filled in) if it must not run"""
+        try:
+            defined, used = block_names(code)
+        except SyntaxError as e:
+            result["error"] = f"SyntaxError: {e}"
+            return None
+
+        blocked = used & self._missing
+        if blocked:
+            result["skipped"] = True
+            result["error"] = f"Skipped: depends on {sorted(blocked)} from a failed block"
+            self._missing |= defined - self._defined
+            return None
+        return defined
+
+    def succeeded(self, defined: Set[str]):
+        self._defined |= defined
+        self._missing -= defined
+
+    def failed(self, defined: Set[str]):
+        self._missing |= defined - self._defined
+
+
+def _new_result(index: int, code: str) -> Dict[str, Any]:
+    return {"index": index, "code": code, "success": False,
+            "skipped": False, "error": None, "seconds": 0.0}
+
+
+def run_blocks(blocks: List[str], exec_globals: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run complete blocks in order in one namespace, with the same skipping as IncrementalExecutor"""
+    dependencies = BlockDependencies(exec_globals)
+    results = []
+    for code in blocks:
+        result = _new_result(len(results), code)
+        results.append(result)
+        defined = dependencies.check(code, result)
+        if defined is None:
+            continue
+        start = time.perf_counter()
+        try:
+            exec(code, exec_globals)
+            result["success"] = True
+            dependencies.succeeded(defined)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            dependencies.failed(defined)
+        result["seconds"] = time.perf_counter() - start
+    return results
+
+
+class IncrementalExecutor:
+    """Runs code blocks in arrival order in one namespace, off the event loop
+
+    Blocks are chained so each starts as soon as it has arrived and the
+    previous one has finished. Blocks that depend on a failed block are
+    skipped (see BlockDependencies).
+    """
+
+    def __init__(self, exec_globals: Dict[str, Any], on_complete: Callable[[Dict[str, Any]], None] = None,
+                 languages=PYTHON_LANGUAGES):
+        self.exec_globals = exec_globals
+        self.on_complete = on_complete
+        self.parser = CodeBlockParser(languages)
+        self.results: List[Dict[str, Any]] = []
+        self._tail: Optional[asyncio.Task] = None
+        self._dependencies = BlockDependencies(exec_globals)
+
+    def feed(self, text: str) -> int:
+        """Feed streamed text; returns how many blocks were scheduled"""
+        blocks = self.parser.feed(text)
+        for code in blocks:
+            self.submit(code)
+        return len(blocks)
+
+    def submit(self, code: str) -> asyncio.Task:
+        """Schedule a block to run after every previously submitted block"""
+        previous = self._tail
+        self._tail = asyncio.ensure_future(self._run_after(previous, code))
+        return self._tail
+
+    async def _run_after(self, previous: Optional[asyncio.Task], code: str) -> Dict[str, Any]:
+        if previous is not None:
+            await previous
+
+        result = _new_result(len(self.results), code)
+        defined = self._dependencies.check(code, result)
+        if defined is None:
+            return self._record(result)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, exec, code, self.exec_globals)
+            result["success"] = True
+            self._dependencies.succeeded(defined)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            self._dependencies.failed(defined)
+        result["seconds"] = time.perf_counter() - start
+        return self._record(result)
+
+    def _record(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        self.results.append(result)
+        if self.on_complete:
+            self.on_complete(result)
+        return result
+
+    async def finish(self) -> List[Dict[str, Any]]:
+        """Flush the parser and wait for every scheduled block"""
+        for code in self.parser.close():
+            self.submit(code)
+        if self._tail is not None:
+            await self._tail
+        return self.results
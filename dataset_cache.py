@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Columnar on-disk cache of parsed CSV datasets
+
+Converts a CSV once into one .npy file per column and serves memory-mapped
+frames afterwards, so later turns, runs and exec workers skip CSV parsing.
+Entries are keyed by source path + mtime + size and rebuilt when the file changes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+CACHE_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+def _column_file(index: int) -> str:
+    return f"col_{index:04d}.npy"
+
+
+class DatasetCache:
+    """Typed, memory-mapped columnar cache for CSV files
+
+    Numeric and date columns are stored as plain numpy arrays; text columns
+    are dictionary-encoded (int32 codes + a category list) and come back as
+    pandas Categoricals. Loads use ``np.load(mmap_mode='r')`` so the OS page
+    cache is shared between every process reading the same dataset.
+    """
+
+    def __init__(self, cache_dir: str = ".dataset_cache", chunksize: int = 100_000):
+        self.cache_dir = Path(cache_dir)
+        self.chunksize = chunksize
+
+    # -- keys and manifests -------------------------------------------------
+
+    def _fingerprint(self, path: Path, parse_dates: Sequence[str] = None) -> Dict[str, Any]:
+        stat = path.stat()
+        return {
+            "source": str(path.resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "parse_dates": sorted(parse_dates or []),
+            "version": CACHE_VERSION,
+        }
+
+    def _key(self, fingerprint: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+    def entry_dir(self, path: str, parse_dates: Sequence[str] = None) -> Path:
+        """Directory holding the current cache entry for ``path``"""
+        return self.cache_dir / self._key(self._fingerprint(Path(path), parse_dates))
+
+    def _manifests(self):
+        if not self.cache_dir.exists():
+            return
+        for manifest_path in self.cache_dir.glob(f"*/{MANIFEST}"):
+            try:
+                yield manifest_path.parent, json.loads(manifest_path.read_text())
+            except (OSError, ValueError):
+                continue
+
+    def manifest(self, path: str, parse_dates: Sequence[str] = None) -> Dict[str, Any]:
+        """Manifest of an up-to-date entry, converting the CSV first if needed"""
+        entry = self.ensure(path, parse_dates)
+        return json.loads((entry / MANIFEST).read_text())
+
+    def is_cached(self, path: str, parse_dates: Sequence[str] = None) -> bool:
+        return (self.entry_dir(path, parse_dates) / MANIFEST).exists()
+
+    # -- conversion ---------------------------------------------------------
+
+    def ensure(self, path: str, parse_dates: Sequence[str] = None) -> Path:
+        """Return the entry directory for ``path``, building it on a miss"""
+        entry = self.entry_dir(path, parse_dates)
+        if (entry / MANIFEST).exists():
+            return entry
+        self._build(Path(path), entry, parse_dates)
+        self._prune_stale(Path(path), keep=entry)
+        return entry
+
+    def _read_chunks(self, path: Path, parse_dates: Sequence[str] = None, text: Sequence[str] = ()):
+        """Chunked reader; ``text`` columns are read as strings, not parsed"""
+        return pd.read_csv(path, chunksize=self.chunksize, parse_dates=list(parse_dates) if parse_dates else None,
+                           dtype={column: str for column in text} or None)
+
+    def _build(self, path: Path, entry: Path, parse_dates: Sequence[str] = None):
+        """Two chunked passes: infer types and categories, then write columns"""
+        rows = 0
+        kinds: Dict[str, str] = {}
+        dtypes: Dict[str, Any] = {}
+        categories: Dict[str, set] = {}
+        flipped = set()
+
+        with self._read_chunks(path, parse_dates) as reader:
+            for chunk in reader:
+                rows += len(chunk)
+                for column in chunk.columns:
+                    series = chunk[column]
+                    if pd.api.types.is_datetime64_any_dtype(series):
+                        kind = "datetime"
+                    elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                        kind = "numeric"
+                    else:
+                        kind = "category"
+                    previous = kinds.get(column)
+                    if previous and previous != kind:
+                        kind = "category"
+                        flipped.add(column)
+                    kinds[column] = kind
+                    if kind == "category":
+                        categories.setdefault(column, set()).update(str(v) for v in series.dropna().unique())
+                    else:
+                        dtype = np.dtype("datetime64[ns]") if kind == "datetime" else series.dtype
+                        if kind == "numeric" and series.isna().any():
+                            dtype = np.result_type(dtype, np.float64)
+                        dtypes[column] = np.result_type(dtypes[column], dtype) if column in dtypes else np.dtype(dtype)
+
+        # Columns that turned out mixed are read as text in both passes: values
+        # parsed as numbers would lose their spelling ('007' -> 7, 8 -> 8.0)
+        if flipped:
+            with pd.read_csv(path, chunksize=self.chunksize, usecols=sorted(flipped), dtype=str) as reader:
+                categories.update({column: set() for column in flipped})
+                for chunk in reader:
+                    for column in flipped:
+                        categories[column].update(chunk[column].dropna().unique())
+
+        columns = list(kinds)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".building-", dir=self.cache_dir))
+        try:
+            layout = []
+            arrays = {}
+            lookups = {}
+            for index, column in enumerate(columns):
+                kind = kinds[column]
+                info = {"name": column, "kind": kind, "file": _column_file(index)}
+                if kind == "category":
+                    cats = sorted(categories.get(column, ()))
+                    info["categories"] = cats
+                    info["dtype"] = "int32"
+                    lookups[column] = pd.Index(cats)
+                elif kind == "datetime":
+                    info["dtype"] = "datetime64[ns]"
+                else:
+                    info["dtype"] = str(dtypes[column])
+                arrays[column] = np.lib.format.open_memmap(
+                    staging / info["file"], mode="w+", dtype=np.dtype(info["dtype"]), shape=(rows,)
+                )
+                layout.append(info)
+
+            offset = 0
+            with self._read_chunks(path, parse_dates, text=sorted(flipped)) as reader:
+                for chunk in reader:
+                    end = offset + len(chunk)
+                    for column in columns:
+                        series = chunk[column]
+                        kind = kinds[column]
+                        if kind == "category":
+                            codes = lookups[column].get_indexer(series.astype(str))
+                            missing = series.isna().to_numpy()
+                            if ((codes == -1) & ~missing).any():
+                                value = series[(codes == -1) & ~missing].iloc[0]
+                                raise ValueError(f"{path}: value {value!r} of column {column!r} has no category")
+                            codes[missing] = -1
+                            arrays[column][offset:end] = codes
+                        elif kind == "datetime":
+                            arrays[column][offset:end] = series.to_numpy(dtype="datetime64[ns]")
+                        else:
+                            arrays[column][offset:end] = series.to_numpy(dtype=arrays[column].dtype, na_value=np.nan)
+                    offset = end
+
+            for array in arrays.values():
+                array.flush()
+            del arrays
+
+            manifest = {**self._fingerprint(path, parse_dates), "rows": rows, "columns": layout}
+            (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+            try:
+                os.replace(staging, entry)
+            except OSError:
+                # Another process finished the same entry first
+                if not (entry / MANIFEST).exists():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    # -- loading ------------------------------------------------------------
+
+    def load(self, path: str, columns: Sequence[str] = None, parse_dates: Sequence[str] = None) -> pd.DataFrame:
+        """Memory-mapped DataFrame for ``path``, converting the CSV on first use
+
+        Args:
+            path: Source CSV file
+            columns: Only map these columns
+            parse_dates: Columns to store as datetime64 (part of the cache key)
+        """
+        entry = self.ensure(path, parse_dates)
+        manifest = json.loads((entry / MANIFEST).read_text())
+        wanted = list(columns) if columns else None
+
+        data = {}
+        for info in manifest["columns"]:
+            if wanted is not None and info["name"] not in wanted:
+                continue
+            array = np.load(entry / info["file"], mmap_mode="r")
+            if info["kind"] == "category":
+                array = pd.Categorical.from_codes(array, categories=info["categories"], validate=False)
+            data[info["name"]] = array
+
+        if wanted is not None:
+            missing = [c for c in wanted if c not in data]
+            if missing:
+                raise KeyError(f"Columns not in dataset: {missing}")
+            data = {c: data[c] for c in wanted}
+        return pd.DataFrame(data, copy=False)
+
+    # -- invalidation -------------------------------------------------------
+
+    def _prune_stale(self, path: Path, keep: Path):
+        source = str(path.resolve())
+        for entry, manifest in list(self._manifests()):
+            if manifest.get("source") == source and entry != keep:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def invalidate(self, path: str) -> int:
+        """Drop every cached entry for ``path``; returns the number removed"""
+        source = str(Path(path).resolve())
+        removed = 0
+        for entry, manifest in list(self._manifests()):
+            if manifest.get("source") == source:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def clear(self):
+        """Remove the whole cache directory"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Summary of every cached dataset (source, rows, size on disk)"""
+        summary = []
+        for entry, manifest in self._manifests():
+            size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+            summary.append({"key": entry.name, "source": manifest.get("source"),
+                            "rows": manifest.get("rows"), "bytes": size})
+        return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the columnar dataset cache")
+    parser.add_argument("action", choices=["build", "invalidate", "clear", "list"])
+    parser.add_argument("paths", nargs="*", help="CSV files for build/invalidate")
+    parser.add_argument("--cache-dir", default=".dataset_cache")
+    args = parser.parse_args()
+
+    cache = DatasetCache(args.cache_dir)
+    if args.action == "build":
+        for path in args.paths:
+            print(f"✅ {path} -> {cache.ensure(path)}")
+    elif args.action == "invalidate":
+        for path in args.paths:
+            print(f"🗑️  {path}: removed {cache.invalidate(path)} entries")
+    elif args.action == "clear":
+        cache.clear()
+        print(f"🗑️  Cleared {cache.cache_dir}")
+    else:
+        print(json.dumps(cache.entries(), indent=2))
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Chunked dataset access for the analytics demo
+
+Profiles large CSV files with chunked read_csv iterators so neither the
+driver nor generated code has to hold the whole file in memory.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Partial statistics each aggregate needs per chunk
+_PARTIALS = {
+    "sum": ("sum",),
+    "count": ("count",),
+    "mean": ("sum", "count"),
+    "min": ("min",),
+    "max": ("max",),
+}
+
+
+def to_python(value: Any) -> Any:
+    """Convert numpy scalars to plain Python values for JSON/prompt output"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def series_to_dict(series: pd.Series) -> Dict[str, Any]:
+    return {str(k): to_python(v) for k, v in series.items()}
+
+
+def _merge_dtype(a: Optional[str], b: str) -> str:
+    """Widen dtypes seen in different chunks to one that holds both"""
+    if a is None or a == b:
+        return b
+    if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+        return str(np.result_type(a, b))
+    return "object"
+
+
+class ChunkedDataset:
+    """Chunk-aware view of a CSV file
+
+    Exposes the handful of operations the demo's generated code needs
+    (head, shape, group-by aggregates, chunk iteration) without ever
+    materializing the full frame.
+    """
+
+    def __init__(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                 dtype: Dict[str, Any] = None, parse_dates: List[str] = None, cache=None):
+        """
+        Args:
+            path: CSV file
+            chunksize: Rows per chunk
+            dtype: Column dtypes passed to read_csv (ignored when cached)
+            parse_dates: Columns to parse as datetimes
+            cache: Optional DatasetCache; chunks are then sliced from its
+                memory-mapped columns instead of parsed from text
+        """
+        self.path = Path(path)
+        self.chunksize = chunksize
+        self.dtype = dtype
+        self.parse_dates = parse_dates
+        self.cache = cache
+        self._columns = None
+        self._rows = None
+
+    def __repr__(self):
+        cached = ", cached" if self.cache is not None else ""
+        return f"ChunkedDataset({str(self.path)!r}, chunksize={self.chunksize}{cached})"
+
+    def _read_kwargs(self, columns: Sequence[str] = None) -> Dict[str, Any]:
+        kwargs = {"dtype": self.dtype, "usecols": list(columns) if columns else None}
+        if self.parse_dates:
+            wanted = set(columns) if columns else None
+            dates = [c for c in self.parse_dates if wanted is None or c in wanted]
+            kwargs["parse_dates"] = dates or None
+        return kwargs
+
+    def iter_chunks(self, columns: Sequence[str] = None) -> Iterator[pd.DataFrame]:
+        """Yield the file as DataFrames of at most ``chunksize`` rows
+
+        Args:
+            columns: Only read these columns (much cheaper on wide files)
+        """
+        if self.cache is not None:
+            frame = self.frame(columns)
+            for start in range(0, len(frame), self.chunksize):
+                yield frame.iloc[start:start + self.chunksize]
+            return
+
+        with pd.read_csv(self.path, chunksize=self.chunksize, **self._read_kwargs(columns)) as reader:
+            for chunk in reader:
+                yield chunk
+
+    def frame(self, columns: Sequence[str] = None) -> pd.DataFrame:
+        """Whole dataset as a memory-mapped frame (requires a cache)"""
+        if self.cache is None:
+            raise RuntimeError("ChunkedDataset.frame() needs a DatasetCache; use iter_chunks() instead")
+        return self.cache.load(self.path, columns=columns, parse_dates=self.parse_dates)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """First ``n`` rows, read without touching the rest of the file"""
+        if self.cache is not None:
+            return self.frame().iloc[:n]
+        return pd.read_csv(self.path, nrows=n, **self._read_kwargs())
+
+    @property
+    def columns(self) -> List[str]:
+        if self._columns is None:
+            if self.cache is not None:
+                manifest = self.cache.manifest(self.path, self.parse_dates)
+                self._columns = [c["name"] for c in manifest["columns"]]
+                self._rows = manifest["rows"]
+            else:
+                self._columns = list(pd.read_csv(self.path, nrows=0).columns)
+        return self._columns
+
+    @property
+    def shape(self) -> tuple:
+        """(rows, columns); counting rows streams a single column once"""
+        if self._rows is None:
+            first = self.columns[:1]
+            self._rows = sum(len(chunk) for chunk in self.iter_chunks(columns=first))
+        return (self._rows, len(self.columns))
+
+    def aggregate(self, by: Union[str, List[str]], aggs: Dict[str, List[str]]) -> pd.DataFrame:
+        """Group-by aggregate computed chunk by chunk
+
+        Args:
+            by: Column(s) to group on
+            aggs: Mapping of value column to aggregates, each one of
+                sum, count, mean, min, max
+
+        Returns:
+            DataFrame indexed by the group keys with (column, aggregate) columns
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        needed = {}
+        for column, funcs in aggs.items():
+            for func in funcs:
+                if func not in _PARTIALS:
+                    raise ValueError(f"Unsupported aggregate '{func}' (use one of {sorted(_PARTIALS)})")
+                needed.setdefault(column, set()).update(_PARTIALS[func])
+
+        partials = []
+        for chunk in self.iter_chunks(columns=by + list(aggs)):
+            grouped = chunk.groupby(by, dropna=False, observed=True)
+            partials.append(grouped.agg({column: sorted(stats) for column, stats in needed.items()}))
+
+        columns = pd.MultiIndex.from_tuples([(c, f) for c, funcs in aggs.items() for f in funcs])
+        if not partials:
+            return pd.DataFrame(columns=columns)
+
+        stacked = pd.concat(partials)
+        levels = list(range(len(by)))
+
+        def combine(stat: str, how: str) -> pd.DataFrame:
+            cols = [c for c in stacked.columns if c[1] == stat]
+            return getattr(stacked[cols].groupby(level=levels, dropna=False), how)()
+
+        totals = pd.concat([combine("sum", "sum"), combine("count", "sum")], axis=1)
+        mins = combine("min", "min")
+        maxs = combine("max", "max")
+
+        result = {}
+        for column, funcs in aggs.items():
+            for func in funcs:
+                if func == "mean":
+                    result[(column, func)] = totals[(column, "sum")] / totals[(column, "count")]
+                elif func == "min":
+                    result[(column, func)] = mins[(column, "min")]
+                elif func == "max":
+                    result[(column, func)] = maxs[(column, "max")]
+                else:
+                    result[(column, func)] = totals[(column, func)]
+        return pd.DataFrame(result, columns=columns)
+
+    def groupby_sum(self, by: Union[str, List[str]], value: str) -> pd.Series:
+        """Sum of ``value`` per group, e.g. ds.groupby_sum('category', 'revenue')"""
+        return self.aggregate(by, {value: ["sum"]})[(value, "sum")].rename(value)
+
+    def value_counts(self, column: str) -> pd.Series:
+        """Row count per distinct value of ``column``"""
+        counts = [chunk[column].value_counts(dropna=False) for chunk in self.iter_chunks(columns=[column])]
+        if not counts:
+            return pd.Series(dtype="int64", name=column)
+        return pd.concat(counts).groupby(level=0, dropna=False).sum().sort_values(ascending=False)
+
+
+def profile_dataset(dataset: Union[str, ChunkedDataset], group_by: Dict[str, List[str]] = None,
+                    head_rows: int = 3) -> Dict[str, Any]:
+    """Compute a compact, JSON-serializable profile of a dataset in one pass
+
+    Args:
+        dataset: CSV path or ChunkedDataset
+        group_by: Mapping of group column to value columns to sum, e.g.
+            {'category': ['revenue']} produces 'revenue_by_category'
+        head_rows: Number of leading rows to keep
+
+    Returns:
+        Dict with path, shape, columns, dtypes, null_counts, head and aggregates
+    """
+    ds = dataset if isinstance(dataset, ChunkedDataset) else ChunkedDataset(dataset)
+    group_by = group_by or {}
+
+    rows = 0
+    dtypes: Dict[str, str] = {}
+    null_counts: Optional[pd.Series] = None
+    partials = {f"{value}_by_{by}": [] for by, values in group_by.items() for value in values}
+    head = None
+
+    for chunk in ds.iter_chunks():
+        if head is None:
+            head = chunk.head(head_rows)
+        rows += len(chunk)
+        for column, dtype in chunk.dtypes.items():
+            dtypes[column] = _merge_dtype(dtypes.get(column), str(dtype))
+        nulls = chunk.isna().sum()
+        null_counts = nulls if null_counts is None else null_counts + nulls
+        for by, values in group_by.items():
+            sums = chunk.groupby(by, dropna=False, observed=True)[values].sum()
+            for value in values:
+                partials[f"{value}_by_{by}"].append(sums[value])
+
+    aggregates = {}
+    for key, parts in partials.items():
+        if parts:
+            aggregates[key] = series_to_dict(pd.concat(parts).groupby(level=0, dropna=False).sum())
+
+    ds._rows = rows
+    head = head if head is not None else ds.head(head_rows)
+    return {
+        "path": str(ds.path),
+        "shape": [rows, len(ds.columns)],
+        "columns": ds.columns,
+        "dtypes": dtypes,
+        "null_counts": series_to_dict(null_counts) if null_counts is not None else {},
+        "head": [{k: to_python(v) for k, v in row.items()} for row in head.to_dict(orient="records")],
+        "aggregates": aggregates,
+    }
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    """Render a profile as a compact prompt block"""
+    lines = [
+        f"Dataset: {profile['path']}",
+        f"Shape: {profile['shape'][0]} rows x {profile['shape'][1]} columns",
+        "Columns (dtype): " + ", ".join(f"{c} ({profile['dtypes'].get(c, '?')})" for c in profile["columns"]),
+    ]
+    nulls = {c: n for c, n in profile.get("null_counts", {}).items() if n}
+    if nulls:
+        lines.append(f"Null counts: {nulls}")
+    if profile.get("head"):
+        lines.append("First rows:")
+        lines.append(pd.DataFrame(profile["head"], columns=profile["columns"]).to_string(index=False))
+    for key, values in profile.get("aggregates", {}).items():
+        lines.append(f"{key}: {values}")
+    return "\n".join(lines)
+
+
+HELPER_API_DOC = """A ChunkedDataset named `ds` is preloaded for this file. Do NOT call pd.read_csv on
+the full file; use the chunk-aware helpers instead:
+- ds.columns, ds.shape, ds.head(n)
+- ds.groupby_sum(by, value) -> Series, e.g. ds.groupby_sum('category', 'revenue')
+- ds.aggregate(by, {'col': ['sum', 'mean', 'count', 'min', 'max']}) -> DataFrame
+- ds.value_counts(column) -> Series
+- ds.iter_chunks(columns=[...]) -> iterator of DataFrames for anything else"""
@@ -1,42 +1,51 @@
 #!/usr/bin/env python3
 """
-Working Data Analytics Demo - Properly passes execution results between turns
+Legal agent - reviews contract clauses for risks and suggests improvements
 """
 
 import asyncio
-import json
-import os
-import sys
-from pathlib import Path
+from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
 from dotenv import load_dotenv
-from logger_util import init_logging, get_logger
 
 load_dotenv()
 
-# legal-agent.py
-import asyncio
-from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
+DEFAULT_CLAUSE = "The party agrees to unlimited liability..."
 
-async def main():
-    async with ClaudeSDKClient(
-        options=ClaudeCodeOptions(
-            system_prompt="You are a legal assistant. Identify risks and suggest improvements.",
-            max_turns=1,
-            model="claude-sonnet-4-0"
-        )
-    ) as client:
-        # Send the query
-        await client.query(
-            "Review this contract clause for potential issues: 'The party agrees to unlimited liability...'"
-        )
-        
-        # Stream the response
-        async for message in client.receive_response():
-            if hasattr(message, 'content'):
-                # Print streaming content as it arrives
-                for block in message.content:
-                    if hasattr(block, 'text'):
+
+def legal_options():
+    return ClaudeCodeOptions(
+        system_prompt="You are a legal assistant. Identify risks and suggest improvements.",
+        max_turns=1,
+        model="claude-sonnet-4-0"
+    )
+
+
+async def review_clause(client, clause: str = DEFAULT_CLAUSE, echo: bool = True):
+    """Ask a connected client to review one clause; returns the review and its cost"""
+    # Send the query
+    await client.query(
+        f"Review this contract clause for potential issues: '{clause}'"
+    )
+    
+    # Stream the response
+    review = ""
+    cost = None
+    async for message in client.receive_response():
+        if hasattr(message, 'content'):
+            # Print streaming content as it arrives
+            for block in message.content:
+                if hasattr(block, 'text'):
+                    review += block.text
+                    if echo:
                         print(block.text, end='', flush=True)
+        if hasattr(message, 'total_cost_usd'):
+            cost = message.total_cost_usd
+    return {"review": review, "cost_usd": cost}
+
+
+async def main():
+    async with ClaudeSDKClient(options=legal_options()) as client:
+        await review_clause(client)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -26,6 +26,7 @@ class ResponseLogger:
         self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_file = self.log_dir / f"{self.session_prefix}_{timestamp}_{self.session_id}.jsonl"
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
         self.responses = []
         
         # Write session header
@@ -111,6 +112,26 @@ class ResponseLogger:
         
         self._write_log_entry(log_entry)
         
+    def log_route(self, route: Dict[str, Any], turn: int = None):
+        """Log the model and budgets a turn was routed to
+        
+        Args:
+            route: model_router.Route.as_dict()
+            turn: Optional turn number
+        """
+        if not self.log_file:
+            self.init_session()
+            
+        log_entry = {
+            "event_type": "route",
+            "timestamp": datetime.now().isoformat(),
+            "session_id": self.session_id,
+            "turn": turn,
+            "route": route
+        }
+        
+        self._write_log_entry(log_entry)
+        
     def close_session(self, final_result: Dict[str, Any] = None):
         """Close the current logging session"""
         if not self.log_file:
@@ -164,14 +185,16 @@ class ResponseLogger:
             return obj
         except (TypeError, ValueError):
             # Handle non-serializable objects
-            if hasattr(obj, '__dict__'):
+            if hasattr(obj, 'to_dict') and callable(obj.to_dict):  # pandas Series/DataFrame
+                return self._serialize_object(obj.to_dict())
+            elif hasattr(obj, '__dict__'):
                 return {k: self._serialize_object(v) for k, v in obj.__dict__.items()}
             elif hasattr(obj, '_asdict'):  # namedtuple
                 return obj._asdict()
             elif isinstance(obj, (list, tuple)):
                 return [self._serialize_object(item) for item in obj]
             elif isinstance(obj, dict):
-                return {k: self._serialize_object(v) for k, v in obj.items()}
+                return {str(k): self._serialize_object(v) for k, v in obj.items()}
             else:
                 return str(obj)
                 
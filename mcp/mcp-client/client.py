@@ -1,28 +1,95 @@
 import asyncio
+import sys
+import time
+from pathlib import Path
 from typing import Optional
 from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
 
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
 load_dotenv()  # load environment variables from .env
 
+# --route uses model_router.py and logger_util.py from the repository root
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_ROUTE = {"tier": "sonnet", "model": "claude-sonnet-4-0", "max_tokens": 1000}
+
+
+def load_routing():
+    """A ModelRouter tuned by the logs in REPO_ROOT/logs, and a ResponseLogger writing there
+
+    Imported lazily so the client runs standalone without --route.
+
+    Raises:
+        ImportError: if the client is not inside the repository
+    """
+    sys.path.append(str(REPO_ROOT))
+    from logger_util import ResponseLogger
+    from model_router import ModelRouter
+
+    log_dir = REPO_ROOT / "logs"
+    return ModelRouter.from_logs(str(log_dir)), ResponseLogger(log_dir=str(log_dir))
+
+
 class MCPClient:
-    def __init__(self):
+    def __init__(self, router=None, logger=None):
+        """
+        Args:
+            router: Pick model and max_tokens per call from this ModelRouter
+                (default: claude-sonnet-4-0 with 1000 tokens for every call)
+            logger: ResponseLogger recording each call's route, response and
+                tool results as a turn, so ModelRouter.from_logs learns the
+                tool_select / tool_answer success rates
+        """
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
         self.anthropic = Anthropic()
+        self.router = router
+        self.logger = logger
+        self.turn = 0
+
+    def _route(self, step: str, prompt) -> dict:
+        """Route for one messages.create call (step, tier, model, max_tokens, ...)"""
+        if self.router is None:
+            return {"step": step, **DEFAULT_ROUTE}
+        return self.router.route(step, str(prompt)).as_dict()
+
+    def _create(self, step: str, prompt, **kwargs):
+        """messages.create on the routed model, logged as its own turn
+
+        Returns:
+            Tuple of (response, turn number)
+        """
+        route = self._route(step, prompt)
+        self.turn += 1
+        if self.logger is not None:
+            self.logger.log_query(str(kwargs["messages"][-1]["content"]), turn=self.turn)
+            self.logger.log_route(route, turn=self.turn)
+        start = time.perf_counter()
+        response = self.anthropic.messages.create(model=route["model"], max_tokens=route["max_tokens"], **kwargs)
+        if self.logger is not None:
+            self.logger.log_response(response, turn=self.turn,
+                                     context={"duration_ms": (time.perf_counter() - start) * 1000})
+        return response, self.turn
 
     async def connect_to_server(self, server_script_path: str):
         """Connect to an MCP server
         
         Args:
-            server_script_path: Path to the server script (.py or .js)
+            server_script_path: Path to the server script (.py or .js), or the
+                URL of a running streamable-HTTP server (e.g. http://127.0.0.1:8000/mcp)
         """
+        if server_script_path.startswith(("http://", "https://")):
+            http_transport = await self.exit_stack.enter_async_context(streamablehttp_client(server_script_path))
+            self.stdio, self.write, _ = http_transport
+            await self._initialize_session()
+            return
+
         is_python = server_script_path.endswith('.py')
         is_js = server_script_path.endswith('.js')
         if not (is_python or is_js):
@@ -37,6 +104,10 @@ class MCPClient:
         
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
         self.stdio, self.write = stdio_transport
+        await self._initialize_session()
+
+    async def _initialize_session(self):
+        """Open the MCP session over the connected transport"""
         self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
         
         await self.session.initialize()
@@ -63,9 +134,8 @@ class MCPClient:
         } for tool in response.tools]
 
         # Initial Claude API call
-        response = self.anthropic.messages.create(
-            model="claude-sonnet-4-0",
-            max_tokens=1000,
+        response, select_turn = self._create(
+            "tool_select", [query, available_tools],
             messages=messages,
             tools=available_tools
         )
@@ -84,6 +154,11 @@ class MCPClient:
                 # Execute tool call
                 result = await self.session.call_tool(tool_name, tool_args)
                 tool_results.append({"call": tool_name, "result": result})
+                if self.logger is not None:
+                    # A failed tool call counts against the turn that chose it
+                    self.logger.log_execution(f"{tool_name}({tool_args})", result.content, turn=select_turn,
+                                              success=not result.isError,
+                                              error="Tool returned an error" if result.isError else None)
                 final_text.append(f"[Calling tool {tool_name} with args {tool_args}]")
 
                 # Continue conversation with tool results
@@ -98,9 +173,8 @@ class MCPClient:
                 })
 
                 # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model="claude-sonnet-4-0",
-                    max_tokens=1000,
+                response, _ = self._create(
+                    "tool_answer", messages,
                     messages=messages,
                 )
 
@@ -129,19 +203,31 @@ class MCPClient:
     async def cleanup(self):
         """Clean up resources"""
         await self.exit_stack.aclose()
+        if self.logger is not None:
+            self.logger.close_session({"turns": self.turn})
 
 async def main():
-    if len(sys.argv) < 2:
-        print("Usage: python client.py <path_to_server_script>")
+    args = [arg for arg in sys.argv[1:] if arg != "--route"]
+    if len(args) < 1:
+        print("Usage: python client.py <path_to_server_script | server_url> [--route]")
         sys.exit(1)
         
-    client = MCPClient()
+    # --route picks model and max_tokens per call from the outcomes logged in
+    # the repository's logs/, and logs this session's calls there too
+    router = logger = None
+    if "--route" in sys.argv:
+        try:
+            router, logger = load_routing()
+        except ImportError as e:
+            print(f"--route needs model_router.py and logger_util.py from the repository root ({REPO_ROOT}): {e}")
+            sys.exit(1)
+        logger.init_session()
+    client = MCPClient(router=router, logger=logger)
     try:
-        await client.connect_to_server(sys.argv[1])
+        await client.connect_to_server(args[0])
         await client.chat_loop()
     finally:
         await client.cleanup()
 
 if __name__ == "__main__":
-    import sys
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""Benchmark per-agent stdio servers against one shared HTTP server.
+
+Simulates N agents that each connect, call a few tools, and disconnect:
+
+  stdio   every agent spawns its own weather.py subprocess (today's setup)
+  shared  every agent connects to one long-lived streamable-HTTP server
+
+Both modes talk to the fake NWS API from loadtest.py. Prints a JSON report.
+
+    uv run bench_transport.py --agents 20 --calls 5 --workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from loadtest import STATES, FakeNWSConfig, open_devnull, percentile, start_fake_nws
+
+WEATHER_SERVER = Path(__file__).parent / "weather.py"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _agent_session(session: ClientSession, calls: int, agent: int) -> list[float]:
+    await session.initialize()
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        if i % 2:
+            await session.call_tool("get_forecast", {"latitude": 37.7749, "longitude": -122.4194})
+        else:
+            await session.call_tool("get_alerts", {"state": STATES[agent % len(STATES)]})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def stdio_agent(env: dict[str, str], calls: int, agent: int) -> tuple[float, list[float]]:
+    """One agent that spawns its own server, as weather-agent.py does today."""
+    start = time.perf_counter()
+    params = StdioServerParameters(command=sys.executable, args=[str(WEATHER_SERVER)], env=env)
+    async with open_devnull() as devnull, stdio_client(params, errlog=devnull) as (read, write):
+        async with ClientSession(read, write) as session:
+            latencies = await _agent_session(session, calls, agent)
+    return time.perf_counter() - start, latencies
+
+
+async def http_agent(url: str, calls: int, agent: int) -> tuple[float, list[float]]:
+    """One agent that connects to the shared HTTP server."""
+    start = time.perf_counter()
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            latencies = await _agent_session(session, calls, agent)
+    return time.perf_counter() - start, latencies
+
+
+async def wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            await writer.wait_closed()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"weather server did not listen on port {port}")
+
+
+def summarize(mode: str, elapsed: float, results: list[Any], calls: int) -> dict[str, Any]:
+    errors = [r for r in results if isinstance(r, BaseException)]
+    ok = [r for r in results if not isinstance(r, BaseException)]
+    sessions = sorted(r[0] for r in ok)
+    latencies = sorted(lat for r in ok for lat in r[1])
+    return {
+        "mode": mode,
+        "agents": len(results),
+        "errors": len(errors),
+        "wall_s": round(elapsed, 3),
+        "calls_per_s": round(len(ok) * calls / elapsed, 2) if elapsed else None,
+        "agent_session_s": {
+            "p50": round(percentile(sessions, 50), 3) if sessions else None,
+            "p95": round(percentile(sessions, 95), 3) if sessions else None,
+        },
+        "call_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        },
+    }
+
+
+async def run_benchmark(args: argparse.Namespace, nws_base: str, tmp: Path) -> dict[str, Any]:
+    base_env = {**os.environ, "NWS_API_BASE": nws_base, "WEATHER_CACHE_TTL": str(args.cache_ttl)}
+    report: dict[str, Any] = {"config": vars(args)}
+
+    stdio_env = {**base_env, "WEATHER_CACHE_PATH": str(tmp / "stdio.sqlite3")}
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(stdio_agent(stdio_env, args.calls, i) for i in range(args.agents)), return_exceptions=True
+    )
+    report["stdio"] = summarize("stdio", time.perf_counter() - start, results, args.calls)
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, str(WEATHER_SERVER), "--transport", "streamable-http",
+         "--port", str(port), "--workers", str(args.workers)],
+        env={**base_env, "WEATHER_CACHE_PATH": str(tmp / "shared.sqlite3")},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        server_start = time.perf_counter()
+        await wait_for_port(port)
+        url = f"http://127.0.0.1:{port}/mcp"
+        report["shared_server_startup_s"] = round(time.perf_counter() - server_start, 3)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(http_agent(url, args.calls, i) for i in range(args.agents)), return_exceptions=True
+        )
+        report["shared"] = summarize("shared", time.perf_counter() - start, results, args.calls)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    if report["shared"]["wall_s"]:
+        report["speedup"] = round(report["stdio"]["wall_s"] / report["shared"]["wall_s"], 2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-agent stdio servers with a shared HTTP server")
+    parser.add_argument("--agents", type=int, default=10, help="concurrent agents")
+    parser.add_argument("--calls", type=int, default=4, help="tool calls per agent")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the shared server")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean fake NWS latency")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="server response cache TTL (0 disables)")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    args = parser.parse_args()
+
+    nws = start_fake_nws(FakeNWSConfig(latency_ms=args.latency_ms))
+    host, port = nws.server_address[:2]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = asyncio.run(run_benchmark(args, f"http://{host}:{port}", Path(tmp)))
+    finally:
+        nws.shutdown()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Synthetic load generator for the weather MCP server.
+
+Starts a local stand-in for the NWS API, launches weather.py over stdio
+pointed at it, and fires many concurrent get_alerts/get_forecast calls.
+Prints a JSON report (throughput, latency percentiles, memory, errors).
+
+    uv run loadtest.py --requests 500 --concurrency 50 --latency-ms 80 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+WEATHER_SERVER = Path(__file__).parent / "weather.py"
+STATES = ["CA", "NY", "TX", "FL", "WA", "CO", "IL", "AZ"]
+
+
+@contextlib.asynccontextmanager
+async def open_devnull():
+    """A writable os.devnull for silencing server stderr, closed on exit."""
+    with open(os.devnull, "w") as devnull:
+        yield devnull
+
+
+class FakeNWSConfig:
+    """Behaviour knobs for the fake NWS server."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 20.0,
+        error_rate: float = 0.0,
+        alerts: int = 5,
+        periods: int = 14,
+        text_bytes: int = 400,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.alerts = alerts
+        self.periods = periods
+        self.text_bytes = text_bytes
+
+
+def _filler(size: int) -> str:
+    return ("Lorem ipsum dolor sit amet. " * (size // 28 + 1))[:size]
+
+
+class FakeNWSHandler(BaseHTTPRequestHandler):
+    """Serves the three NWS endpoints weather.py uses."""
+
+    config: FakeNWSConfig = FakeNWSConfig()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        config = self.config
+        delay = max(0.0, random.gauss(config.latency_ms, config.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        if random.random() < config.error_rate:
+            self._send(500, {"title": "Injected failure"})
+            return
+
+        parts = self.path.strip("/").split("/")
+        if parts[:3] == ["alerts", "active", "area"]:
+            self._send(200, self._alerts(parts[3] if len(parts) > 3 else "CA"))
+        elif parts[0] == "points":
+            host = f"http://{self.headers.get('Host')}"
+            self._send(200, {"properties": {"forecast": f"{host}/gridpoints/MTR/85,105/forecast"}})
+        elif parts[0] == "gridpoints" and parts[-1] == "forecast":
+            self._send(200, self._forecast())
+        else:
+            self._send(404, {"title": "Not Found"})
+
+    def _alerts(self, state: str) -> dict[str, Any]:
+        description = _filler(self.config.text_bytes)
+        return {
+            "features": [
+                {
+                    "properties": {
+                        "event": "Wind Advisory",
+                        "areaDesc": f"Zone {i}, {state}",
+                        "severity": "Moderate",
+                        "description": description,
+                        "instruction": "Secure outdoor objects.",
+                    }
+                }
+                for i in range(self.config.alerts)
+            ]
+        }
+
+    def _forecast(self) -> dict[str, Any]:
+        detail = _filler(self.config.text_bytes)
+        return {
+            "properties": {
+                "periods": [
+                    {
+                        "name": f"Period {i}",
+                        "temperature": 60 + i % 10,
+                        "temperatureUnit": "F",
+                        "windSpeed": "10 mph",
+                        "windDirection": "W",
+                        "detailedForecast": detail,
+                    }
+                    for i in range(self.config.periods)
+                ]
+            }
+        }
+
+    def _send(self, status: int, body: dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_fake_nws(config: FakeNWSConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake NWS server on a background thread."""
+    handler = type("ConfiguredFakeNWSHandler", (FakeNWSHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _child_pids() -> list[int]:
+    """PIDs of this process's direct children (Linux /proc only)."""
+    me = os.getpid()
+    pids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == me:
+            pids.append(int(stat.parent.name))
+    return pids
+
+
+def _rss_kb(pid: int) -> int | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def classify(result: Any) -> str:
+    """Bucket a tool result into ok or an error category."""
+    if getattr(result, "isError", False):
+        return "tool_error"
+    text = "".join(getattr(block, "text", "") for block in result.content)
+    if text.startswith("Unable to fetch"):
+        return "upstream_error"
+    return "ok"
+
+
+async def run_load(args: argparse.Namespace, nws_base: str) -> dict[str, Any]:
+    """Drive the MCP server with concurrent tool calls and collect metrics."""
+    server_params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(WEATHER_SERVER)],
+        env={
+            **os.environ,
+            "NWS_API_BASE": nws_base,
+            "WEATHER_CACHE_TTL": str(args.cache_ttl),
+            "WEATHER_CACHE_PATH": args.cache_path,
+        },
+    )
+
+    latencies: dict[str, list[float]] = {"get_alerts": [], "get_forecast": []}
+    outcomes: Counter[str] = Counter()
+    peak_server_rss = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with open_devnull() as devnull, stdio_client(server_params, errlog=devnull) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            server_pids = _child_pids()
+
+            async def one_call(i: int) -> None:
+                if random.random() < args.forecast_ratio:
+                    tool = "get_forecast"
+                    arguments = {"latitude": 37.7749 + i % 10 / 100, "longitude": -122.4194}
+                else:
+                    tool = "get_alerts"
+                    arguments = {"state": STATES[i % len(STATES)]}
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        result = await session.call_tool(tool, arguments)
+                        outcome = classify(result)
+                    except Exception as e:
+                        outcome = f"exception:{type(e).__name__}"
+                    latencies[tool].append(time.perf_counter() - start)
+                    outcomes[f"{tool}:{outcome}"] += 1
+
+            async def sample_memory() -> None:
+                nonlocal peak_server_rss
+                while True:
+                    rss = sum(_rss_kb(pid) or 0 for pid in server_pids)
+                    peak_server_rss = max(peak_server_rss, rss)
+                    await asyncio.sleep(0.1)
+
+            sampler = asyncio.create_task(sample_memory())
+            start = time.perf_counter()
+            await asyncio.gather(*(one_call(i) for i in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+
+    all_latencies = sorted(latencies["get_alerts"] + latencies["get_forecast"])
+
+    def summary(values: list[float]) -> dict[str, Any]:
+        values = sorted(values)
+        return {
+            "count": len(values),
+            **{
+                f"p{p}_ms": round(percentile(values, p) * 1000, 2) if values else None
+                for p in (50, 90, 95, 99)
+            },
+            "max_ms": round(values[-1] * 1000, 2) if values else None,
+        }
+
+    errors = {key: count for key, count in outcomes.items() if not key.endswith(":ok")}
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "forecast_ratio": args.forecast_ratio,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "alerts": args.alerts,
+            "periods": args.periods,
+            "text_bytes": args.text_bytes,
+            "cache_ttl": args.cache_ttl,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2) if elapsed else None,
+        "latency": {
+            "all": summary(all_latencies),
+            "get_alerts": summary(latencies["get_alerts"]),
+            "get_forecast": summary(latencies["get_forecast"]),
+        },
+        "memory": {
+            "server_peak_rss_kb": peak_server_rss or None,
+            "client_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "errors": {
+            "total": sum(errors.values()),
+            "rate": round(sum(errors.values()) / args.requests, 4) if args.requests else 0,
+            "breakdown": errors,
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the weather MCP server against a fake NWS API")
+    parser.add_argument("--requests", type=int, default=200, help="total tool calls")
+    parser.add_argument("--concurrency", type=int, default=20, help="max in-flight tool calls")
+    parser.add_argument("--forecast-ratio", type=float, default=0.5, help="share of get_forecast calls")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean fake NWS latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="stddev of fake NWS latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of NWS requests answered with 500")
+    parser.add_argument("--alerts", type=int, default=5, help="alerts per get_alerts response")
+    parser.add_argument("--periods", type=int, default=14, help="periods per forecast response")
+    parser.add_argument("--text-bytes", type=int, default=400, help="size of description fields")
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="server response cache TTL (0 disables)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible runs")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    config = FakeNWSConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        alerts=args.alerts,
+        periods=args.periods,
+        text_bytes=args.text_bytes,
+    )
+    nws = start_fake_nws(config)
+    host, port = nws.server_address[:2]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            args.cache_path = str(Path(tmp) / "cache.sqlite3")
+            report = asyncio.run(run_load(args, f"http://{host}:{port}"))
+    finally:
+        nws.shutdown()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""ResponseCache tests (run with: uv run --with pytest pytest test_cache.py)"""
+
+import sqlite3
+
+from weather import ResponseCache
+
+
+def rows(path) -> list[str]:
+    with sqlite3.connect(path) as conn:
+        return [url for (url,) in conn.execute("SELECT url FROM responses ORDER BY url")]
+
+
+def test_set_prunes_expired_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path, ttl=60)
+    now = 1_000_000.0
+    monkeypatch.setattr("weather.time.time", lambda: now)
+
+    cache.set("https://nws/a", {"a": 1})
+    cache.set("https://nws/b", {"b": 1})
+    assert rows(path) == ["https://nws/a", "https://nws/b"]
+
+    # Both expire; the next set after a TTL deletes them instead of just hiding them
+    now += 61
+    assert cache.get("https://nws/a") is None
+    cache.set("https://nws/c", {"c": 1})
+    assert rows(path) == ["https://nws/c"]
+    assert cache.get("https://nws/c") == {"c": 1}
@@ -1,3 +1,12 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
 from typing import Any
 import httpx
 from mcp.server.fastmcp import FastMCP
@@ -6,22 +15,105 @@ from mcp.server.fastmcp import FastMCP
 mcp = FastMCP("weather")
 
 # Constants
-NWS_API_BASE = "https://api.weather.gov"
+NWS_API_BASE = os.environ.get("NWS_API_BASE", "https://api.weather.gov").rstrip("/")
 USER_AGENT = "weather-app/1.0"
+CACHE_PATH = os.environ.get("WEATHER_CACHE_PATH", str(Path(tempfile.gettempdir()) / "weather-mcp-cache.sqlite3"))
+# Off by default so stdio users always see live alerts; HTTP serving turns it on (see __main__)
+CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", "0"))
+HTTP_CACHE_TTL = "300"
 
-async def make_nws_request(url: str) -> dict[str, Any] | None:
-    """Make a request to the NWS API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/geo+json"
-    }
-    async with httpx.AsyncClient() as client:
+_http_client: httpx.AsyncClient | None = None
+
+
+class ResponseCache:
+    """SQLite-backed cache of NWS responses shared by every server process on the host.
+
+    The blocking sqlite3 calls run in worker threads (aget/aset), each with its own connection.
+    Expired rows are deleted by set, at most once per TTL, so a long-running server's file
+    stays bounded by the URLs fetched within about two TTLs.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._next_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body TEXT, expires REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        if self.ttl <= 0:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT body FROM responses WHERE url = ? AND expires > ?", (url, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, url: str, data: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.time()
         try:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except Exception:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, expires) VALUES (?, ?, ?)",
+                (url, json.dumps(data), now + self.ttl),
+            )
+            if now >= self._next_prune:
+                self._next_prune = now + self.ttl
+                conn.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        except sqlite3.Error:
+            pass
+
+    async def aget(self, url: str) -> dict[str, Any] | None:
+        if self.ttl <= 0:
             return None
+        return await asyncio.to_thread(self.get, url)
+
+    async def aset(self, url: str, data: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        await asyncio.to_thread(self.set, url, data)
+
+
+cache = ResponseCache(CACHE_PATH, CACHE_TTL)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client so connections stay warm across tool calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept": "application/geo+json"},
+            timeout=30.0,
+        )
+    return _http_client
+
+async def make_nws_request(url: str) -> dict[str, Any] | None:
+    """Make a request to the NWS API with proper error handling."""
+    cached = await cache.aget(url)
+    if cached is not None:
+        return cached
+    try:
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        data = response.json()
+    except Exception:
+        return None
+    await cache.aset(url, data)
+    return data
 
 def format_alert(feature: dict) -> str:
     """Format an alert feature into a readable string."""
@@ -89,7 +181,42 @@ Forecast: {period['detailedForecast']}
 
     return "\n---\n".join(forecasts)
 
+def create_app():
+    """Build the ASGI app for HTTP serving; used as a uvicorn factory by each worker."""
+    if os.environ.get("WEATHER_TRANSPORT", "streamable-http") == "sse":
+        return mcp.sse_app()
+    # Stateless mode lets any worker answer any request, so workers can share one port
+    mcp.settings.stateless_http = True
+    return mcp.streamable_http_app()
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Weather MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for streamable-http")
+    args = parser.parse_args()
+    if args.workers > 1 and args.transport != "streamable-http":
+        parser.error("--workers > 1 requires --transport streamable-http (SSE sessions are per-process)")
+    return args
+
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport='stdio')
+    args = parse_args()
+    if args.transport == "stdio":
+        # Initialize and run the server
+        mcp.run(transport='stdio')
+    else:
+        import uvicorn
+
+        os.environ["WEATHER_TRANSPORT"] = args.transport
+        # Workers re-import this module, so the cache default reaches them through the environment
+        os.environ.setdefault("WEATHER_CACHE_TTL", HTTP_CACHE_TTL)
+        uvicorn.run(
+            "weather:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            app_dir=str(Path(__file__).parent),
+        )
 
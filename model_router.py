@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Per-step model routing and token budgets
+
+Instead of pinning one model for every turn, ModelRouter picks the model,
+max_tokens and max_turns for each step from a policy: a default tier per
+step type, raised for large prompts, and moved up or down a tier by the
+success rates observed in ResponseLogger session logs. Routes apply to
+ClaudeCodeOptions (Route.apply) and to Anthropic messages.create
+(Route.create_kwargs). RoutedClient wraps an SDK client and switches
+model between turns by resuming the same session with new options.
+
+Only the standard library is used, so the MCP client can share it.
+"""
+
+import json
+import math
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Claude Code reads its output-token cap from this environment variable
+MAX_OUTPUT_ENV = "CLAUDE_CODE_MAX_OUTPUT_TOKENS"
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """A routable model with list prices and a rough relative latency
+
+    ``latency_factor`` scales a turn's duration relative to sonnet; it is
+    only used to estimate latency when re-pricing recorded turns.
+    """
+    tier: str
+    model: str
+    input_per_mtok: float
+    output_per_mtok: float
+    latency_factor: float
+
+    def token_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_per_mtok + output_tokens * self.output_per_mtok) / 1_000_000
+
+
+TIERS = ("haiku", "sonnet", "opus")
+MODELS = {
+    "haiku": ModelSpec("haiku", "claude-3-5-haiku-latest", 0.80, 4.00, 0.5),
+    "sonnet": ModelSpec("sonnet", "claude-sonnet-4-0", 3.00, 15.00, 1.0),
+    "opus": ModelSpec("opus", "claude-opus-4-1", 15.00, 75.00, 1.8),
+}
+# What unrouted runs use (every agent here pins or defaults to sonnet)
+DEFAULT_TIER = "sonnet"
+
+
+@dataclass(frozen=True)
+class StepPolicy:
+    """Starting tier and budgets for one step type"""
+    tier: str
+    max_tokens: int
+    max_turns: int = 1
+
+
+STEP_POLICIES = {
+    # Analytics demo: turn 1 writes short pandas code against a known schema
+    "analysis": StepPolicy("haiku", max_tokens=2048, max_turns=2),
+    "chart": StepPolicy("sonnet", max_tokens=2048, max_turns=2),
+    # The chart is read from disk with a tool call, so two turns
+    "vision": StepPolicy("sonnet", max_tokens=1024, max_turns=2),
+    # MCP client: choosing tools, then phrasing their results
+    "tool_select": StepPolicy("haiku", max_tokens=1000),
+    "tool_answer": StepPolicy("haiku", max_tokens=1000),
+    "chat": StepPolicy("sonnet", max_tokens=4096, max_turns=4),
+}
+# Step type of each analytics demo turn
+DEMO_TURN_STEPS = {1: "analysis", 2: "chart", 3: "vision"}
+
+MAX_TURNS_CAP = 4
+# Rough input tokens added per attached image (see chart_render.estimate_image_tokens)
+ATTACHMENT_TOKENS = 800
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate tokens in ``text`` (about 4 characters per token)"""
+    return math.ceil(len(text or "") / 4)
+
+
+def tier_of(model: Optional[str]) -> str:
+    """Tier name for a model id, DEFAULT_TIER if unknown or unset"""
+    for tier in TIERS:
+        if model and tier in model:
+            return tier
+    return DEFAULT_TIER
+
+
+@dataclass
+class Route:
+    """The model and budgets picked for one step, with the reasons why"""
+    step: str
+    tier: str
+    model: str
+    max_tokens: int
+    max_turns: int
+    prompt_tokens: int = 0
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        """Routes with the same key can share one connected client
+
+        max_tokens is left out: a different output cap alone is not worth
+        reconnecting for, so the open client's cap is kept.
+        """
+        return (self.model, self.max_turns)
+
+    def apply(self, options):
+        """Copy of ClaudeCodeOptions with this route's model and budgets"""
+        return replace(options, model=self.model, max_turns=self.max_turns,
+                       env={**options.env, MAX_OUTPUT_ENV: str(self.max_tokens)})
+
+    def create_kwargs(self) -> Dict[str, Any]:
+        """model and max_tokens for Anthropic messages.create"""
+        return {"model": self.model, "max_tokens": self.max_tokens}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class StepStats:
+    """Observed outcomes of one step type on one tier"""
+    attempts: int = 0
+    successes: int = 0
+    max_turn_errors: int = 0
+    duration_ms: List[float] = field(default_factory=list)
+    cost_usd: List[float] = field(default_factory=list)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self.successes / self.attempts if self.attempts else None
+
+
+class SuccessStats:
+    """Success rates per (step, tier), usually read from session logs"""
+
+    def __init__(self):
+        self.steps: Dict[Tuple[str, str], StepStats] = {}
+
+    def get(self, step: str, tier: str) -> StepStats:
+        return self.steps.get((step, tier), StepStats())
+
+    def step_attempts(self, step: str) -> int:
+        """Attempts of a step on any tier"""
+        return sum(s.attempts for (name, _), s in self.steps.items() if name == step)
+
+    def record(self, step: str, tier: str, success: bool, max_turns_hit: bool = False,
+               duration_ms: float = None, cost_usd: float = None):
+        stats = self.steps.setdefault((step, tier), StepStats())
+        stats.attempts += 1
+        stats.successes += bool(success)
+        stats.max_turn_errors += bool(max_turns_hit)
+        if duration_ms is not None:
+            stats.duration_ms.append(duration_ms)
+        if cost_usd is not None:
+            stats.cost_usd.append(cost_usd)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{step}/{tier}": {"attempts": s.attempts, "successes": s.successes,
+                               "max_turn_errors": s.max_turn_errors}
+            for (step, tier), s in sorted(self.steps.items())
+        }
+
+    @classmethod
+    def from_logs(cls, log_dir: str = "logs", session_prefix: str = "claude_responses",
+                  turn_steps: Dict[int, str] = None) -> "SuccessStats":
+        """Stats from every ResponseLogger session log in ``log_dir``"""
+        return cls.from_log_files(sorted(Path(log_dir).glob(f"{session_prefix}_*.jsonl")), turn_steps)
+
+    @classmethod
+    def from_log_files(cls, log_files: Iterable, turn_steps: Dict[int, str] = None) -> "SuccessStats":
+        """Stats from session logs
+
+        A turn counts as a success if its ResultMessage reports success (for
+        a messages.create response: it was not cut off at max_tokens) and
+        none of its code executions or tool calls failed. The step and tier come from the
+        turn's route event if it was routed, else from ``turn_steps`` (default:
+        the analytics demo turns) and the model on its AssistantMessages.
+        Turns without a ResultMessage (interrupted or cut off) are skipped.
+        """
+        turn_steps = DEMO_TURN_STEPS if turn_steps is None else turn_steps
+        stats = cls()
+        for log_file in log_files:
+            turns: Dict[Any, Dict[str, Any]] = {}
+            with open(log_file) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    turn = entry.get("turn")
+                    if turn is None:
+                        continue
+                    state = turns.setdefault(turn, {"step": turn_steps.get(turn), "tier": None,
+                                                    "result": None, "exec_failed": False})
+                    event_type = entry.get("event_type")
+                    data = entry.get("response_data") or {}
+                    if event_type == "route":
+                        state.update(step=entry["route"]["step"], tier=entry["route"]["tier"])
+                    elif event_type == "query":
+                        # A re-issued turn starts over
+                        state.update(tier=None, result=None, exec_failed=False)
+                    elif event_type == "execution" and not entry.get("success", True):
+                        state["exec_failed"] = True
+                    elif event_type == "response" and entry.get("message_type") == "AssistantMessage":
+                        state["tier"] = state["tier"] or (tier_of(data["model"]) if data.get("model") else None)
+                    elif event_type == "response" and entry.get("message_type") == "ResultMessage":
+                        state["result"] = data
+                    elif event_type == "response" and entry.get("message_type") == "Message":
+                        # A messages.create response (MCP client): a truncated reply fails
+                        truncated = data.get("stop_reason") == "max_tokens"
+                        state["result"] = {"subtype": "error_max_tokens" if truncated else "success",
+                                           "duration_ms": (entry.get("context") or {}).get("duration_ms")}
+
+            for state in turns.values():
+                result = state["result"]
+                if result is None or state["step"] is None:
+                    continue
+                subtype = result.get("subtype")
+                stats.record(
+                    state["step"], state["tier"] or DEFAULT_TIER,
+                    success=subtype == "success" and not result.get("is_error") and not state["exec_failed"],
+                    max_turns_hit=subtype == "error_max_turns",
+                    duration_ms=result.get("duration_ms"),
+                    cost_usd=result.get("total_cost_usd"),
+                )
+        return stats
+
+
+class ModelRouter:
+    """Picks a Route per step from STEP_POLICIES, prompt size and observed success
+
+    A step only moves down to a cheaper tier once that tier has succeeded
+    on ``min_samples`` of its turns, but the router would never send it
+    those turns on its own. So every ``explore_every``-th route of a step
+    (counting its logged attempts) trials the tier below the policy's
+    while that tier has fewer than ``min_samples`` attempts and no
+    failures. A failed trial ends the exploration, and the step escalates
+    back to its policy tier. At most ``min_samples`` trials are made per
+    step.
+    """
+
+    def __init__(self, stats: SuccessStats = None, policies: Dict[str, StepPolicy] = None,
+                 large_prompt_tokens: int = 6000, min_samples: int = 3, min_success: float = 0.9,
+                 explore_every: int = 10):
+        """
+        Args:
+            stats: Observed success rates (default: none, so policy defaults apply)
+            policies: Step type -> StepPolicy (default: STEP_POLICIES)
+            large_prompt_tokens: Prompts above this never go to the cheapest tier
+            min_samples: Attempts needed before a success rate moves a route
+            min_success: Success rate a tier needs to be kept (or moved down to)
+            explore_every: Trial the cheaper tier on every Nth route of a step
+                until it has ``min_samples`` attempts (0 = never explore)
+        """
+        self.stats = stats or SuccessStats()
+        self.policies = policies or STEP_POLICIES
+        self.large_prompt_tokens = large_prompt_tokens
+        self.min_samples = min_samples
+        self.min_success = min_success
+        self.explore_every = explore_every
+        self._routed: Dict[str, int] = {}
+
+    @classmethod
+    def from_logs(cls, log_dir: str = "logs", **kwargs) -> "ModelRouter":
+        return cls(stats=SuccessStats.from_logs(log_dir), **kwargs)
+
+    def _reliable(self, step: str, tier: str) -> Optional[bool]:
+        """True/False once a tier has enough samples for this step, else None"""
+        stats = self.stats.get(step, tier)
+        if stats.attempts < self.min_samples:
+            return None
+        return stats.rate >= self.min_success
+
+    def _explore(self, step: str, tier: str) -> bool:
+        """Whether this route of ``step`` should trial ``tier``, a tier below its policy's"""
+        if not self.explore_every:
+            return False
+        stats = self.stats.get(step, tier)
+        if stats.attempts >= self.min_samples or stats.successes < stats.attempts:
+            return False
+        # Count from the step's logged attempts, so short runs that each
+        # build a new router from the logs still take their turn
+        seen = self._routed.setdefault(step, self.stats.step_attempts(step))
+        return seen % self.explore_every == self.explore_every - 1
+
+    def route(self, step: str, prompt: str = "", attachments: Iterable = ()) -> Route:
+        policy = self.policies.get(step) or self.policies["chat"]
+        prompt_tokens = estimate_tokens(prompt) + ATTACHMENT_TOKENS * len(list(attachments or ()))
+        index = TIERS.index(policy.tier)
+        reasons = [f"{step} starts on {policy.tier}"]
+
+        # A cheaper tier that has proven itself on this step takes over;
+        # one that hasn't been tried enough gets the occasional trial turn
+        if index > 0 and self._reliable(step, TIERS[index - 1]):
+            index -= 1
+            reasons.append(f"{TIERS[index]} succeeded on {self._rate_text(step, TIERS[index])}")
+        elif index > 0 and self._explore(step, TIERS[index - 1]):
+            index -= 1
+            trial = self.stats.get(step, TIERS[index]).attempts + 1
+            reasons.append(f"exploring {TIERS[index]} (trial {trial}/{self.min_samples}, "
+                           f"every {self.explore_every} {step} routes)")
+        self._routed[step] = self._routed.get(step, self.stats.step_attempts(step)) + 1
+
+        if index == 0 and prompt_tokens > self.large_prompt_tokens:
+            index = 1
+            reasons.append(f"prompt ~{prompt_tokens} tokens > {self.large_prompt_tokens}")
+
+        # Move up while the chosen tier keeps failing this step
+        while index < len(TIERS) - 1 and self._reliable(step, TIERS[index]) is False:
+            reasons.append(f"{TIERS[index]} succeeded on only {self._rate_text(step, TIERS[index])}")
+            index += 1
+
+        tier = TIERS[index]
+        max_turns = policy.max_turns
+        if self.stats.get(step, tier).max_turn_errors:
+            max_turns = min(max_turns + 1, MAX_TURNS_CAP)
+            reasons.append(f"{step} ran out of turns before; max_turns {max_turns}")
+
+        return Route(step=step, tier=tier, model=MODELS[tier].model, max_tokens=policy.max_tokens,
+                     max_turns=max_turns, prompt_tokens=prompt_tokens, reasons=reasons)
+
+    def _rate_text(self, step: str, tier: str) -> str:
+        stats = self.stats.get(step, tier)
+        return f"{stats.successes}/{stats.attempts} {step} turns"
+
+
+def reprice(cost_usd: float, duration_ms: float, usage: Dict[str, Any],
+            from_tier: str, to_tier: str, max_tokens: int = None) -> Tuple[float, float]:
+    """Estimate what a recorded turn would cost and take on another tier
+
+    The recorded cost is scaled by the ratio of the two tiers' prices for the
+    turn's token usage (output capped at ``max_tokens``); the duration by
+    their latency factors and the share of output kept.
+
+    Returns:
+        (cost_usd, seconds)
+    """
+    usage = usage or {}
+    input_tokens = usage.get("input_tokens", 0) + usage.get("cache_read_input_tokens", 0) \
+        + usage.get("cache_creation_input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    kept_output = min(output_tokens, max_tokens) if max_tokens else output_tokens
+    source, target = MODELS[from_tier], MODELS[to_tier]
+
+    source_cost = source.token_cost(input_tokens, output_tokens)
+    cost_scale = target.token_cost(input_tokens, kept_output) / source_cost if source_cost else 1.0
+    output_share = kept_output / output_tokens if output_tokens else 1.0
+    seconds = (duration_ms or 0) / 1000 * target.latency_factor / source.latency_factor * output_share
+    return (cost_usd or 0) * cost_scale, seconds
+
+
+class RoutedClient:
+    """SDK client wrapper that routes every query to its own model and budgets
+
+    The underlying client is opened lazily with the first route's options.
+    When a later query routes differently, that client is closed and a new
+    one resumes the same session with the new route's options, so context
+    carries over. Without a session id to resume, the current client is
+    kept. Connections happen in the calling task, like the SDK client's.
+    """
+
+    def __init__(self, router: ModelRouter, factory: Callable[..., Any], options: Any = None,
+                 logger=None, default_step: str = "chat"):
+        """
+        Args:
+            router: Picks each query's Route
+            factory: Callable taking ``options=`` and returning an SDK client
+            options: Base ClaudeCodeOptions; routes override model, max_turns
+                and the output-token cap
+            logger: ResponseLogger to record each turn's route in
+            default_step: Step type for queries sent without one
+        """
+        self.router = router
+        self.client_factory = factory
+        self.options = options
+        self.logger = logger
+        self.default_step = default_step
+        self.session_id = getattr(options, "resume", None)
+        self.routes: List[Route] = []
+        self.switches = 0
+        self._client = None
+        self._route: Optional[Route] = None
+
+    @classmethod
+    def factory(cls, router: ModelRouter, factory: Callable[..., Any], logger=None):
+        """Return a callable usable wherever ClaudeSDKClient(options=...) is"""
+        def make(options=None):
+            return cls(router, factory, options, logger=logger)
+        return make
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+        return False
+
+    async def connect(self, prompt: Any = None):
+        pass
+
+    async def disconnect(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.__aexit__(None, None, None)
+
+    async def _open(self, route: Route):
+        if self._client is not None:
+            await self.disconnect()
+            self.switches += 1
+        options = route.apply(self.options)
+        if self.session_id:
+            options = replace(options, resume=self.session_id)
+        self._client = self.client_factory(options=options)
+        await self._client.__aenter__()
+        self._route = route
+        # A fork happens once; later switches resume the forked session
+        if "fork-session" in (self.options.extra_args or {}):
+            self.options = replace(self.options, extra_args={
+                k: v for k, v in self.options.extra_args.items() if k != "fork-session"})
+
+    async def query(self, prompt: str, session_id: str = "default", step: str = None,
+                    turn: int = None, attachments: Iterable = ()):
+        """Route ``prompt`` as ``step`` and send it, switching clients if needed"""
+        route = self.router.route(step or self.default_step, prompt, attachments)
+        if self._client is None or (route.key != self._route.key and self.session_id):
+            await self._open(route)
+        elif route.key != self._route.key:
+            route = replace(self._route, step=route.step, prompt_tokens=route.prompt_tokens,
+                            reasons=route.reasons + [f"kept {self._route.model}: no session to resume"])
+        elif route.max_tokens != self._route.max_tokens:
+            route = replace(route, max_tokens=self._route.max_tokens,
+                            reasons=route.reasons + [f"kept the open client's max_tokens {self._route.max_tokens}"])
+        self.routes.append(route)
+        if self.logger is not None:
+            self.logger.log_route(route.as_dict(), turn=turn)
+        await self._client.query(prompt, session_id=session_id)
+
+    async def interrupt(self):
+        if self._client is not None:
+            await self._client.interrupt()
+
+    def _track(self, message: Any):
+        if type(message).__name__ == "ResultMessage" and getattr(message, "session_id", None):
+            self.session_id = message.session_id
+
+    async def receive_messages(self):
+        async for message in self._client.receive_messages():
+            self._track(message)
+            yield message
+
+    async def receive_response(self):
+        async for message in self._client.receive_response():
+            self._track(message)
+            yield message
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the routes the policy picks")
+    parser.add_argument("--logs", default="logs", help="ResponseLogger session logs to learn from")
+    parser.add_argument("--prompt-tokens", type=int, default=500, help="Prompt size to route")
+    args = parser.parse_args()
+
+    router = ModelRouter.from_logs(args.logs)
+    print(json.dumps(router.stats.summary(), indent=2))
+    for step in STEP_POLICIES:
+        route = router.route(step, "x" * args.prompt_tokens * 4)
+        print(f"{step:<12} {route.model:<26} max_tokens={route.max_tokens:<5} "
+              f"max_turns={route.max_turns}  ({'; '.join(route.reasons)})")
@@ -0,0 +1,678 @@
+#!/usr/bin/env python3
+"""
+Long-lived orchestrator hosting the legal, weather and analytics agents
+
+One process and one event loop run every agent as a registered workflow.
+Jobs come from a SQLite queue that any process can submit to, run
+concurrently under per-agent caps in priority order, and borrow warm SDK
+clients from per-agent pools. The weather agents share one streamable-HTTP
+weather MCP server instead of spawning one per client. Queue depth,
+throughput and latency are served as JSON over HTTP and by ``stats``.
+
+Run with:
+    python orchestrator.py serve --caps legal=4,weather=2,analytics=1 --metrics-port 8765
+    python orchestrator.py submit legal --priority 5 --payload '{"clause": "..."}'
+    python orchestrator.py stats
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
+
+
+HERE = Path(__file__).resolve().parent
+WEATHER_SERVER = HERE / "mcp" / "weather" / "weather.py"
+DEFAULT_CAPS = {"legal": 4, "weather": 2, "analytics": 1}
+# Concurrent analytics jobs would share working_demo's log file and analytics_chart.png
+MAX_CAPS = {"analytics": 1}
+
+
+def _load_script(filename: str):
+    """Import a standalone script whose file name is not a module name"""
+    path = HERE / filename
+    name = path.stem.replace("-", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return round(values[0], 3)
+    return round(statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1], 3)
+
+
+class JobQueue:
+    """SQLite-backed job queue shared by the orchestrator and submitters
+
+    Each thread gets its own connection. The orchestrator uses the async
+    methods (aclaim, acomplete, ...), which run the blocking sqlite3 calls
+    in worker threads so a busy database lock never stalls the event loop.
+    """
+
+    def __init__(self, path: str = "orchestrator.db"):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, agent TEXT NOT NULL, payload TEXT,"
+                " priority INTEGER DEFAULT 0, status TEXT DEFAULT 'queued', attempts INTEGER DEFAULT 0,"
+                " enqueued REAL, started REAL, finished REAL, result TEXT, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, id)")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, agent: str, payload: Dict[str, Any] = None, priority: int = 0) -> int:
+        """Add a job; higher priority runs first, ties run in submission order"""
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (agent, payload, priority, enqueued) VALUES (?, ?, ?, ?)",
+            (agent, json.dumps(payload or {}), priority, time.time()),
+        )
+        return cursor.lastrowid
+
+    def claim(self, agents: List[str]) -> Optional[Dict[str, Any]]:
+        """Atomically mark the best queued job for any of ``agents`` as running"""
+        if not agents:
+            return None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND agent IN ({','.join('?' * len(agents))})"
+                " ORDER BY priority DESC, id LIMIT 1",
+                agents,
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    def complete(self, job_id: int, result: Any):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', finished = ?, result = ? WHERE id = ?",
+            (time.time(), json.dumps(result, default=str), job_id),
+        )
+
+    def fail(self, job_id: int, error: str):
+        self._connect().execute(
+            "UPDATE jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+            (time.time(), error, job_id),
+        )
+
+    def requeue(self, job_id: int = None) -> int:
+        """Put a running job (default: every running job) back in the queue
+
+        Called on shutdown for interrupted jobs, and on startup for jobs a
+        previous orchestrator left running.
+        """
+        if job_id is None:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'"
+            )
+        else:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = 'queued', started = NULL WHERE id = ? AND status = 'running'", (job_id,)
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def depth(self) -> Dict[str, int]:
+        """Queued jobs per agent"""
+        rows = self._connect().execute(
+            "SELECT agent, COUNT(*) AS n FROM jobs WHERE status = 'queued' GROUP BY agent"
+        ).fetchall()
+        return {row["agent"]: row["n"] for row in rows}
+
+    async def aenqueue(self, agent: str, payload: Dict[str, Any] = None, priority: int = 0) -> int:
+        return await asyncio.to_thread(self.enqueue, agent, payload, priority)
+
+    async def aclaim(self, agents: List[str]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.claim, agents)
+
+    async def acomplete(self, job_id: int, result: Any):
+        await asyncio.to_thread(self.complete, job_id, result)
+
+    async def afail(self, job_id: int, error: str):
+        await asyncio.to_thread(self.fail, job_id, error)
+
+    async def arequeue(self, job_id: int = None) -> int:
+        return await asyncio.to_thread(self.requeue, job_id)
+
+    async def adepth(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self.depth)
+
+    async def astats(self, window: float = 300.0) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.stats, window)
+
+    def stats(self, window: float = 300.0) -> Dict[str, Any]:
+        """Queue depth, status counts and throughput/latency over the last ``window`` seconds"""
+        conn = self._connect()
+        counts = {row["status"]: row["n"] for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()}
+        since = time.time() - window
+        rows = conn.execute(
+            "SELECT agent, status, enqueued, started, finished FROM jobs"
+            " WHERE status IN ('done', 'failed') AND finished >= ?", (since,)
+        ).fetchall()
+
+        agents: Dict[str, Dict[str, Any]] = {}
+        for agent in {row["agent"] for row in rows}:
+            finished = [row for row in rows if row["agent"] == agent]
+            run_seconds = [row["finished"] - row["started"] for row in finished if row["status"] == "done"]
+            wait_seconds = [row["started"] - row["enqueued"] for row in finished]
+            agents[agent] = {
+                "done": sum(row["status"] == "done" for row in finished),
+                "failed": sum(row["status"] == "failed" for row in finished),
+                "per_minute": round(len(finished) * 60.0 / window, 3),
+                "run_p50_seconds": _percentile(run_seconds, 50),
+                "run_p95_seconds": _percentile(run_seconds, 95),
+                "wait_p50_seconds": _percentile(wait_seconds, 50),
+                "wait_p95_seconds": _percentile(wait_seconds, 95),
+            }
+
+        return {
+            "queue_depth": sum(self.depth().values()),
+            "depth_by_agent": self.depth(),
+            "counts": counts,
+            "window_seconds": window,
+            "throughput_per_minute": round(len(rows) * 60.0 / window, 3),
+            "agents": agents,
+        }
+
+
+@dataclass
+class _Lease:
+    client: Any = None
+    retire: asyncio.Event = field(default_factory=asyncio.Event)
+    uses: int = 0
+    error: Optional[BaseException] = None
+
+
+class ClientPool:
+    """Warm, connected SDK clients for one agent
+
+    ClaudeSDKClient.connect() enters a task group, so every client is opened
+    and closed by its own holder task, which parks until the client is
+    retired. A client is retired after ``recycle_after`` jobs (a reused
+    client keeps the previous jobs' conversation), and its holder connects
+    a replacement in the background so the next job still finds one warm.
+    """
+
+    def __init__(self, factory: Callable[..., Any], options: Any, size: int = 1, recycle_after: int = 1):
+        """
+        Args:
+            factory: Callable taking ``options=`` and returning an SDK client
+            options: ClaudeCodeOptions every client in the pool is opened with
+            size: Maximum connected clients
+            recycle_after: Jobs per client before it is replaced (0 = never)
+        """
+        self.factory = factory
+        self.options = options
+        self.size = size
+        self.recycle_after = recycle_after
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._holders: set = set()
+        self._closed = False
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def connected(self) -> int:
+        return len(self._holders)
+
+    def prewarm(self, count: int = None):
+        """Start connecting up to ``count`` clients (default: the pool size)"""
+        for _ in range(min(count or self.size, self.size) - len(self._holders)):
+            self._spawn()
+
+    def _spawn(self):
+        task = asyncio.create_task(self._hold())
+        self._holders.add(task)
+        task.add_done_callback(self._holders.discard)
+
+    async def _hold(self):
+        lease = _Lease()
+        try:
+            async with self.factory(options=self.options) as client:
+                lease.client = client
+                await self._idle.put(lease)
+                await lease.retire.wait()
+        except Exception as e:
+            if lease.client is None:
+                lease.error = e
+                await self._idle.put(lease)
+        finally:
+            self._holders.discard(asyncio.current_task())
+            if lease.client is not None and not self._closed and len(self._holders) < self.size:
+                # Connect the retired client's replacement before the next job asks
+                self._spawn()
+
+    async def acquire(self) -> _Lease:
+        """Wait for a connected client; raises if connecting one failed"""
+        if self._idle.empty() and len(self._holders) < self.size:
+            self._spawn()
+        lease = await self._idle.get()
+        if lease.error is not None:
+            raise lease.error
+        return lease
+
+    def release(self, lease: _Lease, healthy: bool = True):
+        """Return a client, retiring it if it failed or reached recycle_after"""
+        lease.uses += 1
+        if self._closed or not healthy or (self.recycle_after and lease.uses >= self.recycle_after):
+            lease.retire.set()
+        else:
+            self._idle.put_nowait(lease)
+
+    @contextlib.asynccontextmanager
+    async def client(self):
+        lease = await self.acquire()
+        healthy = False
+        try:
+            yield lease.client
+            healthy = True
+        finally:
+            self.release(lease, healthy)
+
+    async def close(self):
+        self._closed = True
+        while not self._idle.empty():
+            self._idle.get_nowait().retire.set()
+        holders = list(self._holders)
+        for task in holders:
+            task.cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+
+
+class WeatherServer:
+    """One streamable-HTTP weather MCP server shared by every weather client"""
+
+    def __init__(self, python: str = None, host: str = "127.0.0.1", port: int = 8000, log_path: str = None):
+        """
+        Args:
+            python: Interpreter for weather.py (default: WEATHER_MCP_PYTHON or this one)
+            log_path: Append the server's stdout/stderr here (default: discard it)
+        """
+        self.python = python or os.environ.get("WEATHER_MCP_PYTHON") or sys.executable
+        self.host = host
+        self.port = port
+        self.log_path = log_path
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._log = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/mcp"
+
+    async def start(self, timeout: float = 20.0) -> str:
+        # Keep the server's request logging off the orchestrator's console
+        self._log = open(self.log_path, "ab") if self.log_path else None
+        output = self._log or asyncio.subprocess.DEVNULL
+        self._process = await asyncio.create_subprocess_exec(
+            self.python, str(WEATHER_SERVER), "--transport", "streamable-http",
+            "--host", self.host, "--port", str(self.port),
+            stdin=asyncio.subprocess.DEVNULL, stdout=output, stderr=output,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.returncode is not None:
+                code = self._process.returncode
+                await self.stop()
+                where = f"; see {self.log_path}" if self.log_path else ""
+                raise RuntimeError(f"Weather MCP server exited with code {code}{where}")
+            try:
+                _, writer = await asyncio.open_connection(self.host, self.port)
+                writer.close()
+                return self.url
+            except OSError:
+                await asyncio.sleep(0.2)
+        await self.stop()
+        raise TimeoutError(f"Weather MCP server did not listen on {self.host}:{self.port} within {timeout}s")
+
+    async def stop(self):
+        if self._process is not None and self._process.returncode is None:
+            self._process.terminate()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._process.wait(), 5.0)
+            if self._process.returncode is None:
+                self._process.kill()
+                await self._process.wait()
+        self._process = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+@dataclass
+class Workflow:
+    """An agent the orchestrator can run jobs for
+
+    ``run(client, payload)`` gets a connected client opened with
+    ``options()`` and returns a JSON-serializable result.
+    """
+    name: str
+    options: Callable[[], Any]
+    run: Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+    cap: int = 1
+
+
+def _check_payload(agent: str, payload: Dict[str, Any], allowed) -> Dict[str, Any]:
+    unknown = set(payload) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown {agent} payload field(s): {sorted(unknown)}")
+    return payload
+
+
+ANALYTICS_FIELDS = ("data_path", "chunksize", "use_cache", "precompute", "vision_format",
+                    "render_cache", "chart_notes")
+
+
+def default_workflows(caps: Dict[str, int] = None, weather_url: str = None,
+                      renderer=None) -> Dict[str, Workflow]:
+    """The legal, weather and analytics agents as workflows
+
+    Args:
+        caps: Concurrent jobs per agent (default: DEFAULT_CAPS)
+        weather_url: Shared weather MCP server URL (default: per-client stdio server)
+        renderer: ChartRenderer shared by analytics jobs (default: each job
+            starts and stops its own worker pool)
+    """
+    caps = check_caps({**DEFAULT_CAPS, **(caps or {})})
+    legal = _load_script("legal-agent.py")
+    weather = _load_script("weather-agent.py")
+    import claude_code_demo
+
+    async def run_legal(client, payload):
+        payload = _check_payload("legal", payload, ("clause",))
+        return await legal.review_clause(client, echo=False, **payload)
+
+    async def run_weather(client, payload):
+        payload = _check_payload("weather", payload, ("prompt",))
+        return await weather.ask_weather(client, echo=False, **payload)
+
+    async def run_analytics(client, payload):
+        payload = _check_payload("analytics", payload, ANALYTICS_FIELDS)
+
+        # working_demo opens its own client; lend it the warm one instead
+        @contextlib.asynccontextmanager
+        async def borrowed(options=None):
+            yield client
+
+        return await claude_code_demo.working_demo(client_factory=borrowed, checkpoints=None,
+                                                   renderer=renderer, **payload)
+
+    def analytics_options():
+        # Must match the options working_demo builds for a fresh (non-resumed) run
+        return ClaudeCodeOptions(system_prompt=claude_code_demo.ANALYST_SYSTEM_PROMPT, max_turns=4,
+                                 include_partial_messages=True)
+
+    return {
+        "legal": Workflow("legal", legal.legal_options, run_legal, caps["legal"]),
+        "weather": Workflow("weather", lambda: weather.weather_options(weather_url), run_weather, caps["weather"]),
+        "analytics": Workflow("analytics", analytics_options, run_analytics, caps["analytics"]),
+    }
+
+
+class Orchestrator:
+    """Pulls jobs from a JobQueue and runs them on warm per-agent client pools"""
+
+    def __init__(self, queue: JobQueue, workflows: Dict[str, Workflow], client_factory=None,
+                 recycle_after: int = 1, poll_interval: float = 0.2):
+        """
+        Args:
+            queue: Where jobs come from and results go
+            workflows: Agent name -> Workflow
+            client_factory: Callable taking ``options=`` and returning an SDK
+                client (default: ClaudeSDKClient; ReplayClient.factory works too)
+            recycle_after: Jobs per warm client before it is replaced
+            poll_interval: Seconds between queue polls when idle
+        """
+        self.queue = queue
+        self.workflows = workflows
+        self.client_factory = client_factory or ClaudeSDKClient
+        self.recycle_after = recycle_after
+        self.poll_interval = poll_interval
+        self.pools: Dict[str, ClientPool] = {}
+        self.running: Dict[int, asyncio.Task] = {}
+        self._running_by_agent: Dict[str, int] = {name: 0 for name in workflows}
+        self._started = time.time()
+        self._wake = asyncio.Event()
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue metrics plus the live state of this process"""
+        stats = await self.queue.astats()
+        stats.update(
+            uptime_seconds=round(time.time() - self._started, 1),
+            running=sum(self._running_by_agent.values()),
+            running_by_agent=dict(self._running_by_agent),
+            caps={name: workflow.cap for name, workflow in self.workflows.items()},
+            warm_clients={name: pool.idle for name, pool in self.pools.items()},
+        )
+        return stats
+
+    async def _run_job(self, job: Dict[str, Any]):
+        workflow = self.workflows[job["agent"]]
+        try:
+            async with self.pools[job["agent"]].client() as client:
+                result = await workflow.run(client, job["payload"])
+            await self.queue.acomplete(job["id"], result)
+            print(f"✅ Job {job['id']} ({job['agent']}) done")
+        except asyncio.CancelledError:
+            await self.queue.arequeue(job["id"])
+            raise
+        except Exception as e:
+            await self.queue.afail(job["id"], f"{type(e).__name__}: {e}")
+            print(f"❌ Job {job['id']} ({job['agent']}) failed: {e}")
+        finally:
+            self._running_by_agent[job["agent"]] -= 1
+            self.running.pop(job["id"], None)
+            self._wake.set()
+
+    async def _dispatch(self) -> int:
+        """Start as many queued jobs as the caps allow; returns how many started"""
+        started = 0
+        while True:
+            free = [name for name, workflow in self.workflows.items()
+                    if self._running_by_agent[name] < workflow.cap]
+            job = await self.queue.aclaim(free)
+            if job is None:
+                return started
+            self._running_by_agent[job["agent"]] += 1
+            self.running[job["id"]] = asyncio.create_task(self._run_job(job))
+            started += 1
+
+    async def serve(self, metrics_port: int = None, drain: bool = False):
+        """Run jobs until cancelled, or until the queue is empty with ``drain``"""
+        requeued = await self.queue.arequeue()
+        if requeued:
+            print(f"♻️  Requeued {requeued} job(s) left running by a previous orchestrator")
+
+        for name, workflow in self.workflows.items():
+            pool = ClientPool(self.client_factory, workflow.options(), workflow.cap, self.recycle_after)
+            pool.prewarm()
+            self.pools[name] = pool
+
+        server = None
+        if metrics_port is not None:
+            server = await asyncio.start_server(self._serve_metrics, "127.0.0.1", metrics_port)
+            print(f"📈 Metrics: http://127.0.0.1:{metrics_port}/metrics")
+
+        try:
+            while True:
+                self._wake.clear()
+                await self._dispatch()
+                if drain and not self.running and not await self.queue.adepth():
+                    break
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+        finally:
+            for task in list(self.running.values()):
+                task.cancel()
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+
+    async def _serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = json.dumps(await self.stats(), indent=2).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def check_caps(caps: Dict[str, int]) -> Dict[str, int]:
+    """Reject caps below 1 or above an agent's MAX_CAPS
+
+    Raises:
+        ValueError: naming the offending agent
+    """
+    for name, cap in caps.items():
+        if cap < 1:
+            raise ValueError(f"Cap for {name} must be at least 1, got {cap}")
+        if name in MAX_CAPS and cap > MAX_CAPS[name]:
+            raise ValueError(f"Cap for {name} must be at most {MAX_CAPS[name]}, got {cap}")
+    return caps
+
+
+def parse_caps(text: str) -> Dict[str, int]:
+    """'legal=4,weather=2' -> {'legal': 4, 'weather': 2}
+
+    Raises:
+        ValueError: for a malformed item or a cap check_caps rejects
+    """
+    caps = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        caps[name.strip()] = int(value)
+    return check_caps(caps)
+
+
+async def serve(args):
+    weather_server = None
+    weather_url = os.environ.get("WEATHER_MCP_URL")
+    if not weather_url and args.shared_mcp:
+        weather_server = WeatherServer(args.weather_python, port=args.weather_port, log_path=args.weather_log)
+        weather_url = await weather_server.start()
+        print(f"🌦️  Shared weather MCP server: {weather_url} (log: {args.weather_log or 'discarded'})")
+
+    from chart_render import ChartRenderer
+
+    # One render pool for every analytics job; spawned workers don't inherit
+    # this process's event loop and threads the way forked ones would
+    renderer = ChartRenderer(mp_context=multiprocessing.get_context("spawn"))
+    queue = JobQueue(args.db)
+    workflows = default_workflows(args.caps, weather_url, renderer=renderer)
+    orchestrator = Orchestrator(queue, workflows, recycle_after=args.recycle_after)
+    caps = {name: workflow.cap for name, workflow in workflows.items()}
+    print(f"🚦 Orchestrator serving {args.db} with caps {caps}")
+    try:
+        await orchestrator.serve(metrics_port=args.metrics_port, drain=args.drain)
+    finally:
+        if weather_server is not None:
+            await weather_server.stop()
+        renderer.close()
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agents as workflows behind a shared job queue")
+    parser.add_argument("--db", default="orchestrator.db", help="SQLite job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run queued jobs")
+    serve_parser.add_argument("--caps", default="", help="Per-agent concurrency, e.g. legal=4,weather=2,analytics=1")
+    serve_parser.add_argument("--recycle-after", type=int, default=1,
+                              help="Jobs per warm client before it is replaced (0 = reuse forever)")
+    serve_parser.add_argument("--metrics-port", type=int, help="Serve JSON metrics on this port")
+    serve_parser.add_argument("--weather-port", type=int, default=8000, help="Port for the shared weather MCP server")
+    serve_parser.add_argument("--weather-python", help="Interpreter for weather.py (default: WEATHER_MCP_PYTHON or this one)")
+    serve_parser.add_argument("--weather-log", default="weather-server.log",
+                              help="Append the shared weather MCP server's output here ('' to discard it)")
+    serve_parser.add_argument("--no-shared-mcp", dest="shared_mcp", action="store_false",
+                              help="Let each weather client spawn its own stdio MCP server")
+    serve_parser.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+
+    submit_parser = commands.add_parser("submit", help="Queue a job")
+    submit_parser.add_argument("agent", choices=sorted(DEFAULT_CAPS))
+    submit_parser.add_argument("--priority", type=int, default=0, help="Higher runs first")
+    submit_parser.add_argument("--payload", default="{}", help="JSON keyword arguments for the workflow")
+
+    stats_parser = commands.add_parser("stats", help="Print queue metrics")
+    stats_parser.add_argument("--window", type=float, default=300.0, help="Throughput window in seconds")
+    stats_parser.add_argument("--job", type=int, help="Show one job instead")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        try:
+            args.caps = parse_caps(args.caps)
+        except ValueError as e:
+            serve_parser.error(f"--caps: {e}")
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(serve(args))
+    elif args.command == "submit":
+        job_id = JobQueue(args.db).enqueue(args.agent, json.loads(args.payload), args.priority)
+        print(f"📥 Queued job {job_id} ({args.agent}, priority {args.priority})")
+    else:
+        queue = JobQueue(args.db)
+        print(json.dumps(queue.get(args.job) if args.job else queue.stats(args.window), indent=2))
+
+
+if __name__ == "__main__":
+    main()
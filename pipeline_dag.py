@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Dependency-DAG scheduler for model calls and local steps
+
+Each step starts as soon as its dependencies have finished, so independent
+work (profiling, precomputation, model calls on separate clients) overlaps.
+A step can also speculate: start early from a locally predicted value of
+one dependency, then keep its result if the real value agrees, or cancel it
+and run again with the real value if it does not.
+"""
+
+import asyncio
+import operator
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+StepFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Speculation:
+    """How a step may start before one of its dependencies finishes
+
+    Attributes:
+        on: Dependency whose value is predicted
+        predict: fn(inputs of ``using``) -> predicted value of ``on``, or None
+            to skip speculating this time
+        using: Steps the prediction needs (usually cheap local ones)
+        agrees: fn(predicted, actual) -> True if the speculative result stands
+        run: Speculative variant of the step (default: the step's own run),
+            e.g. one that uses a separate client
+        on_cancel: Awaitable cleanup called when a speculation is discarded,
+            before its task is cancelled (e.g. to interrupt the model turn)
+    """
+    on: str
+    predict: Callable[[Dict[str, Any]], Any]
+    using: Tuple[str, ...] = ()
+    agrees: Callable[[Any, Any], bool] = operator.eq
+    run: Optional[StepFn] = None
+    on_cancel: Optional[Callable[[], Awaitable[None]]] = None
+
+
+@dataclass
+class Step:
+    """One node of the pipeline
+
+    ``run`` receives a dict of its dependencies' results keyed by step name.
+    ``kind`` ("local" or "model") is only used for reporting.
+    """
+    name: str
+    run: StepFn
+    deps: Tuple[str, ...] = ()
+    kind: str = "local"
+    speculation: Optional[Speculation] = None
+
+
+@dataclass
+class PipelineRun:
+    """Results and timeline of one pipeline execution"""
+    results: Dict[str, Any]
+    timeline: List[Dict[str, Any]]
+    wall_seconds: float
+    speculations: Dict[str, str] = field(default_factory=dict)
+
+
+class Pipeline:
+    """Runs a DAG of Steps with as much concurrency as the edges allow"""
+
+    def __init__(self, steps: Sequence[Step]):
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError("Step names must be unique")
+        for step in steps:
+            needed = set(step.deps) | (set(step.speculation.using) if step.speculation else set())
+            unknown = needed - set(self.steps)
+            if unknown:
+                raise ValueError(f"Step {step.name!r} depends on unknown steps {sorted(unknown)}")
+            if step.speculation and step.speculation.on not in step.deps:
+                raise ValueError(f"Step {step.name!r} speculates on {step.speculation.on!r}, which is not a dependency")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through step {name!r}")
+            visiting.add(name)
+            step = self.steps[name]
+            for dep in (*step.deps, *(step.speculation.using if step.speculation else ())):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.steps:
+            visit(name)
+        return order
+
+    async def run(self) -> PipelineRun:
+        """Execute every step; raises the first step error after cancelling the rest"""
+        self._start = time.perf_counter()
+        self._timeline: List[Dict[str, Any]] = []
+        self._speculations: Dict[str, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        for name in self.order:
+            self._tasks[name] = asyncio.ensure_future(self._drive(self.steps[name]))
+
+        try:
+            values = await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            raise
+
+        return PipelineRun(
+            results=dict(zip(self._tasks, values)),
+            timeline=sorted(self._timeline, key=lambda entry: entry["start"]),
+            wall_seconds=time.perf_counter() - self._start,
+            speculations=self._speculations,
+        )
+
+    async def _results(self, names) -> Dict[str, Any]:
+        names = list(dict.fromkeys(names))
+        values = await asyncio.gather(*(self._tasks[name] for name in names))
+        return dict(zip(names, values))
+
+    async def _timed(self, step: Step, fn: StepFn, inputs: Dict[str, Any], speculative: bool) -> Any:
+        entry = {"step": step.name, "kind": step.kind, "speculative": speculative,
+                 "start": time.perf_counter() - self._start, "end": None, "status": "running"}
+        self._timeline.append(entry)
+        try:
+            value = await fn(inputs)
+            entry["status"] = "done"
+            return value
+        except asyncio.CancelledError:
+            entry["status"] = "cancelled"
+            raise
+        except Exception:
+            entry["status"] = "failed"
+            raise
+        finally:
+            entry["end"] = time.perf_counter() - self._start
+
+    async def _drive(self, step: Step) -> Any:
+        spec = step.speculation
+        if spec is None:
+            return await self._timed(step, step.run, await self._results(step.deps), speculative=False)
+
+        others = [dep for dep in step.deps if dep != spec.on]
+        inputs = await self._results(others)
+        predicted = spec.predict(await self._results(spec.using))
+        if predicted is None:
+            self._speculations[step.name] = "skipped"
+            inputs[spec.on] = await self._tasks[spec.on]
+            return await self._timed(step, step.run, inputs, speculative=False)
+
+        speculative = asyncio.ensure_future(
+            self._timed(step, spec.run or step.run, {**inputs, spec.on: predicted}, speculative=True)
+        )
+        try:
+            actual = await self._tasks[spec.on]
+        except BaseException:
+            speculative.cancel()
+            raise
+
+        if spec.agrees(predicted, actual):
+            try:
+                value = await speculative
+                self._speculations[step.name] = "accepted"
+                return value
+            except Exception:
+                # The prediction was right but the speculative run failed; retry for real
+                self._speculations[step.name] = "failed"
+        else:
+            self._speculations[step.name] = "cancelled"
+            # Stop the remote work first; cancelling the task only abandons it
+            if spec.on_cancel is not None:
+                await spec.on_cancel()
+            speculative.cancel()
+            await asyncio.gather(speculative, return_exceptions=True)
+
+        inputs[spec.on] = actual
+        return await self._timed(step, step.run, inputs, speculative=False)
+
+
+def format_timeline(run: PipelineRun) -> str:
+    """One line per step execution: kind, start/end offsets and outcome"""
+    lines = []
+    for entry in run.timeline:
+        label = f"{entry['step']}{' (speculative)' if entry['speculative'] else ''}"
+        lines.append(f"  {label:<24} {entry['kind']:<6} {entry['start']:7.2f}s -> {entry['end']:7.2f}s  {entry['status']}")
+    return "\n".join(lines)
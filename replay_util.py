@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Replay utility for recorded Claude Code SDK sessions
+
+Feeds the JSONL logs written by ResponseLogger back through the same
+query()/receive_response() loops used with a live ClaudeSDKClient.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+# Content block types keyed by a field only that block type carries
+_BLOCK_TYPES = [
+    ("thinking", "ThinkingBlock"),
+    ("tool_use_id", "ToolResultBlock"),
+    ("input", "ToolUseBlock"),
+    ("text", "TextBlock"),
+]
+
+_replay_types: Dict[str, type] = {}
+
+
+def _replay_type(name: str) -> type:
+    """Get a namespace type whose __name__ matches the recorded SDK type"""
+    if name not in _replay_types:
+        _replay_types[name] = type(name, (SimpleNamespace,), {})
+    return _replay_types[name]
+
+
+def _rebuild_block(data: Any) -> Any:
+    """Rebuild a serialized content block into an attribute-style object"""
+    if not isinstance(data, dict):
+        return data
+    for key, type_name in _BLOCK_TYPES:
+        if key in data:
+            return _replay_type(type_name)(**data)
+    return SimpleNamespace(**data)
+
+
+def rebuild_message(message_type: str, response_data: Dict[str, Any]) -> Any:
+    """Rebuild a logged response into an object shaped like the SDK message
+
+    Args:
+        message_type: Recorded class name (e.g. AssistantMessage, ResultMessage)
+        response_data: Serialized attributes written by ResponseLogger
+    """
+    fields = dict(response_data)
+    if isinstance(fields.get("content"), list):
+        fields["content"] = [_rebuild_block(block) for block in fields["content"]]
+    return _replay_type(message_type)(**fields)
+
+
+def _parse_timestamp(entry: Dict[str, Any]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(entry["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RecordedTurn:
+    """One recorded query together with the responses and executions it produced"""
+
+    def __init__(self, query: Dict[str, Any]):
+        self.query = query
+        self.responses: List[Dict[str, Any]] = []
+        self.executions: List[Dict[str, Any]] = []
+
+    @property
+    def turn(self) -> Optional[int]:
+        return self.query.get("turn")
+
+    @property
+    def prompt(self) -> str:
+        return self.query.get("query", "")
+
+
+def load_session_log(log_file: str) -> List[RecordedTurn]:
+    """Load a ResponseLogger JSONL file and group its entries by query
+
+    Entries go to the latest query of the same turn, so sessions whose
+    turns overlapped (speculative runs) still group correctly.
+
+    Args:
+        log_file: Path to a *.jsonl session log
+    """
+    turns: List[RecordedTurn] = []
+    with open(log_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            event_type = entry.get("event_type")
+            if event_type == "query":
+                turns.append(RecordedTurn(entry))
+            elif event_type in ("response", "execution") and turns:
+                owner = next((t for t in reversed(turns) if t.turn == entry.get("turn")), turns[-1])
+                (owner.responses if event_type == "response" else owner.executions).append(entry)
+    return turns
+
+
+def find_session_logs(log_dir: str = "logs", session_prefix: str = "claude_responses") -> List[Path]:
+    """List recorded session logs, oldest first"""
+    return sorted(Path(log_dir).glob(f"{session_prefix}_*.jsonl"))
+
+
+class ReplayClient:
+    """Drop-in stand-in for ClaudeSDKClient that replays a recorded session
+
+    Each query() replays the first unused recorded turn with the same prompt,
+    or else the next unused one in order; receive_response() yields that
+    turn's messages, sleeping between them to reproduce the
+    recorded gaps divided by ``speed``. Pass ``speed=None`` to replay
+    without any delays. Clients from one factory() share their position:
+    a client opened with ``resume`` continues where the previous one
+    stopped, as a resumed SDK session would.
+    """
+
+    def __init__(self, log_file: str, options: Any = None, speed: Optional[float] = 1.0, strict: bool = False,
+                 played: Optional[set] = None):
+        self.log_file = Path(log_file)
+        self.options = options
+        self.speed = speed
+        self.strict = strict
+        self.turns = load_session_log(str(self.log_file))
+        self.queries: List[str] = []
+        self.mismatches: List[int] = []
+        self._index = -1
+        self._used = set()
+        self._played = played
+        self._interrupted = False
+
+    @classmethod
+    def factory(cls, log_file: str, speed: Optional[float] = 1.0, strict: bool = False):
+        """Return a callable usable wherever ClaudeSDKClient(options=...) is"""
+        return partial(cls, log_file, speed=speed, strict=strict, played=set())
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+        return False
+
+    async def connect(self, prompt: Any = None):
+        self._index = -1
+        if self._played is None:
+            self._used = set()
+        else:
+            if not getattr(self.options, "resume", None):
+                self._played.clear()
+            self._used = self._played
+
+    async def disconnect(self):
+        pass
+
+    async def query(self, prompt: str, session_id: str = "default"):
+        """Advance to the recorded turn for this prompt"""
+        unused = [i for i in range(len(self.turns)) if i not in self._used]
+        if not unused:
+            raise RuntimeError(f"Replay log {self.log_file} has only {len(self.turns)} recorded queries")
+
+        self.queries.append(prompt)
+        self._interrupted = False
+        matched = next((i for i in unused if self.turns[i].prompt == prompt), None)
+        if matched is None:
+            if self.strict:
+                raise ValueError(f"Query {len(self.queries)} does not match the recorded prompt")
+            matched = next((i for i in unused if i > self._index), unused[0])
+            self.mismatches.append(matched)
+        self._index = matched
+        self._used.add(matched)
+
+    async def interrupt(self):
+        """Stop replaying the current turn, like ClaudeSDKClient.interrupt()"""
+        self._interrupted = True
+
+    async def receive_messages(self) -> AsyncIterator[Any]:
+        """Yield the recorded messages for the current turn"""
+        if self._index < 0:
+            return
+
+        turn = self.turns[self._index]
+        previous = _parse_timestamp(turn.query)
+        for entry in turn.responses:
+            current = _parse_timestamp(entry)
+            if self.speed and previous and current:
+                delay = (current - previous).total_seconds() / self.speed
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            previous = current or previous
+            if self._interrupted:
+                return
+            yield rebuild_message(entry.get("message_type", "Message"), entry.get("response_data") or {})
+
+    async def receive_response(self) -> AsyncIterator[Any]:
+        """Yield messages until and including the recorded ResultMessage"""
+        async for message in self.receive_messages():
+            yield message
+            if type(message).__name__ == "ResultMessage":
+                return
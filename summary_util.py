@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Precomputed aggregate summaries for the analytics demo
+
+Computes the aggregates the model would otherwise write code for (group-by
+sums/means, monthly rollups, top-N, null counts) locally with vectorized
+pandas operations, caches them per dataset version, and renders them as a
+compact prompt block.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from dataset_util import ChunkedDataset, series_to_dict, to_python
+
+
+SUMMARY_VERSION = 2
+
+
+def _parses_as_dates(series: pd.Series) -> bool:
+    """True if every non-null value parses as a date"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    values = series.dropna()
+    if values.empty:
+        return True
+    parsed = pd.to_datetime(values.astype(str), errors="coerce", format="mixed")
+    return bool(parsed.notna().all())
+
+
+def column_kinds(ds: ChunkedDataset) -> Dict[str, List[str]]:
+    """Split columns into numeric, date and text over every chunk
+
+    A column is numeric only if every chunk with values parses it as numbers,
+    and a date column only if every value parses as a date; anything else
+    is text. Checking all chunks (not a sample of leading rows) keeps a
+    column that changes type further down out of the numeric sums.
+
+    With a DatasetCache the cache's schema already covers every chunk, so
+    no pass over the data is needed.
+
+    Returns:
+        {"numeric": [...], "dates": [...], "text": [...]} in column order
+    """
+    if ds.cache is not None:
+        manifest = ds.cache.manifest(ds.path, ds.parse_dates)
+        numeric, dates, text = [], [], []
+        for info in manifest["columns"]:
+            if info["kind"] == "numeric":
+                numeric.append(info["name"])
+            elif info["kind"] == "datetime" or (info["categories"] and
+                                                 _parses_as_dates(pd.Series(info["categories"]))):
+                dates.append(info["name"])
+            else:
+                text.append(info["name"])
+        return {"numeric": numeric, "dates": dates, "text": text}
+
+    columns = ds.columns
+    numeric = set(columns)
+    dates = set(columns)
+    seen = set()
+    for chunk in ds.iter_chunks():
+        for column in columns:
+            series = chunk[column]
+            if series.isna().all():
+                continue
+            seen.add(column)
+            if column in numeric and not pd.api.types.is_numeric_dtype(series):
+                numeric.discard(column)
+            if column in dates and (pd.api.types.is_numeric_dtype(series) or not _parses_as_dates(series)):
+                dates.discard(column)
+    # All-null columns carry no sums or dates
+    numeric &= seen
+    dates = (dates & seen) - numeric
+    return {
+        "numeric": [c for c in columns if c in numeric],
+        "dates": [c for c in columns if c in dates],
+        "text": [c for c in columns if c not in numeric and c not in dates],
+    }
+
+
+def summarize_dataset(ds: ChunkedDataset, top_n: int = 5, max_groups: int = 50) -> Dict[str, Any]:
+    """Compute common aggregates in a single chunked pass
+
+    Args:
+        ds: Dataset to summarize
+        top_n: Number of largest groups kept per text column
+        max_groups: Text columns with at most this many distinct values get
+            their full group-by table; larger ones keep only the top-N
+
+    Returns:
+        JSON-serializable dict with shape, null_counts, numeric stats,
+        group_by sums/means, monthly rollups and top_n tables
+    """
+    start = time.perf_counter()
+    kinds = column_kinds(ds)
+    numeric, dates, text = kinds["numeric"], kinds["dates"], kinds["text"]
+
+    rows = 0
+    nulls = None
+    totals = []
+    group_partials: Dict[str, List[pd.DataFrame]] = {c: [] for c in text}
+    month_partials: Dict[str, List[pd.DataFrame]] = {c: [] for c in dates}
+
+    for chunk in ds.iter_chunks():
+        rows += len(chunk)
+        chunk_nulls = chunk.isna().sum()
+        nulls = chunk_nulls if nulls is None else nulls + chunk_nulls
+        if numeric:
+            totals.append(chunk[numeric].agg(["sum", "count", "min", "max"]))
+            for column in text:
+                # Missing keys form their own group, as in ChunkedDataset.groupby_sum
+                grouped = chunk.groupby(column, dropna=False, observed=True)[numeric]
+                group_partials[column].append(pd.concat({"sum": grouped.sum(), "count": grouped.count()}, axis=1))
+            for column in dates:
+                months = pd.to_datetime(chunk[column], errors="coerce", format="mixed").dt.to_period("M")
+                month_partials[column].append(chunk[numeric].groupby(months).sum())
+
+    summary: Dict[str, Any] = {
+        "shape": [rows, len(numeric) + len(dates) + len(text)],
+        "null_counts": {k: v for k, v in series_to_dict(nulls).items() if v} if nulls is not None else {},
+        "numeric": {},
+        "group_by": {},
+        "monthly": {},
+        "top_n": {},
+    }
+
+    if totals:
+        combined = pd.concat(totals)
+        sums = combined.loc[["sum"]].sum()
+        counts = combined.loc[["count"]].sum()
+        mins = combined.loc[["min"]].min()
+        maxs = combined.loc[["max"]].max()
+        for column in numeric:
+            summary["numeric"][column] = {
+                "sum": to_python(sums[column]),
+                "mean": to_python(sums[column] / counts[column]) if counts[column] else None,
+                "min": to_python(mins[column]),
+                "max": to_python(maxs[column]),
+            }
+
+    for column, parts in group_partials.items():
+        if not parts:
+            continue
+        combined = pd.concat(parts).groupby(level=0, dropna=False).sum()
+        group_sums = combined["sum"]
+        group_means = group_sums / combined["count"]
+        if len(combined) <= max_groups:
+            summary["group_by"][column] = {
+                value: {"sum": series_to_dict(group_sums[value]), "mean": series_to_dict(group_means[value].round(2))}
+                for value in numeric
+            }
+        summary["top_n"][column] = {
+            value: series_to_dict(group_sums[value].nlargest(top_n)) for value in numeric
+        }
+
+    for column, parts in month_partials.items():
+        if parts:
+            combined = pd.concat(parts).groupby(level=0).sum().sort_index()
+            summary["monthly"][column] = {value: series_to_dict(combined[value]) for value in numeric}
+
+    summary["compute_seconds"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def _summary_key(ds: ChunkedDataset, **params) -> str:
+    stat = ds.path.stat()
+    fingerprint = {
+        "source": str(ds.path.resolve()),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "version": SUMMARY_VERSION,
+        **params,
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_or_compute_summary(ds: ChunkedDataset, cache_dir: str = ".dataset_cache/summaries",
+                            top_n: int = 5, max_groups: int = 50) -> Dict[str, Any]:
+    """Return the cached summary for this dataset version, computing it on a miss
+
+    The returned dict has ``cached`` set to whether it came from disk.
+    """
+    cache_path = Path(cache_dir) / f"{_summary_key(ds, top_n=top_n, max_groups=max_groups)}.json"
+    if cache_path.exists():
+        try:
+            summary = json.loads(cache_path.read_text())
+            summary["cached"] = True
+            return summary
+        except ValueError:
+            pass
+
+    summary = summarize_dataset(ds, top_n=top_n, max_groups=max_groups)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(summary))
+    tmp_path.replace(cache_path)
+    summary["cached"] = False
+    return summary
+
+
+def group_sums(summary: Dict[str, Any], by: str, value: str) -> Dict[str, Any]:
+    """Precomputed sum of ``value`` per ``by`` group, or {} if not available"""
+    return summary.get("group_by", {}).get(by, {}).get(value, {}).get("sum", {})
+
+
+def format_summary_block(summary: Dict[str, Any], values: List[str] = None) -> str:
+    """Render a summary as a compact prompt block
+
+    Args:
+        summary: Output of summarize_dataset / load_or_compute_summary
+        values: Only include these numeric columns (default: all)
+    """
+    def keep(column: str) -> bool:
+        return values is None or column in values
+
+    lines = [f"Precomputed aggregates ({summary['shape'][0]} rows):"]
+    if summary.get("null_counts"):
+        lines.append(f"- Null counts: {summary['null_counts']}")
+    for column, stats in summary.get("numeric", {}).items():
+        if not keep(column):
+            continue
+        lines.append(f"- {column}: sum={stats['sum']}, mean={stats['mean']:.2f}, "
+                     f"min={stats['min']}, max={stats['max']}" if stats["mean"] is not None
+                     else f"- {column}: no values")
+    for by, tables in summary.get("group_by", {}).items():
+        for value, table in tables.items():
+            if not keep(value):
+                continue
+            lines.append(f"- {value} by {by}: sum={table['sum']}, mean={table['mean']}")
+    for by, tables in summary.get("top_n", {}).items():
+        if by in summary.get("group_by", {}):
+            continue
+        for value, table in tables.items():
+            if not keep(value):
+                continue
+            lines.append(f"- Top {by} by {value}: {table}")
+    for column, tables in summary.get("monthly", {}).items():
+        for value, table in tables.items():
+            if not keep(value):
+                continue
+            lines.append(f"- Monthly {value} ({column}): {table}")
+    return "\n".join(lines)
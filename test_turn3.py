@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
-Test Turn 3 - Chart Analysis with existing analytics_chart.png
+Test Turn 3 - Chart Analysis resumed from the checkpoints of a demo run
 """
 
+import argparse
 import asyncio
-import json
 from pathlib import Path
 from dotenv import load_dotenv
-from logger_util import init_logging, get_logger
+from logger_util import init_logging
+from chart_render import optimize_for_vision
+from checkpoint_store import Checkpoint, CheckpointStore
 
 load_dotenv()
 
@@ -18,8 +20,11 @@ except ImportError as e:
     exit(1)
 
 
-async def test_turn3_only():
-    """Test only Turn 3 - Chart analysis with existing chart"""
+async def run_turn3_only(run_id: str = None, checkpoint_dir: str = ".checkpoints"):
+    """Run only Turn 3 - Chart analysis resumed from turns 1-2 of a checkpointed run
+
+    A script entry point rather than a pytest test: it calls the real API.
+    """
     
     # Initialize logging
     logger = init_logging()
@@ -28,26 +33,46 @@ async def test_turn3_only():
     print("=" * 50)
     print(f"📝 Logging to: {logger.log_file}")
     
-    # Check if chart exists
-    chart_path = Path('analytics_chart.png')
-    if not chart_path.exists():
-        print("❌ analytics_chart.png not found! Please generate it first.")
+    # Restore turns 1-2 from the demo's checkpoints
+    store = CheckpointStore(checkpoint_dir)
+    source_run = run_id or store.latest_run(upto_turn=2, artifacts={2: 'analytics_chart.png'})
+    if source_run is None:
+        print("❌ No checkpointed run with a chart! Run claude_code_demo.py first.")
+        return {'success': False, 'error': 'No checkpoint found'}
+    
+    turn1, turn2 = store.load(source_run, 1), store.load(source_run, 2)
+    if turn1 is None or turn2 is None:
+        print(f"❌ Run {source_run} has no checkpoint for turns 1-2")
+        return {'success': False, 'error': 'Incomplete checkpoint'}
+    
+    chart_path = Path(CheckpointStore.restore_artifacts(turn2).get('analytics_chart.png', ''))
+    if not chart_path.is_file():
+        print(f"❌ Run {source_run} has no stored chart")
         return {'success': False, 'error': 'Chart file not found'}
     
-    print(f"✅ Found chart: {chart_path}")
+    print(f"✅ Restored chart from run {source_run}: {chart_path}")
     
+    # Downscale and quantize before sending; image tokens scale with pixel count
+    vision = optimize_for_vision(chart_path)
+    print(f"🗜️  Vision image: {vision['path']} ({vision['width']}x{vision['height']}, "
+          f"{vision['original_bytes']:,} -> {vision['bytes']:,} bytes, "
+          f"~{vision['original_tokens']} -> ~{vision['est_tokens']} tokens)")
+    
+    # Fork the run's session so this test never appends to the original
     options = ClaudeCodeOptions(
         system_prompt="You are a data analyst. Analyze the provided chart image.",
-        max_turns=5
+        max_turns=5,
+        **turn2.options(fork=True)
     )
+    test_run = store.fork(source_run, 2, test='turn3')
     
     async with ClaudeSDKClient(options=options) as client:
         
-        # Sample revenue data (from previous runs)
-        revenue_dict = {'Accessories': 10675, 'Electronics': 68400}
+        # Revenue data computed in turn 1 of the checkpointed run
+        revenue_dict = (turn1.result or {}).get('revenue_by_category')
         
         # Use absolute path for the chart
-        chart_abs_path = chart_path.absolute()
+        chart_abs_path = Path(vision['path']).absolute()
         
         query3 = f"""I created a chart showing revenue by category with these values:
 {revenue_dict}
@@ -62,7 +87,7 @@ Please analyze this chart image {chart_abs_path} and provide:
         print("Sending chart analysis request...")
         
         # Log query with attachment
-        logger.log_query(query3, turn=3, attachments=[str(chart_path)])
+        logger.log_query(query3, turn=3, attachments=[vision['path']])
         
         # Send query - Claude will automatically read the image file mentioned in prompt
         await client.query(query3)
@@ -94,12 +119,19 @@ Please analyze this chart image {chart_abs_path} and provide:
         print(f"📊 Chart analyzed: Yes")
         print(f"📄 Response length: {len(response3)} characters")
         
+        store.save(Checkpoint(test_run, 3, query=query3, response=response3,
+                              session_id=session_id, cost_usd=cost3))
+        print(f"💾 Checkpoint saved to run {test_run}")
+        
         final_result = {
             'success': True,
             'cost': cost3,
             'session_id': session_id,
             'response_length': len(response3),
-            'chart_path': str(chart_path)
+            'chart_path': str(chart_path),
+            'run_id': test_run,
+            'vision_path': vision['path'],
+            'image_tokens': vision['est_tokens']
         }
         
         # Close logging session
@@ -110,8 +142,13 @@ Please analyze this chart image {chart_abs_path} and provide:
 
 
 async def main():
+    parser = argparse.ArgumentParser(description="Re-run turn 3 from a checkpointed demo run")
+    parser.add_argument("--run", metavar="RUN_ID", help="Checkpointed run (default: latest with a chart)")
+    parser.add_argument("--checkpoints", default=".checkpoints", help="Checkpoint directory")
+    args = parser.parse_args()
+    
     try:
-        result = await test_turn3_only()
+        result = await run_turn3_only(run_id=args.run, checkpoint_dir=args.checkpoints)
         print(f"\n✅ Turn 3 test result: {result}")
         
     except Exception as e:
@@ -1,30 +1,38 @@
 #!/usr/bin/env python3
 """
-Working Data Analytics Demo - Properly passes execution results between turns
+Weather agent - answers weather questions with the weather MCP server's tools
 """
 
 import asyncio
-import json
 import os
-import sys
-from pathlib import Path
+from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
 from dotenv import load_dotenv
-from logger_util import init_logging, get_logger
 
 load_dotenv()
 
-# legal-agent.py
-import asyncio
-from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
+DEFAULT_PROMPT = "Please provide complete weather information for San Francisco: 1) Get the weather forecast for coordinates 37.7749, -122.4194 and 2) Check for any weather alerts in California (CA). Use the appropriate weather tools to get this data."
 
-async def main():
+
+def weather_options(weather_url: str = None):
+    """Options for the weather assistant
+    
+    Args:
+        weather_url: Streamable-HTTP URL of a running weather MCP server
+            (default: WEATHER_MCP_URL, else spawn weather.py over stdio)
+    """
     # Configure the weather MCP server
-    mcp_servers = {
-        "weather": {
-            "command": "/Users/junyu/code/claude-code-playground/mcp/weather/.venv/bin/python",
-            "args": ["/Users/junyu/code/claude-code-playground/mcp/weather/weather.py"]
+    # Set WEATHER_MCP_URL (e.g. http://127.0.0.1:8000/mcp) to share one running
+    # `weather.py --transport streamable-http` server instead of spawning a subprocess
+    weather_url = weather_url or os.environ.get("WEATHER_MCP_URL")
+    if weather_url:
+        mcp_servers = {"weather": {"type": "http", "url": weather_url}}
+    else:
+        mcp_servers = {
+            "weather": {
+                "command": "/Users/junyu/code/claude-code-playground/mcp/weather/.venv/bin/python",
+                "args": ["/Users/junyu/code/claude-code-playground/mcp/weather/weather.py"]
+            }
         }
-    }
     
     # Configure allowed tools (MCP tools follow pattern: mcp__<server>__<tool>)
     allowed_tools = [
@@ -34,33 +42,46 @@ async def main():
 
     disallowed_tools =  ['Bash', 'Glob', 'Grep', 'LS', 'Read', 'Edit', 'MultiEdit', 'Write', 'NotebookEdit', 'WebFetch', 'WebSearch', 'BashOutput', 'KillBash']
     
-    async with ClaudeSDKClient(
-        options=ClaudeCodeOptions(
-            system_prompt="You are a weather assistant that can check weather forecasts and alerts. Use the available tools to get current weather data from the National Weather Service.",
-            max_turns=3,
-            model="claude-sonnet-4-0",
-            mcp_servers=mcp_servers,
-            allowed_tools=allowed_tools,
-            disallowed_tools=disallowed_tools
-        )
-    ) as client:
-        # Send the query
-        print("🌦️  Requesting comprehensive weather info for San Francisco...")
-        await client.query(
-            "Please provide complete weather information for San Francisco: 1) Get the weather forecast for coordinates 37.7749, -122.4194 and 2) Check for any weather alerts in California (CA). Use the appropriate weather tools to get this data."
-        )
-        
-        # Stream the response
-        print("\n📡 Receiving response...")
-        async for message in client.receive_response():
+    return ClaudeCodeOptions(
+        system_prompt="You are a weather assistant that can check weather forecasts and alerts. Use the available tools to get current weather data from the National Weather Service.",
+        max_turns=3,
+        model="claude-sonnet-4-0",
+        mcp_servers=mcp_servers,
+        allowed_tools=allowed_tools,
+        disallowed_tools=disallowed_tools
+    )
+
+
+async def ask_weather(client, prompt: str = DEFAULT_PROMPT, echo: bool = True):
+    """Send one weather question on a connected client; returns the answer and its cost"""
+    await client.query(prompt)
+    
+    # Stream the response
+    answer = ""
+    cost = None
+    async for message in client.receive_response():
+        if echo:
             print(f"🌀 Debug: Message: {message}")
-            if hasattr(message, 'content'):
-                # Print streaming content as it arrives
-                for block in message.content:
-                    if hasattr(block, 'text'):
+        if hasattr(message, 'content'):
+            # Print streaming content as it arrives
+            for block in message.content:
+                if hasattr(block, 'text'):
+                    answer += block.text
+                    if echo:
                         print(block.text, end='', flush=True)
-            if hasattr(message, 'total_cost_usd'):
+        if hasattr(message, 'total_cost_usd'):
+            cost = message.total_cost_usd
+            if echo:
                 print(f"\n💰 Total cost: ${message.total_cost_usd:.4f}")
+    return {"answer": answer, "cost_usd": cost}
+
+
+async def main():
+    async with ClaudeSDKClient(options=weather_options()) as client:
+        # Send the query
+        print("🌦️  Requesting comprehensive weather info for San Francisco...")
+        print("\n📡 Receiving response...")
+        await ask_weather(client)
         
         print("\n✅ Weather agent completed!")
 